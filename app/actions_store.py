@@ -0,0 +1,99 @@
+"""In-memory next-actions store backed by coordination/next-actions.json."""
+
+import copy
+import json
+import threading
+from pathlib import Path
+
+from jsonfile import file_stamp, locked, write_json
+
+
+class ActionsStore:
+    """Keeps the actions list in memory, indexed by id.
+
+    The file is re-read only when its inode/mtime/size changes (e.g. after
+    check-mail.py adds an item). Every mutation re-checks the file under the
+    shared lock before applying, so concurrent writers never lose updates.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._data: dict = {"actions": []}
+        self._by_id: dict[str, dict] = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        stamp = file_stamp(self.path)
+        if stamp == self._stamp:
+            return
+        if stamp is None:
+            data = {"actions": []}
+        else:
+            data = json.loads(self.path.read_text())
+            data.setdefault("actions", [])
+        self._data = data
+        self._by_id = {a["id"]: a for a in data["actions"]}
+        self._stamp = stamp
+
+    def _write(self):
+        write_json(self.path, self._data)
+        self._stamp = file_stamp(self.path)
+
+    def snapshot(self) -> dict:
+        """A deep copy of the current file contents, safe for callers to modify."""
+        with self._lock:
+            self._reload_if_changed()
+            return copy.deepcopy(self._data)
+
+    def get(self, action_id: str) -> dict | None:
+        with self._lock:
+            self._reload_if_changed()
+            action = self._by_id.get(action_id)
+            return dict(action) if action else None
+
+    def add(self, action: dict, front: bool = False) -> bool:
+        """Add an action. Returns False if one with the same id already exists."""
+        with self._lock, locked(self.path):
+            self._reload_if_changed()
+            if action["id"] in self._by_id:
+                return False
+            if front:
+                self._data["actions"].insert(0, action)
+            else:
+                self._data["actions"].append(action)
+            self._by_id[action["id"]] = action
+            self._write()
+            return True
+
+    def update(self, action_id: str, fields: dict) -> dict | None:
+        with self._lock, locked(self.path):
+            self._reload_if_changed()
+            action = self._by_id.get(action_id)
+            if action is None:
+                return None
+            action.update(fields)
+            self._write()
+            return dict(action)
+
+    def delete(self, action_id: str) -> bool:
+        with self._lock, locked(self.path):
+            self._reload_if_changed()
+            action = self._by_id.pop(action_id, None)
+            if action is None:
+                return False
+            actions = self._data["actions"]
+            del actions[next(i for i, a in enumerate(actions) if a is action)]
+            self._write()
+            return True
+
+    def reorder(self, order: list[str]) -> dict:
+        """Move the given ids to the front in that order; the rest keep their order."""
+        with self._lock, locked(self.path):
+            self._reload_if_changed()
+            remaining = {a["id"]: a for a in self._data["actions"]}
+            reordered = [remaining.pop(aid) for aid in order if aid in remaining]
+            reordered.extend(remaining.values())
+            self._data["actions"] = reordered
+            self._write()
+            return copy.deepcopy(self._data)
@@ -0,0 +1,85 @@
+"""Background status collector — each probe refreshes on its own schedule."""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+
+class Probe:
+    """One status field: how to collect it, how often, and its last value."""
+
+    def __init__(self, name: str, func: Callable, interval: float, default: Any = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.value = default
+        self.collected_at: str | None = None
+        self.duration_ms: float | None = None
+        self.error: str | None = None
+        self.lock = asyncio.Lock()
+
+    async def collect(self):
+        async with self.lock:
+            start = time.monotonic()
+            try:
+                if asyncio.iscoroutinefunction(self.func):
+                    self.value = await self.func()
+                else:
+                    self.value = await asyncio.to_thread(self.func)
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+            self.duration_ms = round((time.monotonic() - start) * 1000, 1)
+            self.collected_at = datetime.now(timezone.utc).isoformat()
+
+
+class StatusCollector:
+    """Runs registered probes in the background and serves cached snapshots."""
+
+    def __init__(self):
+        self.probes: dict[str, Probe] = {}
+        self.live: dict[str, Callable] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def register(self, name: str, func: Callable, interval: float, default: Any = None):
+        self.probes[name] = Probe(name, func, interval, default)
+
+    def register_live(self, name: str, func: Callable):
+        """Register a cheap in-memory field that is read at snapshot time."""
+        self.live[name] = func
+
+    async def refresh(self, name: str):
+        """Force one probe to run now. Waits for an in-progress run instead of duplicating it."""
+        probe = self.probes[name]
+        if probe.lock.locked():
+            async with probe.lock:
+                return
+        await probe.collect()
+
+    async def _loop(self, probe: Probe):
+        while True:
+            await probe.collect()
+            await asyncio.sleep(probe.interval)
+
+    def start(self):
+        for probe in self.probes.values():
+            self._tasks.append(asyncio.create_task(self._loop(probe)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def snapshot(self) -> dict:
+        data = {name: p.value for name, p in self.probes.items()}
+        data["collected_at"] = {name: p.collected_at for name, p in self.probes.items()}
+        now = datetime.now(timezone.utc).isoformat()
+        for name, func in self.live.items():
+            data[name] = func()
+            data["collected_at"][name] = now
+        errors = {name: p.error for name, p in self.probes.items() if p.error}
+        if errors:
+            data["errors"] = errors
+        return data
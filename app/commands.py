@@ -0,0 +1,134 @@
+"""Async subprocess execution with per-tool concurrency limits and timeout accounting."""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+
+# Max concurrent processes per executable. Anything unlisted shares DEFAULT_LIMIT.
+TOOL_LIMITS = {
+    "notmuch": 4,
+    "git": 1,
+    "rclone": 2,
+    "du": 2,
+}
+DEFAULT_LIMIT = 8
+
+# How often to check whether the HTTP client has gone away (seconds)
+DISCONNECT_POLL = 0.5
+
+_semaphores: dict[str, asyncio.Semaphore] = {}
+STATS: dict[str, dict] = {}
+
+
+class CommandCancelled(Exception):
+    """The caller went away before the command finished; the process was killed."""
+
+
+class CommandResult:
+    def __init__(self, cmd: list[str], returncode: int | None, stdout: str, stderr: str,
+                 duration: float, timed_out: bool = False):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+def _tool(cmd: list[str]) -> str:
+    return os.path.basename(cmd[0])
+
+
+def _semaphore(tool: str) -> asyncio.Semaphore:
+    if tool not in _semaphores:
+        _semaphores[tool] = asyncio.Semaphore(TOOL_LIMITS.get(tool, DEFAULT_LIMIT))
+    return _semaphores[tool]
+
+
+def _account(tool: str, waited: float, duration: float, timed_out: bool, cancelled: bool):
+    s = STATS.setdefault(tool, {"calls": 0, "timeouts": 0, "cancelled": 0,
+                                "total_seconds": 0.0, "max_seconds": 0.0, "wait_seconds": 0.0})
+    s["calls"] += 1
+    s["timeouts"] += int(timed_out)
+    s["cancelled"] += int(cancelled)
+    s["total_seconds"] = round(s["total_seconds"] + duration, 3)
+    s["max_seconds"] = round(max(s["max_seconds"], duration), 3)
+    s["wait_seconds"] = round(s["wait_seconds"] + waited, 3)
+
+
+async def _kill(proc: asyncio.subprocess.Process):
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+
+async def run(cmd: list[str], timeout: float = 10, cwd: str | None = None,
+              input: str | None = None,
+              is_disconnected: Callable[[], Awaitable[bool]] | None = None) -> CommandResult:
+    """Run a command without blocking the event loop.
+
+    Waits for a slot in the tool's concurrency pool, then runs the process
+    with a timeout. If `is_disconnected` is given (e.g. `request.is_disconnected`)
+    it is polled while the command runs and the process is killed as soon as
+    it reports True, raising CommandCancelled. Raises FileNotFoundError if the
+    executable does not exist.
+    """
+    tool = _tool(cmd)
+    queued = time.monotonic()
+    async with _semaphore(tool):
+        start = time.monotonic()
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=cwd,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        communicate = asyncio.ensure_future(
+            proc.communicate(input.encode() if input is not None else None))
+        timed_out = cancelled = False
+        stdout = stderr = b""
+        try:
+            deadline = start + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                wait = min(remaining, DISCONNECT_POLL) if is_disconnected else remaining
+                done, _ = await asyncio.wait({communicate}, timeout=wait)
+                if done:
+                    stdout, stderr = communicate.result()
+                    break
+                if is_disconnected and await is_disconnected():
+                    cancelled = True
+                    raise CommandCancelled(" ".join(cmd))
+        except BaseException:
+            cancelled = True
+            raise
+        finally:
+            if not communicate.done():
+                communicate.cancel()
+                await _kill(proc)
+            duration = time.monotonic() - start
+            _account(tool, start - queued, duration, timed_out, cancelled)
+
+    return CommandResult(cmd, proc.returncode, stdout.decode(errors="replace"),
+                         stderr.decode(errors="replace"), duration, timed_out)
+
+
+def stats() -> dict:
+    """Per-tool call counts, timeouts and timings, plus current pool usage."""
+    out = {}
+    for tool, s in STATS.items():
+        sem = _semaphores.get(tool)
+        limit = TOOL_LIMITS.get(tool, DEFAULT_LIMIT)
+        out[tool] = {**s, "limit": limit,
+                     "in_use": limit - sem._value if sem else 0}
+    return out
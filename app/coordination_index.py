@@ -0,0 +1,186 @@
+"""Index of coordination/: queued task briefs and session files.
+
+Headers (title, PRIORITY, STATUS...) are parsed once per file and kept
+until the file's mtime or size changes; only the first HEADER_BYTES of a
+task are read for that. Full task content is read on request. Completed
+sessions are moved to coordination/archive/<YYYY-MM>/ after
+SESSION_ARCHIVE_AGE, so the directories scanned on every refresh stay small.
+"""
+
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+HEADER_BYTES = 4096
+HEADER_LINES = 15
+SESSION_ARCHIVE_AGE = 24 * 3600
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# "**PRIORITY:** high", "PRIORITY: high", "**Status:** ACTIVE"...
+FIELD_RE = re.compile(r"^\W*(PRIORITY|STATUS|Working on)\W*:\W*(.*?)\W*$", re.IGNORECASE)
+
+
+def parse_header(text: str, default_title: str) -> dict:
+    fields = {"title": default_title}
+    lines = text.split("\n")[:HEADER_LINES]
+    for line in lines:
+        if line.startswith("# ") and "heading" not in fields:
+            heading = line[2:].strip()
+            if heading.startswith("Task:"):
+                heading = heading[len("Task:"):].strip()
+            fields["heading"] = heading
+            fields["title"] = heading or default_title
+            continue
+        match = FIELD_RE.match(line)
+        if match:
+            key = match.group(1).lower().replace(" ", "_")
+            fields.setdefault(key, match.group(2).strip())
+    fields.pop("heading", None)
+    return fields
+
+
+class CoordinationIndex:
+    def __init__(self, coord_dir: Path):
+        self.coord_dir = coord_dir
+        self.queue_dir = coord_dir / "queued"
+        self.archive_dir = coord_dir / "archive"
+        self._tasks: dict[str, dict] = {}      # stem -> entry
+        self._sessions: dict[str, dict] = {}   # file name -> entry
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.archived = 0
+        self.last_error: str | None = None
+
+    # --- Refresh ---
+
+    def _scan(self, directory: Path, match) -> dict[str, os.DirEntry]:
+        found = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if match(entry.name) and entry.is_file():
+                        found[entry.name] = entry
+        except FileNotFoundError:
+            pass
+        return found
+
+    def _update(self, cache: dict, entries: dict[str, os.DirEntry], key, make, read_bytes: int):
+        seen = set()
+        for name, entry in entries.items():
+            k = key(name)
+            try:
+                # The file may be removed between the scan and here
+                st = entry.stat()
+            except OSError:
+                continue
+            seen.add(k)
+            stamp = (st.st_mtime_ns, st.st_size)
+            old = cache.get(k)
+            if old and old["_stamp"] == stamp:
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    head = f.read(read_bytes).decode(errors="replace")
+            except OSError:
+                continue
+            cache[k] = {**make(name, head), "modified": int(st.st_mtime), "size": st.st_size,
+                        "_stamp": stamp}
+            self.parsed += 1
+        for k in set(cache) - seen:
+            del cache[k]
+
+    def refresh(self):
+        tasks = self._scan(self.queue_dir, lambda n: n.endswith(".md") and n != "README.md")
+        sessions = self._scan(self.coord_dir, lambda n: n.startswith("SESSION_") and n.endswith(".md"))
+        with self._lock:
+            self._update(self._tasks, tasks, lambda n: n[:-3], self._make_task, HEADER_BYTES)
+            # "STATUS: COMPLETE" can be added anywhere in a session file
+            self._update(self._sessions, sessions, lambda n: n, self._make_session, -1)
+
+    @staticmethod
+    def _make_task(name: str, head: str) -> dict:
+        stem = name[:-3]
+        fields = parse_header(head, stem.replace("-", " ").title())
+        return {"file": stem, "title": fields["title"],
+                "priority": fields.get("priority", "medium").lower() or "medium",
+                "status": fields.get("status", "queued").lower() or "queued"}
+
+    @staticmethod
+    def _make_session(name: str, head: str) -> dict:
+        fields = parse_header(head, name[:-3])
+        status = fields.get("status", "").upper()
+        return {"file": name, "title": fields["title"],
+                "status": "COMPLETE" if status.startswith("COMPLETE") or "STATUS: COMPLETE" in head
+                else "ACTIVE",
+                "working_on": fields.get("working_on", "")}
+
+    # --- Queries ---
+
+    @staticmethod
+    def _public(entry: dict) -> dict:
+        return {k: v for k, v in entry.items() if not k.startswith("_")}
+
+    def tasks(self, status: set[str] | None = None, priority: set[str] | None = None,
+              offset: int = 0, limit: int | None = None) -> dict:
+        """Task headers (no content), high priority first."""
+        self.refresh()
+        with self._lock:
+            matched = [t for t in self._tasks.values()
+                       if (not status or t["status"] in status)
+                       and (not priority or t["priority"] in priority)]
+        matched.sort(key=lambda t: (PRIORITY_ORDER.get(t["priority"], 1), t["file"]))
+        page = matched[offset:offset + limit] if limit is not None else matched[offset:]
+        return {"total": len(matched), "tasks": [self._public(t) for t in page]}
+
+    def task_content(self, stem: str) -> str | None:
+        self.refresh()
+        with self._lock:
+            if stem not in self._tasks:
+                return None
+        try:
+            return (self.queue_dir / f"{stem}.md").read_text()
+        except OSError:
+            return None
+
+    def sessions(self, status: str | None = None, offset: int = 0,
+                 limit: int | None = None) -> dict:
+        """Session headers, newest first (by file name, which is a timestamp)."""
+        self.refresh()
+        with self._lock:
+            matched = [s for s in self._sessions.values() if not status or s["status"] == status]
+        matched.sort(key=lambda s: s["file"], reverse=True)
+        page = matched[offset:offset + limit] if limit is not None else matched[offset:]
+        return {"total": len(matched), "sessions": [self._public(s) for s in page]}
+
+    def archive_completed(self, min_age: float = SESSION_ARCHIVE_AGE) -> list[tuple[Path, Path]]:
+        """Move COMPLETE sessions untouched for min_age seconds into archive/.
+        Returns (old path, new path) for every moved file, for committing."""
+        self.refresh()
+        cutoff = time.time() - min_age
+        with self._lock:
+            done = [s for s in self._sessions.values()
+                    if s["status"] == "COMPLETE" and s["modified"] < cutoff]
+        moved = []
+        for s in done:
+            month = time.strftime("%Y-%m", time.localtime(s["modified"]))
+            dest = self.archive_dir / month
+            dest.mkdir(parents=True, exist_ok=True)
+            src = self.coord_dir / s["file"]
+            try:
+                os.replace(src, dest / s["file"])
+            except OSError:
+                continue
+            moved.append((src, dest / s["file"]))
+        if moved:
+            self.archived += len(moved)
+            self.refresh()
+        return moved
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = sum(1 for s in self._sessions.values() if s["status"] == "ACTIVE")
+            return {"tasks": len(self._tasks), "sessions": len(self._sessions),
+                    "active_sessions": active, "parsed": self.parsed, "archived": self.archived,
+                    "last_error": self.last_error}
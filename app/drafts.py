@@ -0,0 +1,135 @@
+"""Draft-reply prompts and generation stats.
+
+The prompt is built from the compact parsed messages (thread_cache's
+parse_messages form) rather than raw notmuch JSON: quoted text is stripped
+from each body, and messages are added newest-first until the token budget
+is spent. Token counts here are estimates (about 4 characters per token);
+the API's own count is recorded after each generation.
+"""
+
+import re
+import threading
+import time
+
+from thread_cache import by_date
+
+CHARS_PER_TOKEN = 4
+PROMPT_TOKEN_BUDGET = 6000
+# Share of the budget the relationship README may use
+RELATIONSHIP_SHARE = 0.3
+RECENT_SAMPLES = 50
+
+# Where a reply's quoted copy of the previous message starts
+QUOTE_HEADER_RE = re.compile(
+    r"^(On .{0,200}wrote:\s*$"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|-{2,}\s*Forwarded message\s*-{2,}"
+    r"|From: .+\n(Sent|Date): )",
+    re.MULTILINE | re.IGNORECASE)
+
+INSTRUCTIONS = """Draft a reply that:
+- Is warm and personal
+- References specific things from the thread
+- Uses the relationship context appropriately
+- Keeps it concise (2-4 paragraphs unless more depth is warranted)
+- Signs off appropriately for the relationship level
+
+Output ONLY the draft email body, no meta-commentary."""
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def strip_quotes(body: str) -> str:
+    """The new text of a message: everything before the quoted previous
+    message, minus `>`-quoted lines and trailing blank lines."""
+    match = QUOTE_HEADER_RE.search(body)
+    if match:
+        body = body[:match.start()]
+    lines = [line for line in body.splitlines() if not line.lstrip().startswith(">")]
+    return "\n".join(lines).strip()
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rstrip() + "\n[...]"
+
+
+def build_prompt(item: dict, messages: list[dict], relationship: str,
+                 budget: int = PROMPT_TOKEN_BUDGET) -> tuple[str, dict]:
+    """(prompt, info) for a triage item. info says how much of the thread
+    and README made it in."""
+    messages = by_date(messages)
+    relationship = _truncate(relationship, int(budget * RELATIONSHIP_SHARE)) if relationship else ""
+    head = f"""You are helping draft a reply to an email. Use the context below to write a warm, personal response.
+
+**From:** {item.get("from_name", "Unknown")} <{item.get("from_email", "")}>
+**Subject:** {item.get("subject", "")}
+**Thread summary:** {item.get("summary", "")}
+
+**Relationship context:**
+{relationship or "No relationship context available."}
+
+**Email thread (oldest first):**
+"""
+    remaining = budget - estimate_tokens(head) - estimate_tokens(INSTRUCTIONS)
+    included = []
+    for msg in reversed(messages):
+        text = strip_quotes(msg.get("body", "")) or "(no new text)"
+        block = f"From: {msg.get('from', '')}\nDate: {msg.get('date', '')}\n\n{text}\n"
+        cost = estimate_tokens(block)
+        if cost > remaining:
+            if not included:  # always include the newest, trimmed to fit
+                included.append(_truncate(block, max(remaining, 200)))
+            break
+        included.append(block)
+        remaining -= cost
+    omitted = len(messages) - len(included)
+    thread = "\n---\n".join(reversed(included))
+    if omitted:
+        thread = f"[{omitted} earlier message(s) omitted]\n---\n" + thread
+    prompt = f"{head}{thread}\n\n{INSTRUCTIONS}"
+    return prompt, {"messages": len(included), "omitted": omitted,
+                    "estimated_tokens": estimate_tokens(prompt)}
+
+
+class DraftStats:
+    """Counts plus recent time-to-first-token and prompt-size samples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generated = self.cached = self.errors = 0
+        self._samples: list[dict] = []
+        self.last_error = None
+
+    def record(self, ttft_ms: float, total_ms: float, prompt_tokens: int | None,
+               output_tokens: int | None):
+        with self._lock:
+            self.generated += 1
+            self._samples.append({"at": int(time.time()), "ttft_ms": round(ttft_ms),
+                                  "total_ms": round(total_ms), "prompt_tokens": prompt_tokens,
+                                  "output_tokens": output_tokens})
+            del self._samples[:-RECENT_SAMPLES]
+
+    def record_cached(self):
+        with self._lock:
+            self.cached += 1
+
+    def record_error(self, error: str):
+        with self._lock:
+            self.errors += 1
+            self.last_error = error
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            out = {"generated": self.generated, "cached": self.cached, "errors": self.errors,
+                   "last_error": self.last_error, "last": samples[-1] if samples else None}
+        if samples:
+            ttfts = sorted(s["ttft_ms"] for s in samples)
+            prompts = [s["prompt_tokens"] for s in samples if s["prompt_tokens"] is not None]
+            out["ttft_ms_p50"] = ttfts[len(ttfts) // 2]
+            out["ttft_ms_max"] = ttfts[-1]
+            out["prompt_tokens_avg"] = round(sum(prompts) / len(prompts)) if prompts else None
+        return out
@@ -0,0 +1,159 @@
+"""Full-text index of the archive's text files (SQLite FTS5).
+
+update() walks the tree and re-reads only files whose mtime or size changed;
+search() answers ranked, paginated queries with snippets. The console reads
+the index, scripts/index-files.py (run by sync-all.sh) keeps it current.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+TEXT_EXTENSIONS = {".md", ".txt", ".json"}
+SKIP_DIRS = {"node_modules", "__pycache__"}
+
+# Only the first MAX_INDEX_BYTES of a file are indexed (exports can be 100MB+ JSON)
+MAX_INDEX_BYTES = 5_000_000
+COMMIT_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    path, content, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+"""
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(q: str, prefix: bool = True) -> str | None:
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix."""
+    words = TOKEN_RE.findall(q)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    if prefix:
+        terms[-1] += "*"
+    return " AND ".join(terms)
+
+
+def iter_text_files(root: Path):
+    """Yield (relative path, stat) for indexable files, skipping dot-dirs like .git."""
+    stack = [str(root)]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if os.path.splitext(entry.name)[1].lower() in TEXT_EXTENSIONS:
+                            yield os.path.relpath(entry.path, root), entry.stat()
+        except OSError:
+            pass
+
+
+class FileIndex:
+    def __init__(self, root: Path, db_path: Path):
+        self.root = root
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _read(self, rel: str) -> str:
+        with open(self.root / rel, "rb") as f:
+            return f.read(MAX_INDEX_BYTES).decode(errors="replace")
+
+    def update(self, log=None) -> dict:
+        """Bring the index in line with the tree. Returns counts of what changed."""
+        start = time.monotonic()
+        known = {path: (doc_id, mtime, size) for doc_id, path, mtime, size
+                 in self._db.execute("SELECT id, path, mtime_ns, size FROM docs")}
+        seen = set()
+        added = updated = pending = 0
+
+        self._db.execute("BEGIN")
+        try:
+            for rel, st in iter_text_files(self.root):
+                seen.add(rel)
+                prev = known.get(rel)
+                if prev and prev[1] == st.st_mtime_ns and prev[2] == st.st_size:
+                    continue
+                try:
+                    content = self._read(rel)
+                except OSError:
+                    continue
+                if prev:
+                    doc_id = prev[0]
+                    self._db.execute("UPDATE docs SET mtime_ns = ?, size = ? WHERE id = ?",
+                                     (st.st_mtime_ns, st.st_size, doc_id))
+                    self._db.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+                    updated += 1
+                else:
+                    doc_id = self._db.execute(
+                        "INSERT INTO docs (path, mtime_ns, size) VALUES (?, ?, ?)",
+                        (rel, st.st_mtime_ns, st.st_size)).lastrowid
+                    added += 1
+                self._db.execute("INSERT INTO docs_fts (rowid, path, content) VALUES (?, ?, ?)",
+                                 (doc_id, rel, content))
+                pending += 1
+                if pending >= COMMIT_EVERY:
+                    self._db.execute("COMMIT")
+                    self._db.execute("BEGIN")
+                    pending = 0
+                    if log:
+                        log(f"  indexed {added + updated} files...")
+
+            removed = [(v[0],) for k, v in known.items() if k not in seen]
+            self._db.executemany("DELETE FROM docs_fts WHERE rowid = ?", removed)
+            self._db.executemany("DELETE FROM docs WHERE id = ?", removed)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return {"added": added, "updated": updated, "removed": len(removed),
+                "total": len(seen), "seconds": round(time.monotonic() - start, 1)}
+
+    def optimize(self):
+        """Merge FTS segments; worth running after a large update."""
+        self._db.execute("INSERT INTO docs_fts(docs_fts) VALUES ('optimize')")
+
+    def search(self, q: str, limit: int = 50, offset: int = 0, prefix: bool = True) -> dict:
+        """Ranked matches with snippets. Path hits weigh more than body hits."""
+        match = fts_query(q, prefix)
+        if not match:
+            return {"results": [], "has_more": False}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, snippet(docs_fts, 1, '**', '**', '…', 16), "
+                "bm25(docs_fts, 5.0, 1.0) AS rank "
+                "FROM docs_fts WHERE docs_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                (match, limit + 1, offset)).fetchall()
+        results = [{"path": p, "snippet": snip, "score": round(-rank, 3)}
+                   for p, snip, rank in rows[:limit]]
+        return {"results": results, "has_more": len(rows) > limit}
+
+    def empty(self) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM docs LIMIT 1").fetchone() is None
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        return {"files": count}
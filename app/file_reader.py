@@ -0,0 +1,105 @@
+"""Paged line-window reads for large text files.
+
+Reading line N of a multi-hundred-MB export shouldn't mean scanning from
+the top every time. LineReader remembers the byte offset of every
+CHECKPOINT_LINES-th line per file (keyed on the file's stamp, so edits
+invalidate it) and seeks to the nearest checkpoint before reading.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from jsonfile import file_stamp
+
+CHECKPOINT_LINES = 1000
+MAX_FILES = 32
+MAX_LINE_BYTES = 64_000
+# Read size for skipping the rest of an over-long line
+SKIP_CHUNK = 1024 * 1024
+
+
+def _read_line(f) -> bytes:
+    """The next line, cut to MAX_LINE_BYTES; b"" at end of file. The rest
+    of an over-long line is skipped in SKIP_CHUNK reads, so a multi-GB
+    single-line file never sits in memory."""
+    line = f.readline(MAX_LINE_BYTES + 1)
+    if len(line) > MAX_LINE_BYTES and not line.endswith(b"\n"):
+        while True:
+            chunk = f.readline(SKIP_CHUNK)
+            if not chunk or chunk.endswith(b"\n"):
+                break
+    return line[:MAX_LINE_BYTES]
+
+
+class LineReader:
+    def __init__(self, max_files: int = MAX_FILES):
+        self.max_files = max_files
+        # path -> (stamp, [byte offset of line 0, line CHECKPOINT_LINES, ...])
+        self._offsets: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _checkpoints(self, key: str, stamp) -> list[int]:
+        with self._lock:
+            cached = self._offsets.get(key)
+            if cached and cached[0] == stamp:
+                self._offsets.move_to_end(key)
+                return cached[1]
+            offsets = [0]
+            self._offsets[key] = (stamp, offsets)
+            self._offsets.move_to_end(key)
+            while len(self._offsets) > self.max_files:
+                self._offsets.popitem(last=False)
+            return offsets
+
+    def read(self, path: Path, start: int = 0, count: int = 500) -> dict:
+        """Lines [start, start + count) of the file, decoded leniently.
+
+        Over-long lines are truncated to MAX_LINE_BYTES. next_start is None
+        once the end of the file is reached.
+        """
+        stamp = file_stamp(path)
+        if stamp is None:
+            raise FileNotFoundError(path)
+        offsets = self._checkpoints(str(path), stamp)
+
+        with open(path, "rb") as f:
+            # offsets is shared with other readers of the same file; only
+            # ever append to it, and copy what we need under the lock.
+            with self._lock:
+                known = len(offsets)
+                idx = min(start // CHECKPOINT_LINES, known - 1)
+                f.seek(offsets[idx])
+            line_no = idx * CHECKPOINT_LINES
+            found = []
+
+            # Skip forward to start, recording checkpoints passed on the way
+            while line_no < start:
+                line = _read_line(f)
+                if not line:
+                    break
+                line_no += 1
+                if line_no % CHECKPOINT_LINES == 0:
+                    self._add_checkpoint(offsets, line_no, f.tell())
+
+            while line_no < start + count:
+                line = _read_line(f)
+                if not line:
+                    break
+                found.append(line.decode(errors="replace").rstrip("\r\n"))
+                line_no += 1
+                if line_no % CHECKPOINT_LINES == 0:
+                    self._add_checkpoint(offsets, line_no, f.tell())
+            at_end = f.read(1) == b""
+
+        return {
+            "start": start,
+            "lines": found,
+            "next_start": None if at_end else start + len(found),
+            "size": stamp[2],
+        }
+
+    def _add_checkpoint(self, offsets: list[int], line_no: int, pos: int):
+        with self._lock:
+            if len(offsets) == line_no // CHECKPOINT_LINES:
+                offsets.append(pos)
@@ -0,0 +1,197 @@
+"""Background git writer — coalesces dashboard edits into batched commits and pushes."""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import commands
+
+
+class GitWriter:
+    """Single writer for the archive repo.
+
+    Endpoints call submit() after their file write is durable and return
+    immediately. Changes are collected for `window` seconds (or until
+    `max_batch` changes arrive) and committed together; pushes run in a
+    separate loop with exponential backoff so a flaky network never holds
+    up the next commit.
+
+    If a batch's commit fails, each submission in it is committed on its
+    own, so one bad path can't take unrelated edits down with it; the ones
+    that still fail are requeued with the same backoff, up to max_attempts.
+    """
+
+    def __init__(self, repo_dir: str, window: float = 5.0, max_batch: int = 50,
+                 backoff: float = 2.0, max_backoff: float = 300.0, max_attempts: int = 8):
+        self.repo_dir = repo_dir
+        self.window = window
+        self.max_batch = max_batch
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        # Items are (files, message, failed attempts so far)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._batch: list[tuple[list[str], str, int]] = []
+        self._retrying: dict[asyncio.TimerHandle, tuple[list[str], str, int]] = {}
+        self._push_needed = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._committing: asyncio.Future | None = None
+        self.commits = 0
+        self.unpushed_commits = 0
+        self.push_failures = 0
+        self.commit_failures = 0
+        self.dropped_changes = 0
+        self.last_commit_at: str | None = None
+        self.last_push_at: str | None = None
+        self.last_push_seconds: float | None = None
+        self.last_error: str | None = None
+
+    def submit(self, files: list[str], message: str):
+        """Queue changed files for the next batch commit."""
+        self._queue.put_nowait((files, message, 0))
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._commit_loop()),
+                       asyncio.create_task(self._push_loop())]
+
+    async def stop(self):
+        """Commit whatever is still queued or waiting to be retried, and try
+        one last push."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._committing and not self._committing.done():
+            # Let it finish: killing git mid-commit leaves index.lock behind
+            await self._committing
+        for handle, item in self._retrying.items():
+            handle.cancel()
+            self._batch.append(item)
+        self._retrying.clear()
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+        if self._batch:
+            await self._commit(self._batch, retry=False)
+            self._batch = []
+        if self.unpushed_commits:
+            await self._push()
+
+    async def _commit_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(self._batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                # Not wait_for: before 3.12 it can swallow a stop() cancel
+                # that lands as an item arrives, leaving stop() waiting forever
+                getter = asyncio.ensure_future(self._queue.get())
+                try:
+                    await asyncio.wait({getter}, timeout=remaining)
+                finally:
+                    if not getter.done():
+                        getter.cancel()
+                    elif not getter.cancelled():
+                        self._batch.append(getter.result())
+                if not getter.done() or getter.cancelled():
+                    break
+            batch, self._batch = self._batch, []
+            self._committing = asyncio.ensure_future(self._commit(batch))
+            await asyncio.shield(self._committing)
+
+    async def _commit(self, batch: list[tuple[list[str], str, int]], retry: bool = True):
+        """One commit for the batch, else one per submission; failures are
+        requeued (or, with retry=False, dropped)."""
+        if len(batch) > 1 and await self._commit_files(batch):
+            return
+        for item in batch:
+            if await self._commit_files([item]):
+                continue
+            files, message, attempts = item
+            if not retry or attempts + 1 >= self.max_attempts:
+                self.dropped_changes += 1
+                continue
+            self._requeue_later((files, message, attempts + 1))
+
+    def _requeue_later(self, item: tuple[list[str], str, int]):
+        delay = min(self.backoff * 2 ** (item[2] - 1), self.max_backoff)
+
+        def requeue():
+            del self._retrying[handle]
+            self._queue.put_nowait(item)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retrying[handle] = item
+
+    async def _commit_files(self, batch: list[tuple[list[str], str, int]]) -> bool:
+        """True if the batch was committed (or had nothing to commit)."""
+        files = sorted({f for fs, _, _ in batch for f in fs})
+        messages = list(dict.fromkeys(m for _, m, _ in batch))
+        if len(messages) == 1:
+            message = messages[0]
+        else:
+            message = f"Console: {len(batch)} changes\n\n" + "\n".join(f"- {m}" for m in messages)
+        try:
+            r = await commands.run(["git", "add", "--", *files], cwd=self.repo_dir, timeout=30)
+            if r.ok:
+                r = await commands.run(["git", "commit", "-m", message, "--", *files],
+                                       cwd=self.repo_dir, timeout=30)
+        except Exception as e:
+            self.commit_failures += 1
+            self.last_error = f"commit: {e}"
+            return False
+        if r.ok:
+            self.commits += 1
+            self.unpushed_commits += 1
+            self.last_commit_at = datetime.now(timezone.utc).isoformat()
+            self._push_needed.set()
+            return True
+        if "nothing" in r.stdout:
+            return True
+        self.commit_failures += 1
+        self.last_error = f"commit: {(r.stderr or r.stdout).strip()[:200]}"
+        return False
+
+    async def _push(self) -> bool:
+        start = time.monotonic()
+        pushing = self.unpushed_commits
+        try:
+            r = await commands.run(["git", "push"], cwd=self.repo_dir, timeout=60)
+        except Exception as e:
+            self.last_error = f"push: {e}"
+            return False
+        if not r.ok:
+            self.last_error = "push: timed out" if r.timed_out else f"push: {r.stderr.strip()[:200]}"
+            return False
+        self.unpushed_commits -= pushing
+        self.last_push_seconds = round(time.monotonic() - start, 2)
+        self.last_push_at = datetime.now(timezone.utc).isoformat()
+        self.last_error = None
+        return True
+
+    async def _push_loop(self):
+        while True:
+            await self._push_needed.wait()
+            self._push_needed.clear()
+            delay = self.backoff
+            while not await self._push():
+                self.push_failures += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() + len(self._batch),
+            "retrying": len(self._retrying),
+            "commit_failures": self.commit_failures,
+            "dropped_changes": self.dropped_changes,
+            "commits": self.commits,
+            "unpushed_commits": self.unpushed_commits,
+            "push_failures": self.push_failures,
+            "last_commit_at": self.last_commit_at,
+            "last_push_at": self.last_push_at,
+            "last_push_seconds": self.last_push_seconds,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,220 @@
+"""Background jobs for long-running scripts (triage refresh, sync, backup).
+
+One job of each type at a time: starting a type that is already queued or
+running returns the existing job. At most `max_workers` jobs run at once;
+the rest wait their turn. Each job's output goes to its own log file, and
+job records are persisted so a console restart still knows about recent
+runs -- including ones that are still going.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from jsonfile import write_json
+
+ACTIVE = ("queued", "running")
+KEEP_JOBS = 100
+CANCEL_GRACE = 10.0
+ORPHAN_POLL = 2.0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """Runs registered commands as tracked jobs.
+
+    `jobs` is the dict to keep job records in (id -> record), so the
+    server's TASKS table is the live view. `types` maps a job type to the
+    command it runs.
+    """
+
+    def __init__(self, jobs: dict, types: dict[str, list[str]], state_file: Path,
+                 log_dir: Path, cwd: str, max_workers: int = 2):
+        self.jobs = jobs
+        self.types = types
+        self.state_file = state_file
+        self.log_dir = log_dir
+        self.cwd = cwd
+        self.max_workers = max_workers
+        self._slots = asyncio.Semaphore(max_workers)
+        self._procs: dict[str, asyncio.subprocess.Process] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    # --- Persistence ---
+
+    def load(self):
+        """Restore job records. Jobs a previous console left running are
+        watched until their process exits; queued ones never started."""
+        try:
+            saved = json.loads(self.state_file.read_text())
+        except (FileNotFoundError, ValueError):
+            saved = []
+        for job in saved:
+            self.jobs[job["id"]] = job
+            if job["status"] == "queued":
+                self._finish(job, "interrupted", None)
+            elif job["status"] == "running":
+                if _alive(job.get("pid")):
+                    self._tasks[job["id"]] = asyncio.create_task(self._watch_orphan(job))
+                else:
+                    self._finish(job, "interrupted", None)
+        self._save()
+
+    def _save(self):
+        finished = [j for j in self.jobs.values() if j["status"] not in ACTIVE]
+        finished.sort(key=lambda j: j["created_at"])
+        for job in finished[:-KEEP_JOBS]:
+            self.jobs.pop(job["id"], None)
+            Path(job["log"]).unlink(missing_ok=True)
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        write_json(self.state_file, sorted(self.jobs.values(), key=lambda j: j["created_at"]))
+
+    def _finish(self, job: dict, status: str, exit_code: int | None):
+        job["status"] = status
+        job["exit_code"] = exit_code
+        job["finished_at"] = _now()
+        if job.get("started_monotonic") is not None:
+            job["duration"] = round(time.monotonic() - job.pop("started_monotonic"), 1)
+
+    # --- Running ---
+
+    def active(self, job_type: str) -> dict | None:
+        for job in self.jobs.values():
+            if job["type"] == job_type and job["status"] in ACTIVE:
+                return job
+        return None
+
+    def start(self, job_type: str) -> tuple[dict, bool]:
+        """Start a job of this type, or return the one already in flight.
+        Returns (job, started). Raises KeyError for an unknown type."""
+        cmd = self.types[job_type]
+        existing = self.active(job_type)
+        if existing:
+            return existing, False
+        job_id = uuid.uuid4().hex[:8]
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        job = {
+            "id": job_id,
+            "type": job_type,
+            "cmd": cmd,
+            "status": "queued",
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "duration": None,
+            "exit_code": None,
+            "pid": None,
+            "log": str(self.log_dir / f"{job_type}-{job_id}.log"),
+        }
+        self.jobs[job_id] = job
+        self._save()
+        self._tasks[job_id] = asyncio.create_task(self._run(job))
+        return job, True
+
+    async def _run(self, job: dict):
+        try:
+            async with self._slots:
+                if job["status"] != "queued":  # cancelled while waiting
+                    return
+                with open(job["log"], "ab") as log:
+                    proc = await asyncio.create_subprocess_exec(
+                        *job["cmd"], cwd=self.cwd, stdin=asyncio.subprocess.DEVNULL,
+                        stdout=log, stderr=asyncio.subprocess.STDOUT,
+                        start_new_session=True)
+                self._procs[job["id"]] = proc
+                job.update(status="running", pid=proc.pid, started_at=_now(),
+                           started_monotonic=time.monotonic())
+                self._save()
+                code = await proc.wait()
+                status = "cancelled" if job.get("cancel_requested") else \
+                    "succeeded" if code == 0 else "failed"
+                self._finish(job, status, code)
+        except Exception as e:
+            job["error"] = str(e)
+            self._finish(job, "failed", None)
+        finally:
+            self._procs.pop(job["id"], None)
+            self._tasks.pop(job["id"], None)
+            self._save()
+
+    async def _watch_orphan(self, job: dict):
+        """A job started by a previous console: no exit code, but we can tell
+        when it ends (and keep single-flight honest until then)."""
+        while _alive(job.get("pid")):
+            await asyncio.sleep(ORPHAN_POLL)
+        self._finish(job, "cancelled" if job.get("cancel_requested") else "finished", None)
+        self._tasks.pop(job["id"], None)
+        self._save()
+
+    async def cancel(self, job_id: str) -> dict | None:
+        """SIGTERM the job's process group, SIGKILL after CANCEL_GRACE."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == "queued":
+            self._finish(job, "cancelled", None)
+            self._save()
+        elif job["status"] == "running" and job.get("pid"):
+            job["cancel_requested"] = True
+            try:
+                os.killpg(job["pid"], signal.SIGTERM)
+            except ProcessLookupError:
+                return job
+            asyncio.create_task(self._kill_later(job))
+        return job
+
+    async def _kill_later(self, job: dict):
+        await asyncio.sleep(CANCEL_GRACE)
+        if job["status"] == "running":
+            try:
+                os.killpg(job["pid"], signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    async def stop(self):
+        """Stop tracking; running processes are left to finish on their own
+        (their records stay "running" and are picked up again by load())."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._save()
+
+    # --- Reading ---
+
+    def list(self, job_type: str | None = None, limit: int = 20) -> list[dict]:
+        jobs = [self.public(j) for j in self.jobs.values()
+                if job_type is None or j["type"] == job_type]
+        jobs.sort(key=lambda j: j["created_at"], reverse=True)
+        return jobs[:limit]
+
+    @staticmethod
+    def public(job: dict) -> dict:
+        view = {k: v for k, v in job.items() if k != "started_monotonic"}
+        if job["status"] == "running" and job.get("started_monotonic") is not None:
+            view["duration"] = round(time.monotonic() - job["started_monotonic"], 1)
+        return view
+
+    def stats(self) -> dict:
+        running = [j["type"] for j in self.jobs.values() if j["status"] == "running"]
+        queued = [j["type"] for j in self.jobs.values() if j["status"] == "queued"]
+        return {"running": running, "queued": queued, "max_workers": self.max_workers}
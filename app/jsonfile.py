@@ -0,0 +1,65 @@
+"""Locked, atomic file writes shared by the console and the cron scripts.
+
+Writers take an exclusive fcntl lock on a sidecar `.<name>.lock` file, write
+to a temp file in the same directory, fsync it and rename it over the
+target. Readers never see a half-written file and never need the lock.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def lock_path(path: Path) -> Path:
+    return path.parent / f".{path.name}.lock"
+
+
+@contextmanager
+def locked(path: Path):
+    """Hold the exclusive write lock for `path` (blocks until available)."""
+    with open(lock_path(path), "a") as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def write_atomic(path: Path, text: str):
+    """Replace `path` with `text` via temp file + fsync + rename."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode & 0o777)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def write_json(path: Path, data):
+    write_atomic(path, json.dumps(data, indent=2) + "\n")
+
+
+def file_stamp(path: Path) -> tuple | None:
+    """Identity of the file's current contents: changes on every rename or rewrite."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
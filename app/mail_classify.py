@@ -0,0 +1,49 @@
+"""Human vs automated sender classification for mail.
+
+check-mail.py tags every newly indexed message `human` or `automated` by its
+From address, so the console's recent-mail view is a plain notmuch query
+instead of a filter over each result.
+"""
+
+import re
+
+HUMAN_TAG = "human"
+AUTOMATED_TAG = "automated"
+UNCLASSIFIED_QUERY = f"NOT tag:{HUMAN_TAG} AND NOT tag:{AUTOMATED_TAG}"
+
+# Senders matching any of these substrings are automated
+SPAM_PATTERNS = [
+    "noreply@", "no-reply@", "notifications@", "mailer-daemon@",
+    "donotreply@", "updates@", "news@", "newsletter@", "marketing@",
+    "bounce", "daemon",
+]
+SPAM_DOMAINS = [
+    "github.com", "linkedin.com", "substack.com", "stripe.com",
+    "google.com", "googlemail.com", "facebookmail.com", "twitter.com",
+    "amazonses.com", "sendgrid.net", "mailchimp.com", "constantcontact.com",
+]
+
+# One alternation instead of a substring scan per pattern
+AUTOMATED_RE = re.compile("|".join(re.escape(p) for p in SPAM_PATTERNS + SPAM_DOMAINS))
+
+
+def is_automated(sender: str) -> bool:
+    return AUTOMATED_RE.search(sender.lower()) is not None
+
+
+def tag_batch(addresses, upto_revision: int | None = None) -> str:
+    """Input for `notmuch tag --batch` that classifies all unclassified mail.
+
+    Messages from automated addresses are tagged first; everything still
+    unclassified after that is human. upto_revision keeps the final catch-all
+    from tagging mail indexed after the addresses were collected.
+    """
+    lines = []
+    for address in sorted(set(addresses)):
+        if '"' in address or not address.strip():
+            continue
+        if is_automated(address):
+            lines.append(f'+{AUTOMATED_TAG} -- from:"{address}" AND ({UNCLASSIFIED_QUERY})')
+    bound = f" AND lastmod:..{upto_revision}" if upto_revision is not None else ""
+    lines.append(f"+{HUMAN_TAG} -- ({UNCLASSIFIED_QUERY}){bound}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,371 @@
+"""notmuch access for the console.
+
+Two interchangeable backends with the same async methods:
+
+  BindingsBackend  in-process, through the notmuch2 Python bindings. Keeps a
+                   small pool of read-only database handles, reopened when
+                   the database changes, and runs queries on a thread pool.
+  CliBackend       forks `notmuch ... --format=json` per query (the old way).
+
+open_mail_db() picks the bindings when they're installed and the database
+opens, and the CLI otherwise. Both return the same shapes: search results
+look like `notmuch search --format=json` output, show() returns the message
+dicts from thread_cache.parse_messages.
+"""
+
+import asyncio
+import email.parser
+import email.policy
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from pathlib import Path
+
+from thread_cache import parse_messages
+
+try:
+    import notmuch2
+    NOTMUCH2_AVAILABLE = True
+except ImportError:
+    NOTMUCH2_AVAILABLE = False
+
+POOL_SIZE = 4
+STREAM_BATCH = 100
+# Reopen handles at least this often if the Xapian revision file can't be found
+HANDLE_MAX_AGE = 30.0
+XAPIAN_VERSION_FILES = ("iamglass", "iamhoney", "iamchert")
+
+
+def relative_date(then: int, now: float | None = None) -> str:
+    """notmuch's date_relative format: "5 mins. ago", "Today 10:12", "March 03"..."""
+    now = time.time() if now is None else now
+    delta = now - then
+    t = datetime.fromtimestamp(then)
+    if delta < 0:
+        return "the future"
+    if delta > 180 * 86400:
+        return t.strftime("%Y-%m-%d")
+    if delta < 3600:
+        return f"{int(delta // 60)} mins. ago"
+    if delta <= 7 * 86400:
+        today = datetime.fromtimestamp(now).date()
+        if t.date() == today:
+            return t.strftime("Today %H:%M")
+        if (today - t.date()).days == 1:
+            return t.strftime("Yest. %H:%M")
+        return t.strftime("%a. %H:%M")
+    return t.strftime("%B %d")
+
+
+def message_text(path: str) -> str:
+    """text/plain parts of a message file; other parts are never decoded."""
+    try:
+        with open(path, "rb") as f:
+            msg = email.parser.BytesParser(policy=email.policy.default).parse(f)
+    except OSError:
+        return ""
+    parts = []
+    for part in msg.walk():
+        if part.get_content_type() != "text/plain":
+            continue
+        try:
+            parts.append(part.get_content())
+        except (LookupError, ValueError):
+            payload = part.get_payload(decode=True) or b""
+            parts.append(payload.decode(errors="replace"))
+    return "\n".join(parts)
+
+
+class CliBackend:
+    """One `notmuch` process per query, through the console's command layer."""
+
+    name = "cli"
+
+    def __init__(self, run):
+        # run(cmd, timeout=..., request=...) -> stdout, i.e. server.run_cmd
+        self._run = run
+
+    async def revision(self, request=None) -> tuple | None:
+        output = await self._run(["notmuch", "count", "--lastmod", "*"], request=request)
+        try:
+            _, uuid, revision = output.split()
+            return uuid, int(revision)
+        except ValueError:
+            return None
+
+    async def count(self, query: str = "*", request=None) -> int:
+        output = (await self._run(["notmuch", "count", query], timeout=5, request=request)).strip()
+        return int(output) if output.isdigit() else 0
+
+    async def search(self, query: str, limit: int | None = None, offset: int = 0,
+                     newest_first: bool = True, request=None) -> list[dict]:
+        cmd = ["notmuch", "search", "--format=json",
+               f"--sort={'newest-first' if newest_first else 'oldest-first'}"]
+        if limit is not None:
+            cmd.append(f"--limit={limit}")
+        if offset:
+            cmd.append(f"--offset={offset}")
+        output = await self._run(cmd + [query], timeout=15, request=request)
+        try:
+            return json.loads(output)
+        except ValueError:
+            return []
+
+    async def search_iter(self, query: str, limit: int | None = None, offset: int = 0,
+                          newest_first: bool = True, request=None):
+        """Batches of search results. The CLI's output arrives all at once."""
+        results = await self.search(query, limit, offset, newest_first, request=request)
+        for i in range(0, len(results), STREAM_BATCH):
+            yield results[i:i + STREAM_BATCH]
+
+    async def show(self, query: str, bodies: bool = True, entire_thread: bool = True,
+                   request=None) -> list[dict] | None:
+        """Parsed messages, or None if notmuch's output wasn't JSON."""
+        cmd = ["notmuch", "show", "--format=json", f"--entire-thread={str(entire_thread).lower()}"]
+        if not bodies:
+            cmd.append("--body=false")
+        output = await self._run(cmd + [query], timeout=15, request=request)
+        try:
+            return parse_messages(json.loads(output), bodies=bodies)
+        except ValueError:
+            return None
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class BindingsBackend:
+    """Pooled read-only notmuch2 handles, used from a dedicated thread pool.
+
+    A handle sees the database as of when it was opened. Before each use it
+    is compared against the Xapian revision file's mtime and reopened if the
+    database was written since (by `notmuch new` or a tag change).
+    """
+
+    name = "bindings"
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self._executor = ThreadPoolExecutor(pool_size, thread_name_prefix="notmuch")
+        self._handles: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._version_file: Path | None = None
+        self.queries = self.reopens = 0
+        # Open one handle up front so a broken setup fails here, not per request
+        self._handles.put(self._open())
+
+    def _open(self):
+        # Stamp before opening: a write in between then forces a reopen
+        # instead of going unnoticed
+        stamp = self._db_stamp()
+        db = notmuch2.Database(mode=notmuch2.Database.MODE.READ_ONLY)
+        if self._version_file is None:
+            self._version_file = self._find_version_file(Path(str(db.path)))
+            stamp = self._db_stamp()
+        with self._lock:
+            self._opened += 1
+        return db, stamp, time.monotonic()
+
+    @staticmethod
+    def _find_version_file(db_path: Path) -> Path | None:
+        for xapian_dir in (db_path / ".notmuch" / "xapian", db_path / "xapian", db_path):
+            for name in XAPIAN_VERSION_FILES:
+                if (xapian_dir / name).exists():
+                    return xapian_dir / name
+        return None
+
+    def _db_stamp(self):
+        if self._version_file is None:
+            return None
+        try:
+            return self._version_file.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _borrow(self):
+        try:
+            db, stamp, opened_at = self._handles.get_nowait()
+        except queue.Empty:
+            return self._open()
+        current = self._db_stamp()
+        stale = (stamp != current) if current is not None else \
+            time.monotonic() - opened_at > HANDLE_MAX_AGE
+        if stale:
+            db.close()
+            with self._lock:
+                self._opened -= 1
+                self.reopens += 1
+            return self._open()
+        return db, stamp, opened_at
+
+    def _call(self, fn, *args):
+        handle = self._borrow()
+        try:
+            with self._lock:
+                self.queries += 1
+            return fn(handle[0], *args)
+        finally:
+            self._handles.put(handle)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, *args)
+
+    @staticmethod
+    def _exclude_tags(db) -> list[str]:
+        try:
+            return [t for t in db.config.get("search.exclude_tags", "").split(";") if t]
+        except Exception:
+            return []
+
+    @staticmethod
+    def _summary(thread, now: float) -> dict:
+        last = thread.last
+        return {
+            "thread": str(thread.threadid),
+            "timestamp": last,
+            "date_relative": relative_date(last, now),
+            "matched": thread.matched,
+            "total": len(thread),
+            "authors": str(thread.authors or ""),
+            "subject": str(thread.subject or ""),
+            "tags": sorted(str(t) for t in thread.tags),
+        }
+
+    @staticmethod
+    def _message(msg, bodies: bool) -> dict:
+        def header(name):
+            try:
+                return str(msg.header(name))
+            except LookupError:
+                return ""
+
+        result = {
+            "id": str(msg.messageid),
+            "from": header("From"),
+            "to": header("To"),
+            "cc": header("Cc"),
+            "subject": header("Subject"),
+            "date": header("Date"),
+            "timestamp": msg.date,
+            "tags": sorted(str(t) for t in msg.tags),
+        }
+        if bodies:
+            result["body"] = message_text(str(msg.path)) or "(no text content)"
+        return result
+
+    async def revision(self, request=None) -> tuple | None:
+        def fn(db):
+            rev = db.revision()
+            return str(rev.uuid), rev.rev
+        return await self._run(fn)
+
+    async def count(self, query: str = "*", request=None) -> int:
+        return await self._run(lambda db: db.count_messages(query))
+
+    def _iter_threads(self, db, query, limit, offset, newest_first):
+        sort = notmuch2.Database.SORT.NEWEST_FIRST if newest_first else notmuch2.Database.SORT.OLDEST_FIRST
+        now = time.time()
+        threads = db.threads(query, sort=sort, exclude_tags=self._exclude_tags(db))
+        for i, thread in enumerate(threads):
+            if i < offset:
+                continue
+            if limit is not None and i >= offset + limit:
+                break
+            yield self._summary(thread, now)
+
+    async def search(self, query: str, limit: int | None = None, offset: int = 0,
+                     newest_first: bool = True, request=None) -> list[dict]:
+        return await self._run(
+            lambda db: list(self._iter_threads(db, query, limit, offset, newest_first)))
+
+    async def search_iter(self, query: str, limit: int | None = None, offset: int = 0,
+                          newest_first: bool = True, request=None):
+        """Batches of STREAM_BATCH results as the handle produces them.
+
+        The producer runs on the pool and blocks when the consumer falls
+        behind. Iterate inside contextlib.aclosing() so that leaving early
+        stops it right away rather than when the generator is collected.
+        """
+        loop = asyncio.get_running_loop()
+        batches: asyncio.Queue = asyncio.Queue(maxsize=2)
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            pending = asyncio.run_coroutine_threadsafe(batches.put(item), loop)
+            while True:
+                try:
+                    pending.result(timeout=0.1)
+                    return True
+                except FutureTimeout:
+                    if stop.is_set():
+                        pending.cancel()
+                        return False
+
+        def produce(db):
+            try:
+                batch = []
+                for summary in self._iter_threads(db, query, limit, offset, newest_first):
+                    batch.append(summary)
+                    if len(batch) >= STREAM_BATCH:
+                        if not put(batch):
+                            return
+                        batch = []
+                if batch and not put(batch):
+                    return
+                put(done)
+            except Exception as e:
+                put(e)
+
+        future = loop.run_in_executor(self._executor, self._call, produce)
+        try:
+            while True:
+                item = await batches.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            await asyncio.shield(future)
+
+    async def show(self, query: str, bodies: bool = True, entire_thread: bool = True,
+                   request=None) -> list[dict] | None:
+        def fn(db):
+            messages = []
+            if not entire_thread:
+                for msg in db.messages(query):
+                    messages.append(self._message(msg, bodies))
+                return messages
+            for thread in db.threads(query, sort=notmuch2.Database.SORT.OLDEST_FIRST):
+                # Depth-first, replies after their parent, like `notmuch show`
+                stack = list(reversed(list(thread.toplevel())))
+                while stack:
+                    msg = stack.pop()
+                    messages.append(self._message(msg, bodies))
+                    stack.extend(reversed(list(msg.replies())))
+            return messages
+        return await self._run(fn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": self.name, "pool_size": self.pool_size,
+                    "open_handles": self._opened, "queries": self.queries,
+                    "reopens": self.reopens}
+
+
+def open_mail_db(run, use_bindings: bool = True):
+    """The bindings backend if notmuch2 is installed and the database opens,
+    else the CLI backend (run is the console's run_cmd)."""
+    if use_bindings and NOTMUCH2_AVAILABLE:
+        try:
+            return BindingsBackend()
+        except Exception:
+            pass
+    return CliBackend(run)
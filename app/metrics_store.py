@@ -0,0 +1,166 @@
+"""Run history for sync, backup and check-mail (SQLite, append-only).
+
+One row per run of a thing: a sync source, a backup root, a check-mail
+cycle. Each row has a start time, duration, status, bytes and items, plus
+an `extra` JSON object for anything kind-specific. The scripts append a
+row as each run finishes; the console reads series back, downsampled into
+time buckets in SQL, so a chart of a year of check-mail cycles is a few
+hundred points rather than the rows themselves.
+
+Rows older than RETENTION_DAYS are pruned by writers, at most once a day.
+The row count is kept in `meta` (bumped with each insert, recounted when
+pruning), so the console's status poll never counts the table.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+RETENTION_DAYS = 400
+PRUNE_EVERY = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,        -- sync, backup, check-mail
+    name TEXT NOT NULL,        -- source, root or mode (google-drive, private/notes, daemon...)
+    started_at INTEGER NOT NULL,
+    duration REAL,
+    status TEXT,               -- ok, error, skipped
+    bytes INTEGER,
+    items INTEGER,             -- files transferred, threads processed...
+    extra TEXT                 -- JSON: anything kind-specific
+);
+CREATE INDEX IF NOT EXISTS runs_series ON runs(kind, name, started_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs(started_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Numeric columns a series can be read for; "count" is runs per bucket
+FIELDS = {"duration", "bytes", "items", "count", "errors"}
+
+
+class MetricsStore:
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._stats: dict | None = None
+        self._stats_version = None
+        self._transaction(lambda: self._db.execute(
+            "INSERT OR IGNORE INTO meta (key, value) SELECT 'runs', COUNT(*) FROM runs"))
+
+    def _transaction(self, func):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                func()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._stats = None
+
+    # --- Writing ---
+
+    def record(self, kind: str, name: str, started_at: float, duration: float | None = None,
+               status: str | None = None, bytes: int | None = None, items: int | None = None,
+               **extra):
+        extra = {k: v for k, v in extra.items() if v is not None}
+
+        def insert():
+            self._db.execute(
+                "INSERT INTO runs (kind, name, started_at, duration, status, bytes, items, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, name, int(started_at), duration, status, bytes, items,
+                 json.dumps(extra) if extra else None))
+            self._db.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'runs'")
+
+        self._transaction(insert)
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        now = int(time.time())
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'pruned_at'").fetchone()
+        if row and now - int(row[0]) < PRUNE_EVERY:
+            return
+
+        def prune():
+            self._db.execute("DELETE FROM runs WHERE started_at < ?",
+                             (now - RETENTION_DAYS * 86400,))
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pruned_at', ?)",
+                             (str(now),))
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) "
+                             "SELECT 'runs', COUNT(*) FROM runs")
+
+        self._transaction(prune)
+
+    # --- Reading ---
+
+    def catalog(self) -> list[dict]:
+        """Every (kind, name) series with its run count and time span."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, name, COUNT(*), MIN(started_at), MAX(started_at) FROM runs "
+                "GROUP BY kind, name ORDER BY kind, name").fetchall()
+        return [{"kind": k, "name": n, "runs": c, "first": f, "last": l} for k, n, c, f, l in rows]
+
+    def series(self, kind: str, field: str, since: int, until: int | None = None,
+               name: str | None = None, points: int = 120) -> dict:
+        """Per-name buckets of `field` between since and until, at most
+        `points` buckets each: [bucket start, avg, min, max, sum, runs].
+        Raises ValueError for an unknown field."""
+        if field not in FIELDS:
+            raise ValueError(f"field must be one of: {sorted(FIELDS)}")
+        until = until or int(time.time())
+        bucket = max(60, -(-(until - since) // max(1, points)))
+        value = {"count": "1", "errors": "status = 'error'"}.get(field, field)
+        sql = (f"SELECT name, (started_at - ?) / ? AS b, AVG({value}), MIN({value}), MAX({value}), "
+               f"SUM({value}), COUNT(*) FROM runs WHERE kind = ? AND started_at >= ? AND started_at <= ?")
+        params: list = [since, bucket, kind, since, until]
+        if name:
+            sql += " AND name = ?"
+            params.append(name)
+        sql += " GROUP BY name, b ORDER BY name, b"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        out: dict[str, list] = {}
+        for n, b, avg, lo, hi, total, runs in rows:
+            out.setdefault(n, []).append(
+                [since + b * bucket, round(avg, 2) if avg is not None else None, lo, hi, total, runs])
+        return {"kind": kind, "field": field, "since": since, "until": until,
+                "bucket_seconds": bucket, "series": out}
+
+    def recent(self, kind: str, name: str, limit: int = 20, status: str | None = None) -> list[dict]:
+        """The last `limit` runs of one series, oldest first."""
+        sql = ("SELECT started_at, duration, status, bytes, items, extra FROM runs "
+               "WHERE kind = ? AND name = ?")
+        params: list = [kind, name]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [{"at": at, "duration": d, "status": s, "bytes": b, "items": i,
+                 **(json.loads(e) if e else {})} for at, d, s, b, i, e in reversed(rows)]
+
+    def stats(self) -> dict:
+        """Run count and latest run, re-read only after a write (data_version
+        moves when another connection, e.g. a script, commits)."""
+        with self._lock:
+            version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            if self._stats is None or version != self._stats_version:
+                runs = self._db.execute("SELECT value FROM meta WHERE key = 'runs'").fetchone()
+                last = self._db.execute("SELECT MAX(started_at) FROM runs").fetchone()[0]
+                self._stats = {"runs": int(runs[0]) if runs else 0, "last_run_at": last}
+                self._stats_version = version
+            return dict(self._stats)
@@ -0,0 +1,183 @@
+"""Server-push events for the dashboard, plus per-device notification state.
+
+Notifier fans events out to any number of subscribers (one queue each) and
+keeps a short history so a reconnecting client can resume from its
+Last-Event-ID. Events come from watched files: each path has a handler that
+turns "this file changed" into events. The console's own write paths call
+changed(path) right after writing, so their events go out immediately;
+files written by other processes (check-mail.py, triage-email.py) are
+picked up by a stat poll every `poll` seconds.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from jsonfile import file_stamp, locked, write_json
+
+HISTORY = 200
+QUEUE_SIZE = 100
+POLL_INTERVAL = 0.5
+
+
+class Notifier:
+    def __init__(self, history: int = HISTORY, poll: float = POLL_INTERVAL):
+        self.poll = poll
+        # Ids are "<boot>-<n>": a client resuming against a restarted console
+        # doesn't match the boot and gets a fresh snapshot instead
+        self.boot = uuid.uuid4().hex[:6]
+        self._seq = 0
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: set[asyncio.Queue] = set()
+        self._watches: dict[Path, list] = {}  # path -> [handler, stamp]
+        self._check_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.published = self.dropped = 0
+        self.last_error = None
+
+    # --- Events ---
+
+    def publish(self, event: str, data) -> str:
+        self._seq += 1
+        event_id = f"{self.boot}-{self._seq}"
+        item = (event_id, event, data)
+        self._history.append(item)
+        self.published += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Too far behind: end its stream; the client reconnects and
+                # resumes from history (or a fresh snapshot)
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.dropped += 1
+        return event_id
+
+    def since(self, last_id: str | None) -> list | None:
+        """Events after last_id, or None if they're no longer all in history."""
+        if not last_id:
+            return None
+        boot, _, seq = last_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq:
+            return None
+        if seq == self._seq:
+            return []
+        if not self._history or int(self._history[0][0].split("-")[1]) > seq + 1:
+            return None
+        return [e for e in self._history if int(e[0].split("-")[1]) > seq]
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    # --- Watched files ---
+
+    def watch(self, path: Path, handler: Callable):
+        """handler(path) runs in a worker thread whenever path changes and
+        returns a list of (event, data) to publish."""
+        self._watches[path] = [handler, file_stamp(path)]
+
+    async def changed(self, path: Path):
+        """Check path now; write paths call this right after writing."""
+        async with self._check_lock:
+            await self._check(path)
+
+    async def _check(self, path: Path):
+        watch = self._watches[path]
+        stamp = file_stamp(path)
+        if stamp == watch[1]:
+            return
+        watch[1] = stamp
+        try:
+            events = await asyncio.to_thread(watch[0], path)
+        except Exception as e:
+            self.last_error = f"{path.name}: {e}"
+            return
+        for event, data in events or []:
+            self.publish(event, data)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.poll)
+            async with self._check_lock:
+                for path in self._watches:
+                    await self._check(path)
+
+    def start(self):
+        # Prime the handlers so the first real change is diffed against now
+        for path, watch in self._watches.items():
+            try:
+                watch[0](path)
+            except Exception as e:
+                self.last_error = f"{path.name}: {e}"
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for queue in list(self._subscribers):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self._subscribers.clear()
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "published": self.published,
+                "dropped": self.dropped, "watched": len(self._watches),
+                "last_error": self.last_error}
+
+
+class SeenState:
+    """Per-device last-seen timestamps, in one small JSON file.
+
+    {"devices": {"<device id>": "<iso time>"}, "last_seen": "<iso time>"}
+    The top-level last_seen is the old single-device value; devices that
+    haven't marked anything seen yet start from it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            state = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            state = {}
+        state.setdefault("devices", {})
+        state.setdefault("last_seen", None)
+        return state
+
+    def get(self, device: str | None) -> str | None:
+        with self._lock:
+            state = self._load()
+        if device and device in state["devices"]:
+            return state["devices"][device]
+        return state["last_seen"]
+
+    def mark(self, device: str | None) -> str:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, locked(self.path):
+            state = self._load()
+            if device:
+                state["devices"][device] = now
+            else:
+                state["last_seen"] = now
+            write_json(self.path, state)
+        return now
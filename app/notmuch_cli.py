@@ -0,0 +1,35 @@
+"""notmuch command-line helpers shared by check-mail.py and triage-email.py."""
+
+import subprocess
+
+
+def notmuch_revision():
+    """Return (database uuid, lastmod revision), or (None, None) if unavailable."""
+    try:
+        result = subprocess.run(
+            ["notmuch", "count", "--lastmod", "*"],
+            capture_output=True, text=True, timeout=30
+        )
+        _, uuid, revision = result.stdout.split()
+        return uuid, int(revision)
+    except (ValueError, OSError, subprocess.TimeoutExpired):
+        return None, None
+
+
+def parse_from_header(from_header):
+    """Split a From: header into (email, display name)."""
+    if "<" in from_header and ">" in from_header:
+        email = from_header.split("<")[1].split(">")[0].lower()
+        name = from_header.split("<")[0].strip().strip('"')
+        return email, name
+    return from_header.lower(), from_header
+
+
+def message_ids(query):
+    """Message ids from a summary's `query` field, e.g. 'id:a or id:"b c"'."""
+    ids = []
+    for term in (query or "").split(" or "):
+        term = term.strip()
+        if term.startswith("id:"):
+            ids.append(term[3:].strip('"'))
+    return ids
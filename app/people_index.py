@@ -0,0 +1,401 @@
+"""Indexes of the relationships repo.
+
+PeopleIndex maps email/phone -> person slug. It is stored in SQLite so
+check-mail.py and the console share one copy. PeopleDirectory is the
+console's in-memory copy of everyone's fields and README for search.
+Both only re-read people whose markdown files changed since the last
+refresh.
+"""
+
+import bisect
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{5,}\d")
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS people (
+    slug TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contacts (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    slug TEXT NOT NULL REFERENCES people(slug) ON DELETE CASCADE,
+    PRIMARY KEY (kind, value, slug)
+);
+CREATE INDEX IF NOT EXISTS contacts_slug ON contacts(slug);
+"""
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def normalize_phone(phone: str) -> str | None:
+    """Digits only, keyed on the last 10 so +1 (555) 010-0000 matches 555.010.0000."""
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) < 10:
+        return None
+    return digits[-10:]
+
+
+def _fingerprint(person_dir: Path) -> str | None:
+    """mtimes of the person's markdown files; changes whenever any of them is edited."""
+    parts = []
+    try:
+        with os.scandir(person_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".md") and entry.is_file():
+                    parts.append(f"{entry.name}:{entry.stat().st_mtime_ns}")
+    except OSError:
+        return None
+    return "|".join(sorted(parts))
+
+
+def parse_contacts(text: str) -> set[tuple[str, str]]:
+    found = {("email", normalize_email(m)) for m in EMAIL_RE.findall(text)}
+    for m in PHONE_RE.findall(text):
+        if DATE_RE.match(m):
+            continue
+        phone = normalize_phone(m)
+        if phone:
+            found.add(("phone", phone))
+    return found
+
+
+class PeopleIndex:
+    def __init__(self, people_dir: Path, db_path: Path):
+        self.people_dir = people_dir
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def refresh(self) -> dict:
+        """Re-index people whose files changed; drop people that were removed."""
+        if not self.people_dir.exists():
+            return {"changed": 0, "removed": 0}
+        current = {}
+        with os.scandir(self.people_dir) as it:
+            for entry in it:
+                if entry.is_dir() and not entry.name.startswith("."):
+                    fp = _fingerprint(Path(entry.path))
+                    if fp is not None:
+                        current[entry.name] = fp
+
+        with self._lock:
+            known = dict(self._db.execute("SELECT slug, fingerprint FROM people"))
+            changed = [slug for slug, fp in current.items() if known.get(slug) != fp]
+            removed = [slug for slug in known if slug not in current]
+            if not changed and not removed:
+                return {"changed": 0, "removed": 0}
+
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for slug in removed:
+                    self._db.execute("DELETE FROM people WHERE slug = ?", (slug,))
+                for slug in changed:
+                    person_dir = self.people_dir / slug
+                    text = ""
+                    for md in sorted(person_dir.glob("*.md")):
+                        try:
+                            text += md.read_text(errors="replace") + "\n"
+                        except OSError:
+                            pass
+                    self._db.execute(
+                        "INSERT INTO people (slug, fingerprint) VALUES (?, ?) "
+                        "ON CONFLICT(slug) DO UPDATE SET fingerprint = excluded.fingerprint",
+                        (slug, current[slug]))
+                    self._db.execute("DELETE FROM contacts WHERE slug = ?", (slug,))
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO contacts (kind, value, slug) VALUES (?, ?, ?)",
+                        [(kind, value, slug) for kind, value in parse_contacts(text)])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return {"changed": len(changed), "removed": len(removed)}
+
+    def _lookup(self, kind: str, value: str | None) -> list[str]:
+        if not value:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT slug FROM contacts WHERE kind = ? AND value = ? ORDER BY slug",
+                (kind, value)).fetchall()
+        return [r[0] for r in rows]
+
+    def lookup_email(self, email: str) -> list[str]:
+        return self._lookup("email", normalize_email(email) if email else None)
+
+    def lookup_phone(self, phone: str) -> list[str]:
+        return self._lookup("phone", normalize_phone(phone) if phone else None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            people = self._db.execute("SELECT COUNT(*) FROM people").fetchone()[0]
+            counts = dict(self._db.execute("SELECT kind, COUNT(*) FROM contacts GROUP BY kind"))
+        return {"people": people, "emails": counts.get("email", 0), "phones": counts.get("phone", 0)}
+
+
+# --- In-memory directory for the console's people search ---
+
+HEADING_RE = re.compile(r"^#\s+(.+?)\s*$", re.MULTILINE)
+FIELD_RE = re.compile(r"\*\*(Context|Aliases|Also known as|Nicknames?):\*\*\s*(.+)", re.IGNORECASE)
+WORD_RE = re.compile(r"[\w@.+-]+")
+# Minimum trigram similarity (Jaccard) for a fuzzy match
+FUZZY_THRESHOLD = 0.3
+
+
+def _trigrams(text: str) -> frozenset[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _inner_trigrams(text: str) -> set[str]:
+    """Unpadded trigrams: every substring of text (3+ chars) has all of its own."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_person(slug: str, text: str) -> dict:
+    """Structured fields from a person's markdown (README.md first)."""
+    heading = HEADING_RE.search(text)
+    name = heading.group(1).strip() if heading else slug.replace("-", " ").title()
+    context, aliases = "", []
+    for field, value in FIELD_RE.findall(text):
+        value = value.split("|")[0].strip()
+        if field.lower() == "context":
+            context = context or value
+        else:
+            aliases += [a.strip() for a in value.split(",") if a.strip()]
+    contacts = parse_contacts(text)
+    return {
+        "slug": slug,
+        "name": name,
+        "aliases": aliases,
+        "emails": sorted(v for k, v in contacts if k == "email"),
+        "phones": sorted(v for k, v in contacts if k == "phone"),
+        "context": context,
+    }
+
+
+class PeopleDirectory:
+    """All people in memory, searchable by name, alias, email, phone and context.
+
+    refresh() re-reads only people whose markdown files changed (the same
+    fingerprint PeopleIndex uses); the console runs it in the background, so
+    searches never touch the disk. readme() re-checks the one person it
+    returns. Search ranks exact and prefix matches on names and aliases
+    first, then other prefixes, then substrings, then fuzzy (trigram)
+    matches for typos.
+    """
+
+    def __init__(self, people_dir: Path):
+        self.people_dir = people_dir
+        self._people: dict[str, dict] = {}
+        self._readmes: dict[str, str | None] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._terms: dict[str, list] = {}            # slug -> [(text, trigrams)]
+        self._words: list[tuple[str, str]] = []       # sorted (word, slug)
+        self._grams: dict[str, set[str]] = {}         # trigram -> slugs
+        self._inner: dict[str, set[str]] = {}         # slug -> inner trigrams of its fields
+        self._substr: dict[str, set[str]] = {}        # inner trigram -> slugs
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    # --- Loading ---
+
+    def refresh(self) -> dict:
+        """Re-read changed people, drop removed ones."""
+        current = {}
+        if self.people_dir.exists():
+            with os.scandir(self.people_dir) as it:
+                for entry in it:
+                    if entry.is_dir() and not entry.name.startswith("."):
+                        fp = _fingerprint(Path(entry.path))
+                        if fp is not None:
+                            current[entry.name] = fp
+        with self._lock:
+            self._loaded = True
+            changed = [s for s, fp in current.items() if self._fingerprints.get(s) != fp]
+            removed = [s for s in self._fingerprints if s not in current]
+            for slug in removed:
+                for d in (self._people, self._readmes, self._fingerprints, self._terms,
+                          self._inner):
+                    d.pop(slug, None)
+            for slug in changed:
+                self._load(slug, current[slug])
+            if changed or removed:
+                self._reindex()
+                self.reloads += 1
+        return {"changed": len(changed), "removed": len(removed)}
+
+    def _load(self, slug: str, fingerprint: str):
+        person_dir = self.people_dir / slug
+        readme = person_dir / "README.md"
+        texts, mtime, readme_text = [], 0, None
+        for md in sorted(person_dir.glob("*.md"), key=lambda p: p != readme):
+            try:
+                text = md.read_text(errors="replace")
+                mtime = max(mtime, md.stat().st_mtime)
+            except OSError:
+                continue
+            texts.append(text)
+            if md == readme:
+                readme_text = text
+        person = parse_person(slug, "\n".join(texts))
+        person["modified"] = int(mtime)
+        self._people[slug] = person
+        self._readmes[slug] = readme_text
+        self._fingerprints[slug] = fingerprint
+        terms = {}
+        for field in [person["name"], slug.replace("-", " "), *person["aliases"],
+                      *person["emails"], *person["phones"]]:
+            field = field.lower()
+            for text in (field, *field.split()):
+                terms[text] = _trigrams(text)
+        self._terms[slug] = list(terms.items())
+        inner = set()
+        for field in [person["name"], *person["aliases"], *person["emails"], *person["phones"],
+                      person["context"]]:
+            inner |= _inner_trigrams(field.lower())
+        self._inner[slug] = inner
+
+    def _reindex(self):
+        words, grams = [], {}
+        for slug, terms in self._terms.items():
+            for text, text_grams in terms:
+                if " " not in text:
+                    words.append((text, slug))
+                for gram in text_grams:
+                    grams.setdefault(gram, set()).add(slug)
+        substr = {}
+        for slug, inner in self._inner.items():
+            for gram in inner:
+                substr.setdefault(gram, set()).add(slug)
+        words.sort()
+        self._words, self._grams, self._substr = words, grams, substr
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    # --- Reading ---
+
+    def get(self, slug: str) -> dict | None:
+        self._ensure_loaded()
+        with self._lock:
+            person = self._people.get(slug)
+            return dict(person) if person else None
+
+    def readme(self, slug: str) -> str | None:
+        """The person's README.md text, or None if there isn't one."""
+        self._ensure_loaded()
+        if "/" in slug or slug.startswith("."):
+            return None
+        fp = _fingerprint(self.people_dir / slug)
+        with self._lock:
+            if fp != self._fingerprints.get(slug):
+                if fp is None:
+                    return None
+                self._load(slug, fp)
+                self._reindex()
+            return self._readmes.get(slug)
+
+    def _score(self, slug: str, q: str, q_grams: frozenset) -> float:
+        p = self._people[slug]
+        names = [p["name"].lower(), *(a.lower() for a in p["aliases"])]
+        if q in names:
+            return 100
+        if any(n.startswith(q) for n in names):
+            return 90
+        words = [w for n in names for w in n.split()]
+        if any(w.startswith(q) for w in words):
+            return 80
+        if " " in q and all(any(w.startswith(t) for w in words) for t in q.split()):
+            return 75
+        digits = re.sub(r"\D", "", q)
+        if any(f.startswith(q) for f in [*p["emails"], p["slug"]]) or \
+                (len(digits) >= 3 and any(digits in ph for ph in p["phones"])):
+            return 70
+        if any(q in n for n in names):
+            return 60
+        if q in p["context"].lower() or any(q in e for e in p["emails"]):
+            return 40
+        best = max((len(q_grams & g) / len(q_grams | g) for _, g in self._terms[slug]), default=0)
+        return round(30 * best, 1) if best >= FUZZY_THRESHOLD else 0
+
+    def _substring_candidates(self, text: str) -> set[str]:
+        """People who might contain text (3+ chars) in a name, alias, email,
+        phone or context: those having every one of its inner trigrams."""
+        grams = _inner_trigrams(text)
+        if not grams:
+            return set()
+        postings = sorted((self._substr.get(g, set()) for g in grams), key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    def search(self, q: str = "", offset: int = 0, limit: int = 50) -> dict:
+        """{"total", "people": [...]} ranked by match quality, then name."""
+        self._ensure_loaded()
+        q = " ".join(q.lower().split())
+        with self._lock:
+            if not q:
+                ranked = sorted(self._people.values(), key=lambda p: p["name"].lower())
+                return {"total": len(ranked), "people": [dict(p) for p in ranked[offset:offset + limit]]}
+
+            # Candidates: word-prefix hits, people sharing enough trigrams to
+            # possibly pass FUZZY_THRESHOLD, and possible substring matches in
+            # names, aliases, emails, phones and context
+            digits = re.sub(r"\D", "", q)
+            if len(digits) >= 3 and not re.search(r"[^\d\s().+-]", q):
+                # A phone number: substring match on digits only, no fuzzing
+                matched = [(self._people[s]["name"].lower(), s)
+                           for s in self._substring_candidates(digits)
+                           if any(digits in ph for ph in self._people[s]["phones"])]
+                matched.sort()
+                page = [{**self._people[s], "score": 70} for _, s in matched[offset:offset + limit]]
+                return {"total": len(matched), "people": page}
+
+            candidates = set()
+            for n, token in enumerate(q.split()):
+                prefixed = set()
+                i = bisect.bisect_left(self._words, (token,))
+                while i < len(self._words) and self._words[i][0].startswith(token):
+                    prefixed.add(self._words[i][1])
+                    i += 1
+                candidates = prefixed if n == 0 else candidates & prefixed
+            q_grams = _trigrams(q)
+            hits: dict[str, int] = {}
+            for gram in q_grams:
+                for slug in self._grams.get(gram, ()):
+                    hits[slug] = hits.get(slug, 0) + 1
+            needed = FUZZY_THRESHOLD * len(q_grams)
+            candidates.update(s for s, n in hits.items() if n >= needed)
+            candidates |= self._substring_candidates(q)
+            if len(digits) >= 3:
+                candidates |= self._substring_candidates(digits)
+
+            scored = []
+            for slug in candidates:
+                score = self._score(slug, q, q_grams)
+                if score:
+                    scored.append((-score, self._people[slug]["name"].lower(), slug))
+            scored.sort()
+            page = [{**self._people[slug], "score": -s} for s, _, slug in scored[offset:offset + limit]]
+            return {"total": len(scored), "people": page}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"people": len(self._people), "words": len(self._words),
+                    "trigrams": len(self._grams), "reloads": self.reloads}
@@ -2,19 +2,42 @@
 """Archive Console — personal command center for your digital life archive."""
 
 import asyncio
+import hashlib
 import json
 import os
 import re
 import shutil
-import subprocess
+import time
 import uuid
+from contextlib import aclosing, asynccontextmanager, suppress
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 
 from fastapi import FastAPI, Request, Response, HTTPException, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
+import commands
+from actions_store import ActionsStore
+from collector import StatusCollector
+from commands import CommandCancelled
+from coordination_index import CoordinationIndex
+from drafts import DraftStats, build_prompt
+from file_index import FileIndex
+from file_reader import LineReader
+from git_writer import GitWriter
+from jobs import JobRunner
+from jsonfile import file_stamp, write_atomic
+from mail_db import open_mail_db
+from mail_classify import HUMAN_TAG
+from metrics_store import MetricsStore
+from notifier import Notifier, SeenState
+from people_index import PeopleDirectory, PeopleIndex
+from thread_cache import ThreadCache
+from triage_store import STATUSES as TRIAGE_STATUSES, TriageStore
+from tree_index import TreeIndex
+
 try:
     import anthropic
     ANTHROPIC_AVAILABLE = True
@@ -25,14 +48,146 @@ APP_DIR = Path(__file__).parent
 ARCHIVE_DIR = APP_DIR.parent
 ACTIONS_FILE = ARCHIVE_DIR / "coordination" / "next-actions.json"
 TRIAGE_FILE = ARCHIVE_DIR / "docs" / "communication-triage.json"
+PEOPLE_DIR = ARCHIVE_DIR / "private" / "relationships" / "people"
+CACHE_DIR = ARCHIVE_DIR / ".cache"
+CHECK_MAIL_HEALTH = CACHE_DIR / "check-mail-health.json"
+BACKUP_STATUS_FILE = CACHE_DIR / "backup-status.json"
+BACKUP_TREND_RUNS = 14
+# Run history written by sync-all.py, backup.py and check-mail.py
+METRICS_DB = CACHE_DIR / "metrics.sqlite"
+METRICS_DEFAULT_DAYS = 30
+METRICS_MAX_POINTS = 500
+NOTIFICATION_STATE_FILE = APP_DIR / ".notification-state.json"
 TOKEN_FILE = APP_DIR / "auth_token"
 AUTH_TOKEN = TOKEN_FILE.read_text().strip()
 COOKIE_NAME = "archive_session"
 
+# Dashboard edits are committed in batches: after GIT_BATCH_WINDOW seconds
+# of collecting, or as soon as GIT_BATCH_MAX changes are queued.
+GIT_BATCH_WINDOW = 5.0
+GIT_BATCH_MAX = 50
+
+# /api/files returns content inline below this size; larger files are
+# served through /api/files/raw (ranges) and /api/files/lines (paged text).
+INLINE_MAX_BYTES = 100_000
+LISTING_PAGE_SIZE = 200
+CONTACTS_PAGE_SIZE = 50
+QUEUE_PAGE_SIZE = 50
+TEXT_EXTENSIONS = {".md", ".txt", ".json", ".csv", ".log", ".yaml", ".yml", ".sh", ".py", ".html"}
+
+# CONFIGURE: Query notmuch in-process through the notmuch2 bindings when
+# they're installed (falls back to the notmuch CLI either way)
+NOTMUCH_BINDINGS = True
+
+# Email search pages are cached until `notmuch new` (or a tag change) moves
+# the database revision, and for at most SEARCH_CACHE_TTL seconds.
+SEARCH_PAGE_SIZE = 50
+SEARCH_CACHE_TTL = 60
+SEARCH_CACHE_BYTES = 8 * 1024 * 1024
+
+# Draft replies: model, completion length, and the cache of finished drafts
+# (keyed by thread revision and relationship README hash)
+DRAFT_MODEL = "claude-sonnet-4-20250514"
+DRAFT_MAX_TOKENS = 1500
+DRAFT_CACHE_BYTES = 4 * 1024 * 1024
+
+# Triage status changes go to a journal that is folded into TRIAGE_FILE
+# (and committed) every TRIAGE_COMPACT_INTERVAL seconds and on shutdown.
+TRIAGE_JOURNAL = CACHE_DIR / "triage-journal.jsonl"
+TRIAGE_COMPACT_INTERVAL = 60
+
+# Completed coordination sessions are moved to coordination/archive/ (and
+# committed) every SESSION_ARCHIVE_INTERVAL seconds
+SESSION_ARCHIVE_INTERVAL = 10 * 60
+
+# Notification stream: idle connections get a comment line this often
+# (keeps proxies from timing them out and notices clients that went away)
+NOTIFY_KEEPALIVE = 25
+
+# Background jobs: one of each type at a time, at most JOB_WORKERS running.
+# Records are kept in TASKS and persisted to JOBS_FILE; output in JOBS_LOG_DIR.
+VENV_PYTHON = ARCHIVE_DIR / ".venv" / "bin" / "python"
+PYTHON_BIN = str(VENV_PYTHON) if VENV_PYTHON.exists() else "python3"
+JOB_TYPES = {
+    "triage": [PYTHON_BIN, str(ARCHIVE_DIR / "scripts" / "triage-email.py")],
+    # Run through bash: the shell scripts aren't committed as executable
+    "sync": ["bash", str(ARCHIVE_DIR / "sync-all.sh")],
+    "backup": ["bash", str(ARCHIVE_DIR / "backup.sh")],
+}
+JOB_WORKERS = 2
+JOBS_FILE = CACHE_DIR / "jobs.json"
+JOBS_LOG_DIR = CACHE_DIR / "jobs"
+JOB_LOG_POLL = 0.5
+
 # Background task storage
 TASKS: dict[str, dict] = {}
 
-app = FastAPI(title="Archive Console", docs_url=None, redoc_url=None)
+job_runner = JobRunner(TASKS, JOB_TYPES, JOBS_FILE, JOBS_LOG_DIR, str(ARCHIVE_DIR),
+                       max_workers=JOB_WORKERS)
+
+git_writer = GitWriter(str(ARCHIVE_DIR), window=GIT_BATCH_WINDOW, max_batch=GIT_BATCH_MAX)
+notifier = Notifier()
+seen_state = SeenState(NOTIFICATION_STATE_FILE)
+
+
+async def compact_triage():
+    entries = await asyncio.to_thread(triage_store.compact)
+    for e in entries:
+        git_writer.submit([str(TRIAGE_FILE)], f"Triage: mark {e['id']} as {e['status']}")
+
+
+async def triage_compactor():
+    while True:
+        await asyncio.sleep(TRIAGE_COMPACT_INTERVAL)
+        try:
+            await compact_triage()
+        except Exception as e:
+            triage_store.last_error = f"compact: {e}"
+
+
+async def archive_sessions():
+    """Move completed sessions into coordination/archive/ and commit the
+    moves. Only sessions git tracks are submitted: a path git has never
+    seen fails `git add`, and with it the commit."""
+    moved = await asyncio.to_thread(coordination.archive_completed)
+    if not moved:
+        return
+    r = await commands.run(["git", "ls-files", "-z", "--", *(str(src) for src, _ in moved)],
+                           cwd=str(ARCHIVE_DIR), timeout=30)
+    tracked = {(ARCHIVE_DIR / p).resolve() for p in r.stdout.split("\0") if p} if r.ok else set()
+    files = [str(p) for src, dest in moved if src.resolve() in tracked for p in (src, dest)]
+    if files:
+        git_writer.submit(files, "Archive completed sessions")
+
+
+async def session_archiver():
+    while True:
+        await asyncio.sleep(SESSION_ARCHIVE_INTERVAL)
+        try:
+            await archive_sessions()
+        except Exception as e:
+            coordination.last_error = f"archive: {e}"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    git_writer.start()
+    status_collector.start()
+    job_runner.load()
+    notifier.start()
+    compactor = asyncio.create_task(triage_compactor())
+    archiver = asyncio.create_task(session_archiver())
+    yield
+    compactor.cancel()
+    archiver.cancel()
+    await compact_triage()
+    await notifier.stop()
+    await job_runner.stop()
+    await status_collector.stop()
+    await git_writer.stop()
+
+
+app = FastAPI(title="Archive Console", docs_url=None, redoc_url=None, lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=APP_DIR / "static"), name="static")
 
 
@@ -54,41 +209,47 @@ def require_auth(request: Request):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
-def run_cmd(cmd: list[str], timeout: int = 10) -> str:
-    try:
-        r = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        return r.stdout + r.stderr
-    except subprocess.TimeoutExpired:
-        return "(timed out)"
-    except FileNotFoundError:
-        return f"(command not found: {cmd[0]})"
+@app.exception_handler(CommandCancelled)
+async def command_cancelled(request: Request, exc: CommandCancelled):
+    # Client closed the connection; nobody is reading this response.
+    return Response(status_code=499)
 
 
-def git_commit_push(files: list[str], message: str):
-    """Git add, commit, and push specified files."""
+async def run_cmd(cmd: list[str], timeout: int = 10, request: Request | None = None) -> str:
+    """Run a command on the async execution layer. Passing the request kills
+    the process if the client disconnects."""
     try:
-        for f in files:
-            subprocess.run(["git", "add", f], cwd=str(ARCHIVE_DIR),
-                           timeout=10, capture_output=True)
-        subprocess.run(["git", "commit", "-m", message], cwd=str(ARCHIVE_DIR),
-                       timeout=15, capture_output=True)
-        subprocess.run(["git", "push"], cwd=str(ARCHIVE_DIR),
-                       timeout=30, capture_output=True)
-    except Exception:
-        pass
+        r = await commands.run(cmd, timeout=timeout,
+                               is_disconnected=request.is_disconnected if request else None)
+    except FileNotFoundError:
+        return f"(command not found: {cmd[0]})"
+    if r.timed_out:
+        return "(timed out)"
+    return r.stdout + r.stderr
 
 
-def load_actions() -> dict:
-    """Load next-actions.json."""
-    if ACTIONS_FILE.exists():
-        return json.loads(ACTIONS_FILE.read_text())
-    return {"actions": []}
+actions_store = ActionsStore(ACTIONS_FILE)
+triage_store = TriageStore(TRIAGE_FILE, TRIAGE_JOURNAL)
+people_index = PeopleIndex(PEOPLE_DIR, CACHE_DIR / "people-index.sqlite")
+people_directory = PeopleDirectory(PEOPLE_DIR)
+coordination = CoordinationIndex(ARCHIVE_DIR / "coordination")
+file_index = FileIndex(ARCHIVE_DIR, CACHE_DIR / "file-index.sqlite")
+line_reader = LineReader()
+thread_cache = ThreadCache()
+draft_cache = ThreadCache(DRAFT_CACHE_BYTES)
+draft_stats = DraftStats()
+mail_db = open_mail_db(run_cmd, use_bindings=NOTMUCH_BINDINGS)
+search_cache = ThreadCache(max_bytes=SEARCH_CACHE_BYTES)
+tree_index = TreeIndex(CACHE_DIR / "tree-index.sqlite")
+# Separate connection for the data_sizes probe's tree walks, so listings
+# aren't queued behind it.
+tree_walker = TreeIndex(CACHE_DIR / "tree-index.sqlite")
+metrics = MetricsStore(METRICS_DB)
 
 
-def save_actions(data: dict, message: str = "Update next-actions"):
-    """Save next-actions.json and git commit+push."""
-    ACTIONS_FILE.write_text(json.dumps(data, indent=2) + "\n")
-    git_commit_push([str(ACTIONS_FILE)], message)
+def commit_actions(message: str = "Update next-actions"):
+    """Queue a git commit+push of next-actions.json."""
+    git_writer.submit([str(ACTIONS_FILE)], message)
 
 
 # --- Auth ---
@@ -131,141 +292,292 @@ async def dashboard(request: Request):
 
 # --- API: Status ---
 
-@app.get("/api/status")
-async def api_status(request: Request):
-    require_auth(request)
-
+# Refresh interval (seconds) for each /api/status field.
+# CONFIGURE: directory sizes and B2 size are expensive on a large archive.
+STATUS_INTERVALS = {
+    "disk": 5,
+    "processes": 5,
+    "email_count": 60,
+    "sync_status": 30,
+    "logs": 30,
+    "sessions": 30,
+    "queued_tasks": 30,
+    "coordination": 10 * 60,
+    "data_sizes": 5 * 60,
+    "b2_backup": 30 * 60,
+    "backup": 30,
+    "people_index": 5 * 60,
+    "people_directory": 15,
+    "mail_daemon": 10,
+}
+
+# Adjust these log paths to match your cron setup
+LOG_FILES = {
+    "backup": "/var/log/archive-backup.log",
+    "sync": "/var/log/archive-sync.log",
+    "checkmail": "/var/log/archive-checkmail.log",
+}
+
+
+def probe_disk() -> dict:
     total, used, free = shutil.disk_usage(str(ARCHIVE_DIR))
+    return {
+        "total_gb": round(total / 1e9, 1),
+        "used_gb": round(used / 1e9, 1),
+        "free_gb": round(free / 1e9, 1),
+        "pct": round(used / total * 100, 1),
+    }
+
+
+async def probe_processes() -> dict:
+    counts = {}
+    for name in ("rclone", "mbsync"):
+        out = (await run_cmd(["pgrep", "-ac", name])).strip()
+        counts[name] = int(out) if out.isdigit() else 0
+    return counts
+
 
-    def dir_size_fast(path: str) -> str:
-        r = run_cmd(["du", "-sh", path], timeout=5)
-        return r.split("\t")[0].strip() if "\t" in r else "?"
+async def probe_email_count() -> str:
+    return str(await mail_db.count())
 
-    rclone_procs = run_cmd(["pgrep", "-ac", "rclone"])
-    mbsync_procs = run_cmd(["pgrep", "-ac", "mbsync"])
 
+def probe_sync_status() -> dict | None:
     sync_status_file = ARCHIVE_DIR / "sync-status.json"
-    sync_status = None
     if sync_status_file.exists():
         try:
-            sync_status = json.loads(sync_status_file.read_text())
+            return json.loads(sync_status_file.read_text())
         except Exception:
             pass
+    return None
+
+
+def tail_lines(path: Path, count: int, chunk: int = 8192) -> list[str]:
+    """Return the last `count` lines of a file without reading all of it."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= count:
+            step = min(chunk, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    return data.decode(errors="replace").strip().split("\n")[-count:]
+
+
+def log_status(log_path: str) -> dict:
+    """Get last run time and status from a log file."""
+    p = Path(log_path)
+    try:
+        st = p.stat()
+    except OSError:
+        st = None
+    if st is None or st.st_size == 0:
+        return {"status": "never", "last_line": "", "age_hours": None}
+    try:
+        lines = tail_lines(p, 20)
+        last_line = lines[-1] if lines else ""
+        age_hours = round((datetime.now().timestamp() - st.st_mtime) / 3600, 1)
+        has_error = any("ERROR" in l for l in lines)
+        return {
+            "status": "error" if has_error else "ok",
+            "last_line": last_line[-120:],
+            "age_hours": age_hours,
+        }
+    except Exception:
+        return {"status": "unknown", "last_line": "", "age_hours": None}
 
-    mail_count = run_cmd(["notmuch", "count"], timeout=5).strip()
 
-    # Backup and sync log status
-    def log_status(log_path: str) -> dict:
-        """Get last run time and status from a log file."""
-        p = Path(log_path)
-        if not p.exists() or p.stat().st_size == 0:
-            return {"status": "never", "last_line": "", "age_hours": None}
-        try:
-            lines = p.read_text().strip().split("\n")
-            last_line = lines[-1] if lines else ""
-            mtime = p.stat().st_mtime
-            age_hours = round((datetime.now().timestamp() - mtime) / 3600, 1)
-            has_error = any("ERROR" in l for l in lines[-20:])
-            return {
-                "status": "error" if has_error else "ok",
-                "last_line": last_line[-120:],
-                "age_hours": age_hours,
-                "lines": len(lines),
-            }
-        except Exception:
-            return {"status": "unknown", "last_line": "", "age_hours": None}
+def probe_logs() -> dict:
+    return {name: log_status(path) for name, path in LOG_FILES.items()}
+
+
+DATA_SIZE_DIRS = {
+    "dropbox": ARCHIVE_DIR / "cloud" / "dropbox",
+    "gdrive": ARCHIVE_DIR / "cloud" / "google-drive",
+    "email": Path(os.path.expanduser("~/Mail/gmail")),
+}
+
+
+def human_size(n: int | None) -> str:
+    """du -h style: 512K, 3.4G."""
+    if n is None:
+        return "?"
+    for unit in ("B", "K", "M", "G", "T"):
+        if n < 1024 or unit == "T":
+            return f"{n:.1f}{unit}" if unit != "B" and n < 10 else f"{n:.0f}{unit}"
+        n /= 1024
+
+
+def probe_data_sizes() -> dict:
+    # Incremental: only directories whose mtime changed are re-listed
+    sizes = {}
+    for name, path in DATA_SIZE_DIRS.items():
+        if not path.is_dir():
+            sizes[name] = "?"
+            continue
+        tree_walker.update(path)
+        sizes[name] = human_size(tree_walker.size(path.resolve()))
+    return sizes
 
-    # Adjust these log paths to match your cron setup
-    backup_log = log_status("/var/log/archive-backup.log")
-    sync_log = log_status("/var/log/archive-sync.log")
-    checkmail_log = log_status("/var/log/archive-checkmail.log")
 
-    # B2 backup size
-    b2_size = run_cmd(["rclone", "size", "b2:", "--json"], timeout=15)
+# `rclone size b2:` lists the whole bucket (B2 class C transactions), so it
+# only re-runs after a backup has finished since the last measurement
+b2_size_cache: dict = {"stamp": None, "value": None}
+
+
+async def probe_b2_backup() -> dict:
+    stamp = file_stamp(BACKUP_STATUS_FILE)
+    if b2_size_cache["value"] is not None and stamp == b2_size_cache["stamp"]:
+        return b2_size_cache["value"]
+    b2_size = await run_cmd(["rclone", "size", "b2:", "--json"], timeout=300)
     try:
         b2_info = json.loads(b2_size)
-        b2_gb = round(b2_info.get("bytes", 0) / 1e9, 2)
-        b2_objects = b2_info.get("count", 0)
+        value = {
+            "size_gb": round(b2_info.get("bytes", 0) / 1e9, 2),
+            "objects": b2_info.get("count", 0),
+        }
     except Exception:
-        b2_gb = None
-        b2_objects = None
-
-    # Active sessions
-    sessions = []
-    session_dir = ARCHIVE_DIR / "coordination"
-    if session_dir.exists():
-        for f in sorted(session_dir.glob("SESSION_*.md"), reverse=True)[:5]:
-            try:
-                content = f.read_text()
-                status = "ACTIVE"
-                if "STATUS: COMPLETE" in content:
-                    status = "COMPLETE"
-                lines = content.strip().split("\n")
-                title = lines[0].replace("# ", "") if lines else f.stem
-                sessions.append({"file": f.name, "title": title, "status": status})
-            except Exception:
-                pass
-
-    # Queued tasks
-    queued = []
-    queue_dir = ARCHIVE_DIR / "coordination" / "queued"
-    if queue_dir.exists():
-        for f in sorted(queue_dir.glob("*.md")):
-            if f.name == "README.md":
-                continue
-            try:
-                content = f.read_text()
-                priority = "medium"
-                status = "queued"
-                for line in content.split("\n")[:10]:
-                    if "PRIORITY:" in line.upper():
-                        priority = line.split(":")[-1].strip().lower()
-                    if "STATUS:" in line.upper():
-                        status = line.split(":")[-1].strip().lower()
-                queued.append({"file": f.stem, "priority": priority, "status": status})
-            except Exception:
-                pass
+        return {"size_gb": None, "objects": None}
+    b2_size_cache.update(stamp=stamp, value=value)
+    return value
+
+
+def probe_backup() -> dict | None:
+    """Last backup run (scripts/backup.py), plus each root's recent upload
+    throughput from the metrics history, oldest first."""
+    try:
+        status = json.loads(BACKUP_STATUS_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+    for name, record in status.get("roots", {}).items():
+        runs = metrics.recent("backup", name, BACKUP_TREND_RUNS, status="ok")
+        record["trend"] = [[r["at"], r["bytes_per_sec"], r["bytes"]] for r in runs
+                           if r.get("bytes_per_sec")]
+    return status
+
+
+def probe_sessions() -> list:
+    return coordination.sessions(limit=5)["sessions"]
 
+
+def probe_queued_tasks() -> list:
+    return coordination.tasks()["tasks"]
+
+
+def probe_coordination() -> dict:
+    coordination.refresh()
+    return coordination.stats()
+
+
+def probe_mail_daemon() -> dict:
+    """Health and lag of check-mail.py, from the file it rewrites every cycle."""
+    health_file = CHECK_MAIL_HEALTH
+    try:
+        health = json.loads(health_file.read_text())
+    except (OSError, ValueError):
+        return {"status": "unknown"}
+    age = int(datetime.now().timestamp()) - health.get("last_cycle_at", 0)
+    if health.get("mode") == "daemon":
+        # Allow a couple of missed cycles before calling it stale
+        status = "ok" if age < 3 * health.get("interval", 60) + 60 else "stale"
+    elif health.get("mode") == "cron":
+        status = "ok" if age < 3600 else "stale"
+    else:
+        status = health.get("mode", "unknown")
+    return {**health, "status": status, "heartbeat_age_seconds": age}
+
+
+def probe_people_index() -> dict:
+    refreshed = people_index.refresh()
+    return {**people_index.stats(), **refreshed}
+
+
+def probe_people_directory() -> dict:
+    """Keeps the in-memory people search current; searches never hit disk."""
+    refreshed = people_directory.refresh()
+    return {**people_directory.stats(), **refreshed}
+
+
+status_collector = StatusCollector()
+status_collector.register("disk", probe_disk, STATUS_INTERVALS["disk"],
+                          default={"total_gb": 0, "used_gb": 0, "free_gb": 0, "pct": 0})
+status_collector.register("processes", probe_processes, STATUS_INTERVALS["processes"],
+                          default={"rclone": 0, "mbsync": 0})
+status_collector.register("sync_status", probe_sync_status, STATUS_INTERVALS["sync_status"])
+status_collector.register("email_count", probe_email_count, STATUS_INTERVALS["email_count"])
+status_collector.register("data_sizes", probe_data_sizes, STATUS_INTERVALS["data_sizes"])
+status_collector.register("sessions", probe_sessions, STATUS_INTERVALS["sessions"], default=[])
+status_collector.register("queued_tasks", probe_queued_tasks, STATUS_INTERVALS["queued_tasks"],
+                          default=[])
+status_collector.register("logs", probe_logs, STATUS_INTERVALS["logs"], default={})
+status_collector.register("b2_backup", probe_b2_backup, STATUS_INTERVALS["b2_backup"],
+                          default={"size_gb": None, "objects": None})
+status_collector.register("backup", probe_backup, STATUS_INTERVALS["backup"])
+status_collector.register("people_index", probe_people_index, STATUS_INTERVALS["people_index"])
+status_collector.register("mail_daemon", probe_mail_daemon, STATUS_INTERVALS["mail_daemon"])
+status_collector.register("coordination", probe_coordination, STATUS_INTERVALS["coordination"])
+status_collector.register("people_directory", probe_people_directory,
+                          STATUS_INTERVALS["people_directory"])
+status_collector.register_live("commands", commands.stats)
+status_collector.register_live("git_writer", git_writer.stats)
+status_collector.register_live("thread_cache", thread_cache.stats)
+status_collector.register_live("mail_db", mail_db.stats)
+status_collector.register_live("search_cache", search_cache.stats)
+status_collector.register_live("triage", triage_store.stats)
+status_collector.register_live("jobs", job_runner.stats)
+status_collector.register_live("notifier", notifier.stats)
+status_collector.register_live("drafts", lambda: {**draft_stats.stats(), "cache": draft_cache.stats()})
+status_collector.register_live("metrics", metrics.stats)
+
+
+@app.get("/api/status")
+async def api_status(request: Request, fresh: str | None = Query(None)):
+    """Return the latest status snapshot. ?fresh=<field> re-runs one probe first."""
+    require_auth(request)
+    if fresh:
+        if fresh not in status_collector.probes:
+            raise HTTPException(status_code=400,
+                                detail=f"fresh must be one of: {sorted(status_collector.probes)}")
+        await status_collector.refresh(fresh)
     return {
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "disk": {
-            "total_gb": round(total / 1e9, 1),
-            "used_gb": round(used / 1e9, 1),
-            "free_gb": round(free / 1e9, 1),
-            "pct": round(used / total * 100, 1),
-        },
-        "processes": {
-            "rclone": int(rclone_procs.strip()) if rclone_procs.strip().isdigit() else 0,
-            "mbsync": int(mbsync_procs.strip()) if mbsync_procs.strip().isdigit() else 0,
-        },
-        "sync_status": sync_status,
-        "email_count": mail_count,
-        "data_sizes": {
-            "dropbox": dir_size_fast(str(ARCHIVE_DIR / "cloud" / "dropbox")),
-            "gdrive": dir_size_fast(str(ARCHIVE_DIR / "cloud" / "google-drive")),
-            "email": dir_size_fast(os.path.expanduser("~/Mail/gmail")),
-        },
-        "sessions": sessions,
-        "queued_tasks": queued,
-        "logs": {
-            "backup": backup_log,
-            "sync": sync_log,
-            "checkmail": checkmail_log,
-        },
-        "b2_backup": {
-            "size_gb": b2_gb,
-            "objects": b2_objects,
-        },
+        **status_collector.snapshot(),
     }
 
 
+# --- API: Metrics ---
+
+@app.get("/api/metrics")
+async def metrics_catalog(request: Request):
+    """Every recorded series: (kind, name), run count and time span."""
+    require_auth(request)
+    return {"series": await asyncio.to_thread(metrics.catalog)}
+
+
+@app.get("/api/metrics/{kind}")
+async def metrics_series(request: Request, kind: str, field: str = Query("duration"),
+                         name: str | None = Query(None),
+                         days: float = Query(METRICS_DEFAULT_DAYS, gt=0, le=3650),
+                         points: int = Query(120, ge=1, le=METRICS_MAX_POINTS)):
+    """Run history of one kind (sync, backup, check-mail), one series per
+    name, downsampled to at most `points` time buckets of
+    [start, avg, min, max, sum, runs]."""
+    require_auth(request)
+    since = int(time.time() - days * 86400)
+    try:
+        return await asyncio.to_thread(metrics.series, kind, field, since, None, name, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # --- API: Next Actions ---
 
 @app.get("/api/actions")
 async def get_actions(request: Request, include_completed: bool = Query(False)):
     """Return ordered list of actions."""
     require_auth(request)
-    data = load_actions()
+    data = actions_store.snapshot()
     if not include_completed:
         data["actions"] = [a for a in data["actions"] if a.get("completed") is None]
     return data
@@ -289,9 +601,9 @@ async def add_action(request: Request):
         "created": datetime.now(timezone.utc).isoformat(),
         "completed": None,
     }
-    data = load_actions()
-    data["actions"].append(action)
-    save_actions(data, f"Add action: {text[:50]}")
+    await asyncio.to_thread(actions_store.add, action)
+    commit_actions(f"Add action: {text[:50]}")
+    await notifier.changed(ACTIONS_FILE)
     return action
 
 
@@ -300,32 +612,23 @@ async def update_action(request: Request, action_id: str):
     """Update an action's text/context or mark complete."""
     require_auth(request)
     body = await request.json()
-    data = load_actions()
-
-    for action in data["actions"]:
-        if action["id"] == action_id:
-            if "text" in body:
-                action["text"] = body["text"]
-            if "context" in body:
-                action["context"] = body["context"]
-            if "completed" in body:
-                action["completed"] = body["completed"]
-            save_actions(data, f"Update action: {action['text'][:50]}")
-            return action
-
-    raise HTTPException(status_code=404, detail="Action not found")
+    fields = {k: body[k] for k in ("text", "context", "completed") if k in body}
+    action = await asyncio.to_thread(actions_store.update, action_id, fields)
+    if action is None:
+        raise HTTPException(status_code=404, detail="Action not found")
+    commit_actions(f"Update action: {action['text'][:50]}")
+    await notifier.changed(ACTIONS_FILE)
+    return action
 
 
 @app.delete("/api/actions/{action_id}")
 async def delete_action(request: Request, action_id: str):
     """Remove an action."""
     require_auth(request)
-    data = load_actions()
-    original_len = len(data["actions"])
-    data["actions"] = [a for a in data["actions"] if a["id"] != action_id]
-    if len(data["actions"]) == original_len:
+    if not await asyncio.to_thread(actions_store.delete, action_id):
         raise HTTPException(status_code=404, detail="Action not found")
-    save_actions(data, f"Remove action {action_id}")
+    commit_actions(f"Remove action {action_id}")
+    await notifier.changed(ACTIONS_FILE)
     return {"status": "deleted"}
 
 
@@ -338,51 +641,42 @@ async def reorder_actions(request: Request):
     if not order:
         raise HTTPException(status_code=400, detail="order is required")
 
-    data = load_actions()
-    by_id = {a["id"]: a for a in data["actions"]}
-    reordered = []
-    for aid in order:
-        if aid in by_id:
-            reordered.append(by_id.pop(aid))
-    reordered.extend(by_id.values())
-    data["actions"] = reordered
-    save_actions(data, "Reorder actions")
+    data = await asyncio.to_thread(actions_store.reorder, order)
+    commit_actions("Reorder actions")
+    await notifier.changed(ACTIONS_FILE)
     return data
 
 
 # --- API: Triage ---
 
-def load_triage() -> dict:
-    """Load communication-triage.json."""
-    if TRIAGE_FILE.exists():
-        try:
-            return json.loads(TRIAGE_FILE.read_text())
-        except Exception:
-            pass
-    return {"generated": None, "items": []}
-
-
 @app.get("/api/triage")
-async def api_triage(request: Request):
-    """Return structured communication triage data."""
+async def api_triage(request: Request, status: str | None = Query(None),
+                     person: str | None = Query(None), offset: int = Query(0, ge=0),
+                     limit: int | None = Query(None, ge=1, le=1000)):
+    """Return structured communication triage data.
+
+    status takes a comma-separated list; person matches slug, email or name.
+    Answers 304 when the client's If-None-Match is still current.
+    """
     require_auth(request)
-    return load_triage()
+    etag = triage_store.etag
+    headers = {"etag": etag, "cache-control": "private, no-cache"}
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    statuses = {s for s in status.split(",") if s} if status else None
+    data = await asyncio.to_thread(triage_store.query, statuses, person, offset, limit)
+    more = limit is not None and offset + limit < data["total"]
+    data.update({"offset": offset, "next_offset": offset + limit if more else None})
+    return JSONResponse(data, headers=headers)
 
 
 @app.post("/api/triage/refresh")
 async def refresh_triage(request: Request):
-    """Run triage script in background."""
+    """Run triage script in background (or return the run already going)."""
     require_auth(request)
-    script = ARCHIVE_DIR / "scripts" / "triage-email.py"
-    if not script.exists():
+    if not Path(JOB_TYPES["triage"][1]).exists():
         raise HTTPException(status_code=404, detail="Triage script not found")
-    venv_python = ARCHIVE_DIR / ".venv" / "bin" / "python"
-    python_bin = str(venv_python) if venv_python.exists() else "python3"
-    log_file = Path("/tmp/archive-triage.log")
-    cmd = f"{python_bin} {script} > {log_file} 2>&1"
-    subprocess.Popen(["bash", "-c", cmd], start_new_session=True,
-                     cwd=str(ARCHIVE_DIR))
-    return {"status": "started", "log": str(log_file)}
+    return job_response(*job_runner.start("triage"))
 
 
 @app.put("/api/triage/{item_id}/status")
@@ -391,24 +685,69 @@ async def update_triage_status(request: Request, item_id: str):
     require_auth(request)
     body = await request.json()
     new_status = body.get("status")
-    valid = {"needs-response", "replied", "waiting", "snoozed", "archived", "to-read", "read"}
-    if new_status not in valid:
-        raise HTTPException(status_code=400, detail=f"status must be one of: {valid}")
+    if new_status not in TRIAGE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {TRIAGE_STATUSES}")
 
-    data = load_triage()
-    for item in data.get("items", []):
-        if item["id"] == item_id:
-            item["status"] = new_status
-            TRIAGE_FILE.write_text(json.dumps(data, indent=2) + "\n")
-            git_commit_push([str(TRIAGE_FILE)], f"Triage: mark {item_id} as {new_status}")
-            return item
-
-    raise HTTPException(status_code=404, detail="Triage item not found")
+    item = await asyncio.to_thread(triage_store.set_status, item_id, new_status)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Triage item not found")
+    await notifier.changed(TRIAGE_JOURNAL)
+    return item
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def draft_tokens(prompt: str, api_key: str, result: dict):
+    """Yield the draft's text as it streams in; on completion fill result
+    with the draft and usage, and record timings in draft_stats."""
+    start = time.perf_counter()
+    ttft = None
+    parts = []
+    client = anthropic.AsyncAnthropic(api_key=api_key)
+    async with client.messages.stream(
+        model=DRAFT_MODEL,
+        max_tokens=DRAFT_MAX_TOKENS,
+        messages=[{"role": "user", "content": prompt}],
+    ) as stream:
+        async for text in stream.text_stream:
+            if ttft is None:
+                ttft = (time.perf_counter() - start) * 1000
+            parts.append(text)
+            yield text
+        final = await stream.get_final_message()
+    total = (time.perf_counter() - start) * 1000
+    usage = {"prompt_tokens": final.usage.input_tokens, "output_tokens": final.usage.output_tokens,
+             "ttft_ms": round(ttft if ttft is not None else total), "total_ms": round(total)}
+    draft_stats.record(usage["ttft_ms"], total, usage["prompt_tokens"], usage["output_tokens"])
+    result.update(draft="".join(parts), usage=usage)
+
+
+async def stream_draft(key: tuple, stamp, prompt: str, api_key: str, meta: dict):
+    """Server-sent events: "meta", then a "token" event per text chunk, then
+    "done" (usage) or "error"."""
+    yield sse_event("meta", meta)
+    result = {}
+    try:
+        async for text in draft_tokens(prompt, api_key, result):
+            yield sse_event("token", text)
+    except Exception as e:
+        draft_stats.record_error(str(e))
+        yield sse_event("error", {"detail": f"Claude API error: {e}"})
+        return
+    if stamp:
+        draft_cache.put(key, stamp, {"draft": result["draft"], "context_used": meta["context_used"]})
+    yield sse_event("done", {"usage": result["usage"]})
 
 
 @app.post("/api/triage/{item_id}/draft-reply")
-async def draft_reply(request: Request, item_id: str):
-    """Generate a draft reply using Claude API with relationship context."""
+async def draft_reply(request: Request, item_id: str, stream: bool = Query(False)):
+    """Generate a draft reply using Claude API with relationship context.
+
+    Drafts are cached per (thread revision, relationship README hash).
+    ?stream=true answers with server-sent events as tokens arrive.
+    """
     require_auth(request)
 
     if not ANTHROPIC_AVAILABLE:
@@ -418,12 +757,7 @@ async def draft_reply(request: Request, item_id: str):
     if not api_key:
         raise HTTPException(status_code=503, detail="ANTHROPIC_API_KEY not set")
 
-    data = load_triage()
-    item = None
-    for i in data.get("items", []):
-        if i["id"] == item_id:
-            item = i
-            break
+    item = triage_store.get(item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Triage item not found")
 
@@ -431,181 +765,344 @@ async def draft_reply(request: Request, item_id: str):
     if not thread_id:
         raise HTTPException(status_code=400, detail="No thread_id in triage item")
 
-    email_output = run_cmd(["notmuch", "show", "--format=json", f"thread:{thread_id}"], timeout=30)
-    try:
-        email_thread = json.loads(email_output)
-    except Exception:
-        email_thread = []
-
     relationship_slug = item.get("relationship_slug")
     relationship_context = ""
     if relationship_slug:
-        rel_path = ARCHIVE_DIR / "private" / "relationships" / "people" / relationship_slug / "README.md"
-        if rel_path.exists():
-            relationship_context = rel_path.read_text()
+        relationship_context = await asyncio.to_thread(people_directory.readme, relationship_slug) or ""
+    context_hash = hashlib.sha1(relationship_context.encode()).hexdigest()[:16]
+    context_used = {
+        "has_relationship": bool(relationship_context),
+        "relationship_slug": relationship_slug,
+    }
 
-    from_name = item.get("from_name", "Unknown")
-    from_email = item.get("from_email", "")
-    subject = item.get("subject", "")
-    summary = item.get("summary", "")
+    key = ("draft", thread_id, context_hash)
+    stamp, cached = await cached_lookup(request, key, f"thread:{thread_id}", draft_cache)
+    if cached is not None:
+        draft_stats.record_cached()
+        if not stream:
+            return {**cached, "cached": True}
+
+        async def replay():
+            yield sse_event("meta", {"context_used": cached["context_used"], "cached": True})
+            yield sse_event("token", cached["draft"])
+            yield sse_event("done", {"usage": None})
+        return StreamingResponse(replay(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+
+    email_thread = await mail_db.show(f"thread:{thread_id}", request=request) or []
+    prompt, prompt_info = build_prompt(item, email_thread, relationship_context)
+
+    if stream:
+        meta = {"context_used": context_used, "cached": False, "prompt": prompt_info}
+        return StreamingResponse(stream_draft(key, stamp, prompt, api_key, meta),
+                                 media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    result = {}
+    try:
+        async for _ in draft_tokens(prompt, api_key, result):
+            pass
+    except Exception as e:
+        draft_stats.record_error(str(e))
+        raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
+    if stamp:
+        draft_cache.put(key, stamp, {"draft": result["draft"], "context_used": context_used})
+    return {
+        "draft": result["draft"],
+        "context_used": context_used,
+        "cached": False,
+        "usage": result["usage"],
+    }
 
-    prompt = f"""You are helping draft a reply to an email. Use the context below to write a warm, personal response.
 
-**From:** {from_name} <{from_email}>
-**Subject:** {subject}
-**Thread summary:** {summary}
+# --- API: Jobs ---
 
-**Relationship context:**
-{relationship_context if relationship_context else "No relationship context available."}
+def job_response(job: dict, started: bool) -> dict:
+    return {"status": "started" if started else "already_running",
+            "job": job_runner.public(job)}
 
-**Full email thread:**
-{json.dumps(email_thread, indent=2)}
 
-Draft a reply that:
-- Is warm and personal
-- References specific things from the thread
-- Uses the relationship context appropriately
-- Keeps it concise (2-4 paragraphs unless more depth is warranted)
-- Signs off appropriately for the relationship level
+@app.get("/api/jobs")
+async def list_jobs(request: Request, type: str | None = Query(None),
+                    limit: int = Query(20, ge=1, le=100)):
+    """Recent jobs, newest first."""
+    require_auth(request)
+    return {"types": sorted(JOB_TYPES), "jobs": job_runner.list(type, limit)}
 
-Output ONLY the draft email body, no meta-commentary."""
 
-    try:
-        client = anthropic.Anthropic(api_key=api_key)
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1500,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        draft = message.content[0].text
+@app.post("/api/jobs/{job_type}")
+async def start_job(request: Request, job_type: str):
+    """Start a job of this type; a second start while one is queued or
+    running returns that one."""
+    require_auth(request)
+    if job_type not in JOB_TYPES:
+        raise HTTPException(status_code=404, detail=f"job type must be one of: {sorted(JOB_TYPES)}")
+    return job_response(*job_runner.start(job_type))
 
-        return {
-            "draft": draft,
-            "context_used": {
-                "has_relationship": bool(relationship_context),
-                "relationship_slug": relationship_slug,
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(request: Request, job_id: str):
+    require_auth(request)
+    job = TASKS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_runner.public(job)
 
-# --- API: Email ---
 
-# Domains/patterns to filter out of "recent" view
-SPAM_PATTERNS = [
-    "noreply@", "no-reply@", "notifications@", "mailer-daemon@",
-    "donotreply@", "updates@", "news@", "newsletter@", "marketing@",
-    "bounce", "daemon",
-]
-SPAM_DOMAINS = [
-    "github.com", "linkedin.com", "substack.com", "stripe.com",
-    "google.com", "googlemail.com", "facebookmail.com", "twitter.com",
-    "amazonses.com", "sendgrid.net", "mailchimp.com", "constantcontact.com",
-]
-
-
-def is_automated_email(authors: str, subject: str) -> bool:
-    """Check if an email is likely automated/spam."""
-    authors_lower = authors.lower()
-    for p in SPAM_PATTERNS:
-        if p in authors_lower:
-            return True
-    for d in SPAM_DOMAINS:
-        if d in authors_lower:
-            return True
-    return False
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(request: Request, job_id: str):
+    require_auth(request)
+    job = await job_runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_runner.public(job)
+
+
+async def tail_job_log(request: Request, job: dict, offset: int):
+    """Server-sent events: each new chunk of the log as a "log" event whose
+    id is the byte offset after it, then a "done" event with the result."""
+    path = Path(job["log"])
+    partial = b""
+    while True:
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            chunk = b""
+        if chunk:
+            offset += len(chunk)
+            # Hold back a trailing partial line until it's complete
+            chunk, _, partial = (partial + chunk).rpartition(b"\n")
+            if chunk:
+                data = "\n".join(f"data: {line}" for line in chunk.decode(errors="replace").split("\n"))
+                yield f"event: log\nid: {offset - len(partial)}\n{data}\n\n"
+        elif job["status"] not in ("queued", "running"):
+            if partial:
+                yield f"event: log\nid: {offset}\ndata: {partial.decode(errors='replace')}\n\n"
+            yield f"event: done\ndata: {json.dumps(job_runner.public(job))}\n\n"
+            return
+        elif await request.is_disconnected():
+            return
+        else:
+            await asyncio.sleep(JOB_LOG_POLL)
 
 
-@app.get("/api/email/recent")
-async def recent_email(request: Request, limit: int = Query(30)):
-    """Return recent non-automated emails."""
-    require_auth(request)
-    fetch_limit = limit * 4
-    output = run_cmd(
-        ["notmuch", "search", f"--limit={fetch_limit}", "--format=json",
-         "--sort=newest-first", "tag:inbox"],
-        timeout=15
-    )
-    try:
-        all_results = json.loads(output)
-    except Exception:
-        all_results = []
+@app.get("/api/jobs/{job_id}/log")
+async def job_log(request: Request, job_id: str, offset: int = Query(0, ge=0)):
+    """Tail a job's log as server-sent events until the job finishes.
+    Reconnects resume from Last-Event-ID (a byte offset)."""
+    require_auth(request)
+    job = TASKS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_id = request.headers.get("last-event-id", "")
+    if last_id.isdigit():
+        offset = int(last_id)
+    return StreamingResponse(tail_job_log(request, job, offset), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    filtered = []
-    for m in all_results:
-        authors = m.get("authors", "")
-        subject = m.get("subject", "")
-        if is_automated_email(authors, subject):
-            continue
-        filtered.append(m)
-        if len(filtered) >= limit:
-            break
 
-    return {"results": filtered, "count": len(filtered)}
+# --- API: Email ---
+
+@app.get("/api/email/recent")
+async def recent_email(request: Request, limit: int = Query(30, ge=1, le=200),
+                       cursor: str | None = Query(None)):
+    """Recent inbox threads with a human sender, newest first.
+
+    Senders are classified at index time by check-mail.py (tag:human), so
+    each page is a single bounded notmuch query. The cursor pins the first
+    page's time, so mail arriving while paging doesn't shift later pages.
+    """
+    require_auth(request)
+    if cursor:
+        try:
+            until, offset = (int(v) for v in cursor.split(":"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+    else:
+        until, offset = int(datetime.now(timezone.utc).timestamp()), 0
+    results = await mail_db.search(f"tag:inbox AND tag:{HUMAN_TAG} AND date:..@{until}",
+                                   limit=limit + 1, offset=offset, request=request)
+    next_cursor = f"{until}:{offset + limit}" if len(results) > limit else None
+    results = results[:limit]
+    return {"results": results, "count": len(results), "next_cursor": next_cursor}
+
+
+# client id -> event set when a newer search from that client arrives
+_search_clients: dict[str, asyncio.Event] = {}
+
+
+def supersede_search(client: str | None) -> asyncio.Event:
+    """Register a search for client, signalling the one it replaces."""
+    event = asyncio.Event()
+    if client:
+        previous = _search_clients.get(client)
+        if previous:
+            previous.set()
+        _search_clients[client] = event
+    return event
+
+
+def release_search(client: str | None, event: asyncio.Event):
+    if client and _search_clients.get(client) is event:
+        del _search_clients[client]
+
+
+async def unless_superseded(coro, superseded: asyncio.Event):
+    """Await coro, cancelling it (and killing its notmuch process) if a newer
+    search from the same client comes in first."""
+    task = asyncio.ensure_future(coro)
+    waiter = asyncio.ensure_future(superseded.wait())
+    try:
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    if task.cancelled():
+        raise CommandCancelled("superseded search")
+    return task.result()
+
+
+async def stream_search(request: Request, q: str, limit: int, offset: int, stamp, cached,
+                        client: str | None, superseded: asyncio.Event):
+    """NDJSON: one thread summary per line as notmuch produces them, then a
+    final {"done": true, "next_offset": ...} line."""
+    try:
+        if cached is not None:
+            results = cached
+            for r in results[:limit]:
+                yield json.dumps(r) + "\n"
+        else:
+            results = []
+            search = mail_db.search_iter(q, limit=limit + 1, offset=offset, request=request)
+            async with aclosing(search) as batches:
+                async for batch in batches:
+                    if superseded.is_set():
+                        return
+                    for r in batch:
+                        if len(results) < limit:
+                            yield json.dumps(r) + "\n"
+                        results.append(r)
+            if stamp:
+                search_cache.put(("search", q, offset, limit), stamp,
+                                 {"at": time.monotonic(), "results": results})
+        next_offset = offset + limit if len(results) > limit else None
+        yield json.dumps({"done": True, "next_offset": next_offset}) + "\n"
+    finally:
+        release_search(client, superseded)
 
 
 @app.get("/api/search/email")
-async def search_email(request: Request, q: str = Query(..., min_length=1)):
+async def search_email(request: Request, q: str = Query(..., min_length=1),
+                       limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=500),
+                       offset: int = Query(0, ge=0), stream: bool = Query(False),
+                       client: str | None = Query(None)):
+    """Paginated notmuch search, newest first.
+
+    stream=true answers with NDJSON as results are produced. Pass a stable
+    client id (e.g. one per browser tab) and a new search from that client
+    cancels its previous one still in flight.
+    """
     require_auth(request)
-    output = run_cmd(["notmuch", "search", "--limit=50", "--format=json", q], timeout=15)
+    superseded = supersede_search(client)
     try:
-        results = json.loads(output)
-    except Exception:
-        results = []
-    return {"query": q, "results": results}
+        stamp = await mail_db.revision(request=request)
+        key = ("search", q, offset, limit)
+        cached = search_cache.get(key)
+        results = None
+        if cached and stamp and cached[0] == stamp \
+                and time.monotonic() - cached[1]["at"] < SEARCH_CACHE_TTL:
+            results = cached[1]["results"]
+        if stream:
+            generator = stream_search(request, q, limit, offset, stamp, results, client, superseded)
+            superseded = None  # released by the generator
+            return StreamingResponse(generator, media_type="application/x-ndjson")
+        if results is None:
+            results = await unless_superseded(
+                mail_db.search(q, limit=limit + 1, offset=offset, request=request), superseded)
+            if stamp:
+                search_cache.put(key, stamp, {"at": time.monotonic(), "results": results})
+    finally:
+        if superseded is not None:
+            release_search(client, superseded)
+    return {
+        "query": q,
+        "results": results[:limit],
+        "offset": offset,
+        "next_offset": offset + limit if len(results) > limit else None,
+    }
+
+
+async def cached_lookup(request: Request, key: tuple, query: str, cache: ThreadCache) -> tuple:
+    """(stamp, value) where value is key's cached entry if nothing matching
+    query changed since it was stored, else None. stamp is the current
+    database revision to store a fresh value under."""
+    stamp = await mail_db.revision(request=request)
+    cached = cache.get(key)
+    if cached and stamp:
+        (cached_uuid, cached_rev), value = cached
+        if (cached_uuid, cached_rev) == stamp:
+            return stamp, value
+        if cached_uuid == stamp[0]:
+            changed = await mail_db.count(f"lastmod:{cached_rev + 1}..{stamp[1]} AND ({query})",
+                                          request=request)
+            if changed == 0:
+                cache.restamp(key, stamp)
+                return stamp, value
+    return stamp, None
+
+
+async def cached_thread(request: Request, key: tuple, query: str, fetch):
+    """Serve key from thread_cache if nothing matching query changed since it
+    was parsed; otherwise call fetch() and cache the result."""
+    stamp, value = await cached_lookup(request, key, query, thread_cache)
+    if value is not None:
+        return value
+    value = await fetch()
+    if stamp and value is not None:
+        thread_cache.put(key, stamp, value)
+    return value
+
+
+@app.get("/api/email/{thread_id}/message")
+async def read_email_message(request: Request, thread_id: str,
+                             message_id: str = Query(..., alias="id")):
+    """One message with its text body, for threads loaded with bodies=false."""
+    require_auth(request)
+    quoted = message_id.replace('"', '""')
+    query = f'id:"{quoted}" AND thread:{thread_id}'
+
+    async def fetch():
+        messages = await mail_db.show(query, entire_thread=False, request=request)
+        return messages[0] if messages else None
+
+    message = await cached_thread(request, ("message", message_id), query, fetch)
+    if message is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return message
 
 
 @app.get("/api/email/{thread_id}")
-async def read_email(request: Request, thread_id: str):
-    """Return parsed email thread with proper message structure."""
+async def read_email(request: Request, thread_id: str, bodies: bool = Query(True)):
+    """Return parsed email thread with proper message structure.
+
+    bodies=false returns headers only; fetch bodies one at a time from
+    /api/email/{thread_id}/message?id=... Parsed threads are cached until
+    notmuch reports a change in the thread.
+    """
     require_auth(request)
-    output = run_cmd(["notmuch", "show", "--format=json", "--entire-thread=true",
-                       f"thread:{thread_id}"], timeout=15)
-    try:
-        raw = json.loads(output)
-    except Exception:
-        return {"thread_id": thread_id, "messages": [], "raw_error": output[:500]}
-
-    messages = []
-
-    def extract_messages(obj):
-        if isinstance(obj, dict):
-            if "headers" in obj and "body" in obj:
-                headers = obj.get("headers", {})
-                body_parts = []
-                extract_body(obj.get("body", []), body_parts)
-                messages.append({
-                    "id": obj.get("id", ""),
-                    "from": headers.get("From", ""),
-                    "to": headers.get("To", ""),
-                    "cc": headers.get("Cc", ""),
-                    "subject": headers.get("Subject", ""),
-                    "date": headers.get("Date", ""),
-                    "body": "\n".join(body_parts) if body_parts else "(no text content)",
-                    "tags": obj.get("tags", []),
-                })
-            else:
-                for v in obj.values():
-                    extract_messages(v)
-        elif isinstance(obj, list):
-            for item in obj:
-                extract_messages(item)
-
-    def extract_body(body, parts):
-        if isinstance(body, dict):
-            ct = body.get("content-type", "")
-            content = body.get("content", "")
-            if ct == "text/plain" and isinstance(content, str):
-                parts.append(content)
-            elif isinstance(content, list):
-                for item in content:
-                    extract_body(item, parts)
-        elif isinstance(body, list):
-            for item in body:
-                extract_body(item, parts)
-
-    extract_messages(raw)
+    query = f"thread:{thread_id}"
+
+    async def fetch():
+        return await mail_db.show(query, bodies=bodies, request=request)
+
+    messages = await cached_thread(request, ("thread", thread_id, bodies), query, fetch)
+    if messages is None:
+        return {"thread_id": thread_id, "messages": [], "raw_error": "could not read thread"}
     return {"thread_id": thread_id, "messages": messages}
 
 
@@ -615,7 +1112,9 @@ async def send_email(request: Request, to: str = Form(...), subject: str = Form(
     require_auth(request)
     cmd = ["neomutt", "-s", subject, "--", to]
     try:
-        r = subprocess.run(cmd, input=body, capture_output=True, text=True, timeout=30)
+        r = await commands.run(cmd, input=body, timeout=30)
+        if r.timed_out:
+            return {"status": "error", "detail": "neomutt timed out"}
         if r.returncode == 0:
             return {"status": "sent", "to": to, "subject": subject}
         else:
@@ -627,77 +1126,145 @@ async def send_email(request: Request, to: str = Form(...), subject: str = Form(
 # --- API: Queue ---
 
 @app.get("/api/queue")
-async def get_queue(request: Request):
-    """Return queued tasks with their full content."""
-    require_auth(request)
-    queue_dir = ARCHIVE_DIR / "coordination" / "queued"
-    tasks = []
-    if queue_dir.exists():
-        for f in sorted(queue_dir.glob("*.md")):
-            if f.name == "README.md":
-                continue
-            try:
-                content = f.read_text()
-                priority = "medium"
-                status = "queued"
-                title = f.stem.replace("-", " ").title()
-                for line in content.split("\n")[:15]:
-                    if line.startswith("# Task:"):
-                        title = line.replace("# Task:", "").strip()
-                    elif "PRIORITY:" in line.upper():
-                        priority = line.split(":")[-1].strip().lower()
-                    elif "STATUS:" in line.upper():
-                        status = line.split(":")[-1].strip().lower()
-                tasks.append({
-                    "file": f.stem, "title": title,
-                    "priority": priority, "status": status, "content": content,
-                })
-            except Exception:
-                pass
-    order = {"high": 0, "medium": 1, "low": 2}
-    tasks.sort(key=lambda t: order.get(t["priority"], 1))
-    return {"tasks": tasks}
+async def get_queue(request: Request, status: str | None = Query(None),
+                    priority: str | None = Query(None), offset: int = Query(0, ge=0),
+                    limit: int = Query(QUEUE_PAGE_SIZE, ge=1, le=500)):
+    """Queued task headers, high priority first. Content is at /api/queue/{file}.
+    status and priority take comma-separated values."""
+    require_auth(request)
+    statuses = {v.strip().lower() for v in status.split(",")} if status else None
+    priorities = {v.strip().lower() for v in priority.split(",")} if priority else None
+    data = await asyncio.to_thread(coordination.tasks, statuses, priorities, offset, limit)
+    more = offset + limit < data["total"]
+    return {**data, "offset": offset, "next_offset": offset + limit if more else None}
 
 
-# --- API: Files ---
+@app.get("/api/queue/{name}")
+async def get_queue_task(request: Request, name: str):
+    """One queued task with its full content."""
+    require_auth(request)
+    content = await asyncio.to_thread(coordination.task_content, name)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"file": name, "content": content}
 
-@app.get("/api/files")
-async def list_files(request: Request, path: str = Query("", alias="path")):
+
+@app.get("/api/sessions")
+async def get_sessions(request: Request, status: str | None = Query(None),
+                       offset: int = Query(0, ge=0),
+                       limit: int = Query(QUEUE_PAGE_SIZE, ge=1, le=500)):
+    """Session files in coordination/ (archived ones excluded), newest first."""
     require_auth(request)
+    data = await asyncio.to_thread(coordination.sessions, status.upper() if status else None,
+                                   offset, limit)
+    more = offset + limit < data["total"]
+    return {**data, "offset": offset, "next_offset": offset + limit if more else None}
+
+
+# --- API: Files ---
+
+def archive_path(path: str) -> Path:
+    """Resolve a path under ARCHIVE_DIR, refusing anything that escapes it."""
     base = ARCHIVE_DIR
     target = (base / path).resolve()
     if not str(target).startswith(str(base)):
         raise HTTPException(status_code=403, detail="Access denied")
     if not target.exists():
         raise HTTPException(status_code=404, detail="Not found")
+    return target
+
+
+@app.get("/api/files")
+async def list_files(request: Request, path: str = Query("", alias="path"),
+                     sort: str = Query("name"), desc: bool = Query(False),
+                     cursor: str | None = Query(None),
+                     limit: int = Query(LISTING_PAGE_SIZE, ge=1, le=1000)):
+    """A file's content, or one page of a directory listing from the tree index."""
+    require_auth(request)
+    target = archive_path(path)
     if target.is_file():
         content = None
         size = target.stat().st_size
-        if size < 100_000:
+        if size < INLINE_MAX_BYTES:
             try:
                 content = target.read_text(errors="replace")
             except Exception:
                 content = "(binary file)"
-        return {"type": "file", "path": path, "size": size, "content": content}
-    entries = []
+        return {"type": "file", "path": path, "size": size, "content": content,
+                "text": target.suffix.lower() in TEXT_EXTENSIONS}
+    # Re-lists the directory only if its mtime moved since the index saw it.
+    # An unreadable directory lists whatever the index already has for it.
     try:
-        for item in sorted(target.iterdir()):
-            if item.name.startswith("."):
-                continue
-            entries.append({
-                "name": item.name,
-                "is_dir": item.is_dir(),
-                "size": item.stat().st_size if item.is_file() else None,
-            })
-    except PermissionError:
+        await asyncio.to_thread(tree_index.refresh_dir, target)
+    except OSError:
         pass
-    return {"type": "directory", "path": path, "entries": entries}
+    try:
+        page = await asyncio.to_thread(tree_index.list, target, sort, desc, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    info = tree_index.get(target) or {}
+    return {
+        "type": "directory",
+        "path": path,
+        "size": info.get("size"),
+        "children": info.get("children"),
+        "entries": page["entries"],
+        "next_cursor": page["next_cursor"],
+    }
+
+
+def not_modified(request: Request, headers) -> bool:
+    """RFC 9110 conditional GET against a response's ETag/Last-Modified."""
+    etag = headers.get("etag")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return etag is not None and (etag in tags or "*" in tags)
+    since = request.headers.get("if-modified-since")
+    modified = headers.get("last-modified")
+    if since and modified:
+        try:
+            return parsedate_to_datetime(modified) <= parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@app.get("/api/files/raw")
+async def raw_file(request: Request, path: str = Query(...), download: bool = Query(False)):
+    """Serve a file as-is. Supports Range requests (video seeking, resumable
+    downloads) and conditional GETs; the body is streamed, or sent with
+    sendfile when the server supports it, never read into memory."""
+    require_auth(request)
+    target = archive_path(path)
+    if not target.is_file():
+        raise HTTPException(status_code=400, detail="Not a file")
+    response = FileResponse(target, stat_result=target.stat(),
+                            filename=target.name if download else None)
+    response.headers["Cache-Control"] = "private, no-cache"
+    if not_modified(request, response.headers):
+        return Response(status_code=304, headers={
+            k: v for k, v in response.headers.items()
+            if k in ("etag", "last-modified", "cache-control")})
+    return response
+
+
+@app.get("/api/files/lines")
+async def file_lines(request: Request, path: str = Query(...), start: int = Query(0, ge=0),
+                     count: int = Query(500, ge=1, le=5000)):
+    """A window of lines from a (large) text file, for paging through it."""
+    require_auth(request)
+    target = archive_path(path)
+    if not target.is_file():
+        raise HTTPException(status_code=400, detail="Not a file")
+    window = await asyncio.to_thread(line_reader.read, target, start, count)
+    return {"path": path, **window}
 
 
 @app.post("/api/files/save")
 async def save_file(request: Request, path: str = Form(...), content: str = Form(...),
                     message: str = Form("")):
-    """Save a file and git commit."""
+    """Save a file and queue a git commit."""
     require_auth(request)
     base = ARCHIVE_DIR
     target = (base / path).resolve()
@@ -707,62 +1274,68 @@ async def save_file(request: Request, path: str = Form(...), content: str = Form
         raise HTTPException(status_code=404, detail="File not found")
     if target.is_dir():
         raise HTTPException(status_code=400, detail="Cannot save to a directory")
-    target.write_text(content)
+    await asyncio.to_thread(write_atomic, target, content)
     commit_msg = message.strip() or f"Edit {path} via console"
-    try:
-        subprocess.run(["git", "add", str(target)], cwd=str(base), timeout=10, capture_output=True)
-        subprocess.run(["git", "commit", "-m", commit_msg], cwd=str(base), timeout=15, capture_output=True)
-        subprocess.run(["git", "push"], cwd=str(base), timeout=30, capture_output=True)
-    except Exception:
-        pass
+    git_writer.submit([str(target)], commit_msg)
     return {"status": "saved", "path": path}
 
 
 @app.get("/api/search/files")
-async def search_files(request: Request, q: str = Query(..., min_length=1)):
+async def search_files(request: Request, q: str = Query(..., min_length=1),
+                       limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0),
+                       prefix: bool = Query(True)):
+    """Ranked full-text search over md/txt/json files, from the file index."""
     require_auth(request)
-    output = run_cmd(["grep", "-rl", "--include=*.md", "--include=*.txt", "--include=*.json",
-                       "-i", q, str(ARCHIVE_DIR)], timeout=15)
-    files = [f.replace(str(ARCHIVE_DIR) + "/", "") for f in output.strip().split("\n") if f]
-    return {"query": q, "files": files[:50]}
+    if file_index.empty():
+        # Index not built yet (run scripts/index-files.py): fall back to grep
+        output = await run_cmd(["grep", "-rl", "--include=*.md", "--include=*.txt",
+                                 "--include=*.json", "-i", q, str(ARCHIVE_DIR)],
+                               timeout=15, request=request)
+        files = [f.replace(str(ARCHIVE_DIR) + "/", "") for f in output.strip().split("\n") if f]
+        return {"query": q, "files": files[:50], "indexed": False}
+    found = await asyncio.to_thread(file_index.search, q, limit, offset, prefix)
+    return {
+        "query": q,
+        "files": [r["path"] for r in found["results"]],
+        "results": found["results"],
+        "offset": offset,
+        "next_offset": offset + limit if found["has_more"] else None,
+        "indexed": True,
+    }
 
 
 # --- API: Contacts ---
 
 @app.get("/api/contacts")
-async def search_contacts(request: Request, q: str = Query("", min_length=0)):
-    """Search the relationships repo for people."""
-    require_auth(request)
-    people_dir = ARCHIVE_DIR / "private" / "relationships" / "people"
-    contacts = []
-    if people_dir.exists():
-        for d in sorted(people_dir.iterdir()):
-            if not d.is_dir():
-                continue
-            name = d.name.replace("-", " ").title()
-            if q and q.lower() not in name.lower():
-                continue
-            readme = d / "README.md"
-            context = ""
-            if readme.exists():
-                try:
-                    for line in readme.read_text().split("\n"):
-                        if "**Context:**" in line:
-                            context = line.split("**Context:**")[-1].strip()
-                            break
-                except Exception:
-                    pass
-            contacts.append({"slug": d.name, "name": name, "context": context})
-    return {"contacts": contacts}
+async def search_contacts(request: Request, q: str = Query("", min_length=0),
+                          offset: int = Query(0, ge=0),
+                          limit: int = Query(CONTACTS_PAGE_SIZE, ge=1, le=500)):
+    """Search the relationships repo for people: names, aliases, emails,
+    phones and context, with prefix and fuzzy matching, best match first."""
+    require_auth(request)
+    result = await asyncio.to_thread(people_directory.search, q, offset, limit)
+    more = offset + limit < result["total"]
+    return {"contacts": result["people"], "total": result["total"],
+            "offset": offset, "next_offset": offset + limit if more else None}
+
+
+@app.get("/api/contacts/lookup")
+async def lookup_contact(request: Request, email: str = Query(""), phone: str = Query("")):
+    """Map an email address or phone number to relationship slugs."""
+    require_auth(request)
+    slugs = people_index.lookup_email(email) if email else []
+    if phone:
+        slugs += [s for s in people_index.lookup_phone(phone) if s not in slugs]
+    return {"email": email, "phone": phone, "slugs": slugs}
 
 
 @app.get("/api/contacts/{slug}")
 async def get_contact(request: Request, slug: str):
     require_auth(request)
-    readme = ARCHIVE_DIR / "private" / "relationships" / "people" / slug / "README.md"
-    if not readme.exists():
+    content = await asyncio.to_thread(people_directory.readme, slug)
+    if content is None:
         raise HTTPException(status_code=404, detail="Contact not found")
-    return {"slug": slug, "content": readme.read_text()}
+    return {"slug": slug, "content": content}
 
 
 # --- API: People & Ideas Indexes ---
@@ -799,56 +1372,122 @@ async def get_idea(request: Request, path: str):
 
 # --- API: Notifications ---
 
-NOTIFICATION_STATE_FILE = APP_DIR / ".notification-state.json"
-
-
-def load_notification_state() -> dict:
-    if NOTIFICATION_STATE_FILE.exists():
-        try:
-            return json.loads(NOTIFICATION_STATE_FILE.read_text())
-        except Exception:
-            pass
-    return {"last_seen": None}
-
-
-def save_notification_state(state: dict):
-    NOTIFICATION_STATE_FILE.write_text(json.dumps(state))
-
-
-@app.get("/api/notifications")
-async def get_notifications(request: Request):
-    """Return new next-actions items since last check."""
-    require_auth(request)
-
-    state = load_notification_state()
-    last_seen = state.get("last_seen")
-
-    data = load_actions()
-    new_items = []
-
-    for action in data.get("actions", []):
+def notification_items(actions: list[dict], last_seen: str | None) -> list[dict]:
+    """Open actions created after last_seen."""
+    items = []
+    for action in actions:
         if action.get("completed"):
             continue
         created = action.get("created", "")
         if last_seen and created <= last_seen:
             continue
-        new_items.append({
+        items.append({
             "id": action["id"],
             "text": action["text"],
             "context": action.get("context", ""),
             "created": created,
         })
+    return items
+
+
+_known_actions: set[str] | None = None
+
+
+def on_actions_changed(path: Path) -> list:
+    """Actions added since the last change become a "notification" event."""
+    global _known_actions
+    actions = actions_store.snapshot()["actions"]
+    open_ids = {a["id"] for a in actions if not a.get("completed")}
+    events = [("actions", {"open": len(open_ids)})]
+    if _known_actions is not None:
+        new_items = notification_items([a for a in actions if a["id"] not in _known_actions], None)
+        if new_items:
+            events.append(("notification", {"new_items": new_items, "count": len(new_items)}))
+    _known_actions = {a["id"] for a in actions}
+    return events
+
+
+def on_triage_changed(path: Path) -> list:
+    return [("triage", {"etag": triage_store.etag})]
+
+
+_mail_lastmod = None
+
 
+def on_mail_checked(path: Path) -> list:
+    """check-mail.py's health file: an event when a cycle found new threads."""
+    global _mail_lastmod
+    try:
+        health = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return []
+    lastmod, _mail_lastmod = _mail_lastmod, health.get("lastmod")
+    if lastmod is None or health.get("lastmod") == lastmod or not health.get("new_threads"):
+        return []
+    return [("mail", {"new_threads": health["new_threads"], "lastmod": health["lastmod"]})]
+
+
+notifier.watch(ACTIONS_FILE, on_actions_changed)
+notifier.watch(TRIAGE_FILE, on_triage_changed)
+notifier.watch(TRIAGE_JOURNAL, on_triage_changed)
+notifier.watch(CHECK_MAIL_HEALTH, on_mail_checked)
+
+
+@app.get("/api/notifications")
+async def get_notifications(request: Request, device: str | None = Query(None)):
+    """Return new next-actions items since this device last marked them seen."""
+    require_auth(request)
+    last_seen = await asyncio.to_thread(seen_state.get, device)
+    new_items = notification_items(actions_store.snapshot().get("actions", []), last_seen)
     return {"new_items": new_items, "count": len(new_items)}
 
 
+async def notification_events(request: Request, device: str | None, last_event_id: str | None):
+    queue = notifier.subscribe()
+    try:
+        backlog = notifier.since(last_event_id)
+        if backlog is None:
+            # New connection (or too far behind to resume): start from a snapshot
+            last_seen = await asyncio.to_thread(seen_state.get, device)
+            new_items = notification_items(actions_store.snapshot().get("actions", []), last_seen)
+            backlog = [(f"{notifier.boot}-0", "notifications",
+                        {"new_items": new_items, "count": len(new_items)})]
+        for event_id, event, data in backlog:
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), NOTIFY_KEEPALIVE)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            if item is None:
+                return
+            event_id, event, data = item
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        notifier.unsubscribe(queue)
+
+
+@app.get("/api/notifications/stream")
+async def stream_notifications(request: Request, device: str | None = Query(None)):
+    """Server-sent events: a "notifications" snapshot, then "notification",
+    "actions", "triage", "mail" and "seen" events as they happen."""
+    require_auth(request)
+    return StreamingResponse(
+        notification_events(request, device, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.post("/api/notifications/mark-seen")
-async def mark_notifications_seen(request: Request):
-    """Mark all current notifications as seen."""
+async def mark_notifications_seen(request: Request, device: str | None = Query(None)):
+    """Mark all current notifications as seen (for this device)."""
     require_auth(request)
-    now = datetime.now(timezone.utc).isoformat()
-    save_notification_state({"last_seen": now})
-    return {"status": "ok", "last_seen": now}
+    now = await asyncio.to_thread(seen_state.mark, device)
+    notifier.publish("seen", {"device": device, "last_seen": now})
+    return {"status": "ok", "device": device, "last_seen": now}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+"""Parsed email threads: extraction from `notmuch show` JSON plus an LRU cache.
+
+Entries are stamped with the notmuch (database uuid, lastmod revision) they
+were parsed at. A stale stamp doesn't mean a stale entry: the caller asks
+notmuch whether anything in the thread changed since that revision, and if
+not, restamps the entry instead of re-parsing.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def _headers(msg: dict) -> dict:
+    headers = msg.get("headers", {})
+    return {
+        "id": msg.get("id", ""),
+        "from": headers.get("From", ""),
+        "to": headers.get("To", ""),
+        "cc": headers.get("Cc", ""),
+        "subject": headers.get("Subject", ""),
+        "date": headers.get("Date", ""),
+        "timestamp": msg.get("timestamp"),
+        "tags": msg.get("tags", []),
+    }
+
+
+def extract_text(body) -> str:
+    """text/plain parts of a message body, in order. Other parts are skipped
+    without descending into their content."""
+    parts = []
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            ct = node.get("content-type", "")
+            content = node.get("content")
+            if ct == "text/plain" and isinstance(content, str):
+                parts.append(content)
+            elif ct.startswith("multipart/") and isinstance(content, list):
+                stack.extend(reversed(content))
+    return "\n".join(parts)
+
+
+def parse_messages(raw, bodies: bool = True) -> list[dict]:
+    """Flatten notmuch's nested [[message, [replies...]], ...] thread structure."""
+    messages = []
+    stack = [raw]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict) and "headers" in node:
+            msg = _headers(node)
+            if bodies:
+                text = extract_text(node.get("body", []))
+                msg["body"] = text or "(no text content)"
+            messages.append(msg)
+    return messages
+
+
+def by_date(messages: list[dict]) -> list[dict]:
+    """Messages oldest first. parse_messages returns them in reply-tree
+    order, where a late reply to the first message comes before later
+    replies to the second one."""
+    return sorted(messages, key=lambda m: m.get("timestamp") or 0)
+
+
+class ThreadCache:
+    """LRU of JSON-serializable values, bounded by their serialized size."""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (stamp, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.revalidated = 0
+
+    def get(self, key) -> tuple | None:
+        """(stamp, value) for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, stamp, value):
+        size = len(json.dumps(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (stamp, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def restamp(self, key, stamp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries[key] = (stamp, entry[1], entry[2])
+                self.revalidated += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits,
+                    "misses": self.misses, "revalidated": self.revalidated}
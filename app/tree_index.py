@@ -0,0 +1,257 @@
+"""Filesystem metadata index: one row per file or directory (SQLite).
+
+Directories carry recursive totals (size, file count) so the console can
+show folder sizes and sort big listings without walking the tree. update()
+only re-lists directories whose mtime changed since the last scan -- adding,
+removing or renaming an entry (including rclone/mbsync's write-then-rename)
+bumps the parent's mtime -- and then re-totals the affected ancestors.
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER,           -- recursive for directories; NULL until scanned
+    mtime_ns INTEGER,       -- for directories: mtime at last scan, NULL if never scanned
+    children INTEGER,       -- visible (non-dot) direct entries
+    files INTEGER           -- recursive file count
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries(parent, name);
+CREATE INDEX IF NOT EXISTS entries_size ON entries(parent, size, name);
+CREATE INDEX IF NOT EXISTS entries_mtime ON entries(parent, mtime_ns, name);
+"""
+
+SORT_COLUMNS = {"name": "name", "size": "size", "mtime": "mtime_ns"}
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("invalid cursor")
+    return values
+
+
+class TreeIndex:
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    # --- Updating ---
+
+    def _scan_dir(self, path: str, st) -> list[str]:
+        """Re-list one directory: upsert its children, drop vanished ones.
+        Returns the child directories."""
+        db = self._db
+        known = dict(db.execute("SELECT name, is_dir FROM entries WHERE parent = ?", (path,)))
+        subdirs = []
+        kinds = {}
+        rows = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    est = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                kinds[entry.name] = int(is_dir)
+                if is_dir:
+                    subdirs.append(entry.path)
+                    # A new directory's size and mtime stay NULL until it is scanned
+                    rows.append((entry.path, path, entry.name, 1, None, None))
+                else:
+                    rows.append((entry.path, path, entry.name, 0, est.st_size, est.st_mtime_ns))
+        for name, is_dir in known.items():
+            if kinds.get(name) != is_dir:
+                self._delete_tree(os.path.join(path, name))
+        db.executemany(
+            "INSERT INTO entries (path, parent, name, is_dir, size, mtime_ns) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET is_dir = excluded.is_dir, "
+            "size = CASE WHEN excluded.is_dir THEN size ELSE excluded.size END, "
+            "mtime_ns = CASE WHEN excluded.is_dir THEN mtime_ns ELSE excluded.mtime_ns END",
+            rows)
+        db.execute("UPDATE entries SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, path))
+        return subdirs
+
+    def _delete_tree(self, path: str):
+        self._db.execute("DELETE FROM entries WHERE path = ? OR path >= ? AND path < ?",
+                         (path, path + "/", path + "0"))
+
+    def _retotal(self, path: str):
+        """Recompute a directory's totals from its children's rows."""
+        size, files, children = self._db.execute(
+            "SELECT SUM(size), "
+            "COALESCE(SUM(CASE WHEN is_dir THEN files ELSE 1 END), 0), "
+            "COALESCE(SUM(substr(name, 1, 1) != '.'), 0) "
+            "FROM entries WHERE parent = ?", (path,)).fetchone()
+        self._db.execute("UPDATE entries SET size = ?, files = ?, children = ? WHERE path = ?",
+                         (size, files, children, path))
+
+    def _ensure_row(self, path: str):
+        parent, name = os.path.split(path)
+        self._db.execute(
+            "INSERT OR IGNORE INTO entries (path, parent, name, is_dir) VALUES (?, ?, ?, 1)",
+            (path, parent, name))
+
+    def update(self, root: Path, full: bool = False, log=None) -> dict:
+        """Bring the index for root (recursively) in line with the disk.
+
+        full=True re-lists every directory, catching in-place file edits that
+        don't touch the directory's mtime.
+        """
+        start = time.monotonic()
+        root = str(root.resolve())
+        scanned = visited = pending = 0
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure_row(root)
+                # Iterative post-order walk: totals are computed after children
+                stack = [(root, False)]
+                while stack:
+                    path, done = stack.pop()
+                    if done:
+                        self._retotal(path)
+                        continue
+                    visited += 1
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        self._delete_tree(path)
+                        continue
+                    row = db.execute("SELECT mtime_ns FROM entries WHERE path = ?", (path,)).fetchone()
+                    if full or row is None or row[0] != st.st_mtime_ns:
+                        try:
+                            subdirs = self._scan_dir(path, st)
+                        except OSError:
+                            subdirs = []
+                        scanned += 1
+                        pending += 1
+                    else:
+                        subdirs = [r[0] for r in db.execute(
+                            "SELECT path FROM entries WHERE parent = ? AND is_dir = 1", (path,))]
+                    stack.append((path, True))
+                    stack.extend((d, False) for d in subdirs)
+                    if pending >= COMMIT_EVERY:
+                        pending = 0
+                        db.execute("COMMIT")
+                        db.execute("BEGIN IMMEDIATE")
+                        if log:
+                            log(f"  scanned {scanned} directories...")
+                self._retotal_ancestors(root)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return {"root": root, "directories": visited, "rescanned": scanned,
+                "seconds": round(time.monotonic() - start, 1)}
+
+    def _retotal_ancestors(self, path: str):
+        parent = self._db.execute("SELECT parent FROM entries WHERE path = ?", (path,)).fetchone()
+        while parent and parent[0]:
+            path = parent[0]
+            if self._db.execute("SELECT 1 FROM entries WHERE path = ?", (path,)).fetchone() is None:
+                break
+            self._retotal(path)
+            parent = self._db.execute("SELECT parent FROM entries WHERE path = ?", (path,)).fetchone()
+
+    def refresh_dir(self, path: Path) -> bool:
+        """Re-list one directory if it changed since its last scan (no recursion:
+        new subdirectories show up without sizes until the next update()).
+        Returns True if it was rescanned."""
+        path = str(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._db.execute("SELECT mtime_ns FROM entries WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == st.st_mtime_ns:
+                return False
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure_row(path)
+                self._scan_dir(path, st)
+                self._retotal(path)
+                self._retotal_ancestors(path)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return True
+
+    # --- Reading ---
+
+    def get(self, path: Path) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name, is_dir, size, mtime_ns, children, files FROM entries WHERE path = ?",
+                (str(path),)).fetchone()
+        return self._entry(row) if row else None
+
+    def size(self, path: Path) -> int | None:
+        entry = self.get(path)
+        return entry["size"] if entry else None
+
+    @staticmethod
+    def _entry(row) -> dict:
+        name, is_dir, size, mtime_ns, children, files = row
+        entry = {"name": name, "is_dir": bool(is_dir), "size": size,
+                 "mtime": mtime_ns // 1_000_000_000 if mtime_ns else None}
+        if is_dir:
+            entry["children"] = children
+            entry["files"] = files
+        return entry
+
+    def list(self, path: Path, sort: str = "name", desc: bool = False,
+             cursor: str | None = None, limit: int = 200) -> dict:
+        """One page of a directory's visible entries, keyset-paginated on
+        (sort column, name). Raises ValueError for a bad sort or cursor."""
+        column = SORT_COLUMNS.get(sort)
+        if column is None:
+            raise ValueError(f"sort must be one of: {sorted(SORT_COLUMNS)}")
+        direction = "DESC" if desc else "ASC"
+        op = "<" if desc else ">"
+        # NULL sizes/mtimes (unscanned directories) sort as -1
+        key = f"COALESCE({column}, -1)" if column != "name" else "name"
+        sql = ("SELECT name, is_dir, size, mtime_ns, children, files, " + key +
+               " FROM entries WHERE parent = ? AND substr(name, 1, 1) != '.'")
+        params: list = [str(path)]
+        if cursor:
+            after_key, after_name = decode_cursor(cursor)
+            sql += f" AND ({key}, name) {op} (?, ?)"
+            params += [after_key, after_name]
+        sql += f" ORDER BY {key} {direction}, name {direction} LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor([last[6], last[0]])
+        return {"entries": [self._entry(r[:6]) for r in page], "next_cursor": next_cursor}
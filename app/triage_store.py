@@ -0,0 +1,172 @@
+"""In-memory communication triage, indexed by id, with a status journal.
+
+Status changes are appended to a small journal (one JSON line each) instead
+of rewriting docs/communication-triage.json every time. compact() folds the
+journal into the JSON file; the console does that periodically and on
+shutdown. Loading replays the journal over the file, so a change is never
+lost between compactions, and replaying an already-compacted entry is
+harmless.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from jsonfile import file_stamp, locked, write_json
+
+STATUSES = {"needs-response", "replied", "waiting", "snoozed", "archived", "to-read", "read"}
+
+
+class TriageStore:
+    def __init__(self, path: Path, journal_path: Path):
+        self.path = path
+        self.journal_path = journal_path
+        self._data: dict = {"generated": None, "items": []}
+        self._by_id: dict[str, dict] = {}
+        self._stamp = None
+        self._journal_pos = 0
+        self._pending = 0
+        self._version = ""
+        self._etag = ""
+        self._lock = threading.Lock()
+        self.last_compacted_at = None
+        self.last_error = None
+
+    def _reload_if_changed(self):
+        stamp = file_stamp(self.path)
+        if stamp != self._stamp:
+            data = {"generated": None, "items": []}
+            if stamp is not None:
+                try:
+                    data = json.loads(self.path.read_text())
+                    data.setdefault("items", [])
+                except ValueError:
+                    pass
+            self._data = data
+            self._by_id = {i["id"]: i for i in data["items"] if "id" in i}
+            self._stamp = stamp
+            self._journal_pos = 0
+            self._pending = 0
+        self._replay_journal()
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_pos)
+                chunk = f.read()
+        except FileNotFoundError:
+            chunk = b""
+        if chunk:
+            # Only whole lines; a torn final line is re-read next time
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                item = self._by_id.get(entry.get("id"))
+                if item is not None:
+                    item["status"] = entry["status"]
+                self._pending += 1
+            self._journal_pos += end
+        version = f"{self._stamp}:{self._journal_pos}"
+        if version != self._version:
+            self._version = version
+            self._etag = hashlib.sha1(version.encode()).hexdigest()[:16]
+
+    @property
+    def etag(self) -> str:
+        """Changes whenever the file or the journal does."""
+        with self._lock:
+            self._reload_if_changed()
+            return f'"{self._etag}"'
+
+    def get(self, item_id: str) -> dict | None:
+        with self._lock:
+            self._reload_if_changed()
+            item = self._by_id.get(item_id)
+            return dict(item) if item else None
+
+    def query(self, status: set[str] | None = None, person: str | None = None,
+              offset: int = 0, limit: int | None = None) -> dict:
+        """Items matching every given filter, in file order. person matches
+        the relationship slug, sender email or sender name (substring)."""
+        person = person.lower() if person else None
+        with self._lock:
+            self._reload_if_changed()
+            matched = []
+            for item in self._data["items"]:
+                if status and item.get("status") not in status:
+                    continue
+                if person and not any(person in (item.get(k) or "").lower()
+                                      for k in ("relationship_slug", "from_email", "from_name")):
+                    continue
+                matched.append(item)
+            page = matched[offset:offset + limit] if limit is not None else matched[offset:]
+            return {
+                "generated": self._data.get("generated"),
+                "total": len(matched),
+                "items": copy.deepcopy(page),
+            }
+
+    def set_status(self, item_id: str, status: str) -> dict | None:
+        """Record a status change in the journal. Returns the updated item."""
+        with self._lock:
+            self._reload_if_changed()
+            item = self._by_id.get(item_id)
+            if item is None:
+                return None
+            line = json.dumps({"id": item_id, "status": status, "at": int(time.time())}) + "\n"
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with locked(self.journal_path):
+                fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line.encode())
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            # Picks up our own line (and anything appended before it)
+            self._replay_journal()
+            return dict(self._by_id.get(item_id) or item)
+
+    def pending(self) -> list[dict]:
+        """Journal entries not yet folded into the JSON file."""
+        try:
+            lines = self.journal_path.read_text().splitlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                pass
+        return entries
+
+    def compact(self) -> list[dict]:
+        """Write journaled statuses into the JSON file and empty the journal.
+        Returns the entries that were folded in."""
+        with self._lock, locked(self.path), locked(self.journal_path):
+            self._reload_if_changed()
+            entries = self.pending()
+            if not entries:
+                return []
+            write_json(self.path, self._data)
+            os.truncate(self.journal_path, 0)
+            self._stamp = file_stamp(self.path)
+            self._journal_pos = 0
+            self._pending = 0
+            self._replay_journal()
+            self.last_compacted_at = int(time.time())
+            self.last_error = None
+            return entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._reload_if_changed()
+            return {"items": len(self._by_id), "journal_pending": self._pending,
+                    "last_compacted_at": self.last_compacted_at, "last_error": self.last_error}
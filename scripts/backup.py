@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Encrypted, change-aware backup of the archive to B2 (rclone crypt).
+
+Each backup root (cloud mirrors, mail, conversations, config, every private
+repo, coordination, docs) has a local manifest: path -> size, mtime and
+sha1 of every file as of its last successful upload. A run walks each root
+(stat only; files whose size or mtime moved are re-hashed) and compares:
+
+  - nothing changed       -> skipped; the remote isn't touched at all
+  - some files changed    -> `rclone copy --files-from` for new/modified
+                             files and `rclone delete --files-from` for
+                             removed ones, without listing the remote
+  - no manifest, --full,  -> `rclone sync --fast-list` of the whole root
+    many changes, or the     (the periodic full sync also repairs anything
+    last full sync is old    the manifest can't see, like remote edits)
+
+A file whose mtime changed but whose content hash didn't is not uploaded.
+Changed roots upload in parallel, within a global budget: BACKUP_WORKERS
+roots at a time, with BACKUP_TRANSFERS and BACKUP_BWLIMIT_MB split between
+them.
+
+Results go to .cache/backup-status.json, which is rewritten as each root
+finishes. Each root's run (timings, bytes, throughput) is also recorded in
+.cache/metrics.sqlite, the run history the console charts trends from.
+
+Usage:
+  backup.py                         # what backup.sh runs
+  backup.py --full                  # full rclone sync of every root
+  backup.py --only config,docs      # just these roots
+  backup.py --dry-run               # scan and report what would upload
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+CACHE_DIR = ARCHIVE_DIR / ".cache"
+MANIFEST_DIR = CACHE_DIR / "backup-manifests"
+STATUS_FILE = CACHE_DIR / "backup-status.json"
+METRICS_DB = CACHE_DIR / "metrics.sqlite"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from jsonfile import write_atomic, write_json  # noqa: E402
+from metrics_store import MetricsStore  # noqa: E402
+
+# CONFIGURE: the encrypted remote, and your mail directory
+REMOTE = os.environ.get("BACKUP_REMOTE", "b2-crypt:")
+MAIL_DIR = Path(os.environ.get("MAIL_DIR", os.path.expanduser("~/Mail/gmail")))
+
+# CONFIGURE: the global budget. Roots uploading at once, and the total
+# rclone transfers and bandwidth (MiB/s, 0 = unlimited) shared between them
+BACKUP_WORKERS = int(os.environ.get("BACKUP_WORKERS", "3"))
+BACKUP_TRANSFERS = int(os.environ.get("BACKUP_TRANSFERS", "8"))
+BACKUP_BWLIMIT_MB = float(os.environ.get("BACKUP_BWLIMIT_MB", "0"))
+
+# Full sync of a root at least this often, or when more files changed than
+# a per-file upload is worth (listing is cheaper than that many lookups)
+FULL_SYNC_DAYS = 7
+INCREMENTAL_MAX_FILES = 5000
+SCAN_WORKERS = 2
+HASH_CHUNK = 1 << 20
+STEP_TIMEOUT = 12 * 3600
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def backup_roots() -> list[dict]:
+    """name, local path, remote path, and whether .git/ is excluded."""
+    roots = []
+
+    def add(rel, path=None, skip_git=True):
+        path = path or ARCHIVE_DIR / rel
+        if path.is_dir():
+            roots.append({"name": rel, "path": path, "dest": f"{REMOTE}{rel}/", "skip_git": skip_git})
+
+    for rel in ("cloud/google-drive", "cloud/dropbox"):
+        add(rel)
+    add("mail/gmail", MAIL_DIR, skip_git=False)
+    for rel in ("conversations/openai", "conversations/claude", "conversations/slack",
+                "conversations/discord", "conversations/linkedin", "config"):
+        add(rel)
+    # Every private repo (auto-discovered)
+    private = ARCHIVE_DIR / "private"
+    if private.is_dir():
+        for entry in sorted(private.iterdir()):
+            if entry.is_dir():
+                add(f"private/{entry.name}")
+    for rel in ("coordination", "docs"):
+        add(rel)
+    return roots
+
+
+# --- Manifests ---
+
+def manifest_path(name: str) -> Path:
+    return MANIFEST_DIR / (name.replace("/", "__") + ".json")
+
+
+def load_manifest(name: str) -> dict | None:
+    try:
+        with open(manifest_path(name)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_manifest(name: str, manifest: dict):
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    write_atomic(manifest_path(name), json.dumps(manifest, separators=(",", ":")))
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan(root: dict, old: dict) -> dict:
+    """Walk a root against its previous manifest entries. Files whose size
+    and mtime match keep their old hash; the rest are hashed."""
+    base = str(root["path"])
+    files, changed = {}, []
+    hashed = 0
+    for dirpath, dirs, names in os.walk(base):
+        if root["skip_git"]:
+            dirs[:] = [d for d in dirs if d != ".git"]
+        for n in names:
+            full = os.path.join(dirpath, n)
+            try:
+                st = os.lstat(full)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):  # rclone skips symlinks too
+                continue
+            rel = os.path.relpath(full, base)
+            prev = old.get(rel)
+            if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+                files[rel] = prev
+                continue
+            try:
+                digest = file_hash(full)
+            except OSError:
+                continue
+            hashed += 1
+            files[rel] = [st.st_size, st.st_mtime_ns, digest]
+            if not prev or prev[2] != digest:
+                changed.append(rel)
+    deleted = sorted(set(old) - set(files))
+    return {"files": files, "changed": sorted(changed), "deleted": deleted, "hashed": hashed,
+            "bytes": sum(files[p][0] for p in changed)}
+
+
+# --- rclone ---
+
+def rclone_budget(workers: int) -> list[str]:
+    """A root's share of the global transfer and bandwidth budget, when
+    `workers` roots upload at once."""
+    args = ["--transfers", str(max(1, BACKUP_TRANSFERS // workers))]
+    if BACKUP_BWLIMIT_MB > 0:
+        args += ["--bwlimit", f"{BACKUP_BWLIMIT_MB / workers:.2f}M"]
+    return args
+
+
+def rclone_stats(lines) -> dict:
+    """bytes/files/deletes from rclone's final JSON stats line."""
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        stats = entry.get("stats")
+        if stats:
+            return {"bytes": stats.get("bytes", 0), "files": stats.get("transfers", 0),
+                    "deletes": stats.get("deletes", 0)}
+    return {}
+
+
+async def rclone(name, args, budget) -> dict:
+    """Run one rclone command for a root, logging its messages. Returns its
+    stats; raises RuntimeError on failure."""
+    proc = await asyncio.create_subprocess_exec(
+        "rclone", *args, *budget, "--use-json-log", "--log-level", "NOTICE",
+        "--stats", "1m", "--stats-log-level", "NOTICE",
+        stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT)
+    lines = []
+
+    async def pump():
+        async for raw in proc.stdout:
+            line = raw.decode(errors="replace").rstrip()
+            lines.append(line)
+            if line.startswith("{"):
+                try:
+                    line = json.loads(line).get("msg", line).strip()
+                except ValueError:
+                    pass
+            log(f"  [{name}] {line}")
+
+    try:
+        await asyncio.wait_for(asyncio.gather(pump(), proc.wait()), STEP_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise RuntimeError(f"rclone {args[0]} timed out")
+    if proc.returncode != 0:
+        raise RuntimeError(f"rclone {args[0]} failed (exit {proc.returncode})")
+    return rclone_stats(lines)
+
+
+def list_file(paths: list[str]) -> str:
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=MANIFEST_DIR, prefix=".files-", suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(paths) + "\n")
+    return tmp
+
+
+# --- Runs ---
+
+class Backup:
+    def __init__(self, roots: list[dict], full: bool, dry_run: bool, workers: int):
+        self.roots = roots
+        self.full = full
+        self.dry_run = dry_run
+        self.workers = max(1, workers)
+        self.started = time.time()
+        self.records: dict[str, dict] = {r["name"]: {"status": "pending"} for r in roots}
+        # Roots not in this run (--only) keep their last record
+        try:
+            previous = json.loads(STATUS_FILE.read_text()).get("roots", {})
+        except (OSError, ValueError):
+            previous = {}
+        self.previous = {k: v for k, v in previous.items() if k not in self.records}
+        self.upload_slots = asyncio.Semaphore(self.workers)
+        self.scan_slots = asyncio.Semaphore(SCAN_WORKERS)
+        # Uploads wait until every root is planned, so the budget is split
+        # between the roots that actually upload
+        self.unplanned = len(roots)
+        self.uploads_left = 0
+        self.planned = asyncio.Event()
+        try:
+            self.metrics = None if dry_run else MetricsStore(METRICS_DB)
+        except (sqlite3.Error, OSError) as e:
+            log(f"Metrics store unavailable: {e}")
+            self.metrics = None
+
+    def write_status(self, finished: bool = False):
+        if self.dry_run:
+            return
+        uploaded = sum(r.get("bytes", 0) for r in self.records.values())
+        upload_s = sum(r.get("upload_seconds", 0) for r in self.records.values())
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_json(STATUS_FILE, {
+            "last_run": iso(self.started),
+            "finished_at": iso(time.time()) if finished else None,
+            "duration": round(time.time() - self.started, 1) if finished else None,
+            "running": not finished,
+            "bytes": uploaded,
+            "bytes_per_sec": round(uploaded / upload_s) if upload_s else None,
+            "budget": {"workers": self.workers, "transfers": BACKUP_TRANSFERS,
+                       "bwlimit_mb": BACKUP_BWLIMIT_MB or None,
+                       "uploads_left": self.uploads_left},
+            "roots": {**self.previous, **self.records},
+        })
+
+    def record_metrics(self, name: str, started_at: float, record: dict):
+        if self.dry_run or self.metrics is None:
+            return
+        try:
+            self.metrics.record(
+                "backup", name, started_at, record.get("duration"), record["status"],
+                bytes=record.get("bytes"), items=record.get("files"),
+                **{k: record.get(k) for k in ("mode", "scan_seconds", "upload_seconds", "deletes",
+                                              "changed_files", "bytes_per_sec")})
+        except sqlite3.Error as e:
+            log(f"  could not record metrics for {name}: {e}")
+
+    def plan(self, manifest: dict | None, result: dict) -> str:
+        if self.full or manifest is None:
+            return "full"
+        if time.time() - manifest.get("last_full", 0) > FULL_SYNC_DAYS * 86400:
+            return "full"
+        if not result["changed"] and not result["deleted"]:
+            return "unchanged"
+        if len(result["changed"]) + len(result["deleted"]) > INCREMENTAL_MAX_FILES:
+            return "full"
+        return "incremental"
+
+    def mark_planned(self, uploading: bool):
+        self.uploads_left += uploading
+        self.unplanned -= 1
+        if self.unplanned == 0:
+            self.planned.set()
+
+    async def upload(self, root: dict, mode: str, result: dict) -> dict:
+        name, src = root["name"], str(root["path"]) + "/"
+        exclude = ["--exclude", ".git/**"] if root["skip_git"] else []
+        # Shares only grow as uploads finish, and no more than
+        # min(workers, uploads_left) roots run at once, so the roots running
+        # together never exceed the global budget
+        budget = rclone_budget(min(self.workers, self.uploads_left))
+        if mode == "full":
+            return await rclone(name, ["sync", src, root["dest"], "--fast-list", *exclude], budget)
+        stats = {"bytes": 0, "files": 0, "deletes": 0}
+        for paths, args in ((result["changed"], ["copy", src, root["dest"], "--no-traverse"]),
+                            (result["deleted"], ["delete", root["dest"]])):
+            if not paths:
+                continue
+            listing = list_file(paths)
+            try:
+                got = await rclone(name, [*args, "--files-from-raw", listing], budget)
+            finally:
+                os.unlink(listing)
+            for k in stats:
+                stats[k] += got.get(k, 0)
+        return stats
+
+    async def run_root(self, root: dict):
+        name = root["name"]
+        start = time.time()
+        record = {"status": "scanning", "started_at": iso(start)}
+        self.records[name] = record
+        mode = None
+        try:
+            try:
+                manifest = load_manifest(name)
+                async with self.scan_slots:
+                    result = await asyncio.to_thread(scan, root, (manifest or {}).get("files", {}))
+                record["scan_seconds"] = round(time.time() - start, 1)
+                mode = self.plan(manifest, result)
+            finally:
+                self.mark_planned(mode not in (None, "unchanged") and not self.dry_run)
+            record.update(mode=mode, total_files=len(result["files"]),
+                          changed_files=len(result["changed"]), deleted_files=len(result["deleted"]),
+                          hashed=result["hashed"])
+            if mode == "unchanged":
+                record.update(status="skipped", message="No changes since last backup")
+            elif self.dry_run:
+                record.update(status="skipped",
+                              message=f"would {mode}: {len(result['changed'])} changed "
+                                      f"({result['bytes']} bytes), {len(result['deleted'])} deleted")
+            else:
+                record["status"] = "waiting"
+                self.write_status()
+                await self.planned.wait()
+                async with self.upload_slots:
+                    record["status"] = "uploading"
+                    self.write_status()
+                    log(f"Backing up {name} ({mode}: {len(result['changed'])} changed, "
+                        f"{len(result['deleted'])} deleted)...")
+                    upload_start = time.time()
+                    try:
+                        stats = await self.upload(root, mode, result)
+                    finally:
+                        self.uploads_left -= 1
+                    upload_s = time.time() - upload_start
+                now = time.time()
+                save_manifest(name, {
+                    "root": name,
+                    "last_success": now,
+                    "last_full": now if mode == "full" else manifest["last_full"],
+                    "files": result["files"],
+                })
+                record.update(status="ok", message=f"{mode} backup completed",
+                              upload_seconds=round(upload_s, 1), **stats,
+                              bytes_per_sec=round(stats.get("bytes", 0) / upload_s) if upload_s else None)
+        except Exception as e:
+            record.update(status="error", message=f"{type(e).__name__}: {e}")
+        record["duration"] = round(time.time() - start, 1)
+        log(f"  {name}: {record['status']} — {record.get('message', '')} ({record['duration']}s)")
+        self.record_metrics(name, start, record)
+        self.write_status()
+
+    async def run(self) -> int:
+        self.write_status()
+        await asyncio.gather(*(self.run_root(r) for r in self.roots))
+        self.write_status(finished=True)
+        errors = sum(1 for r in self.records.values() if r["status"] == "error")
+        uploaded = [r for r in self.records.values() if r.get("upload_seconds")]
+        upload_s = sum(r["upload_seconds"] for r in uploaded)
+        total_bytes = sum(r.get("bytes", 0) for r in uploaded)
+        self.record_metrics("total", self.started, {
+            "status": "error" if errors else "ok", "duration": round(time.time() - self.started, 1),
+            "bytes": total_bytes, "files": sum(r.get("files", 0) for r in uploaded),
+            "upload_seconds": round(upload_s, 1),
+            "bytes_per_sec": round(total_bytes / upload_s) if upload_s else None})
+        return errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--full", action="store_true", help="full rclone sync of every root")
+    parser.add_argument("--only", type=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+                        help="comma-separated root names (e.g. config,private/notes)")
+    parser.add_argument("--dry-run", action="store_true", help="scan only; upload nothing")
+    parser.add_argument("--workers", type=int, default=BACKUP_WORKERS,
+                        help=f"roots uploading at once (default {BACKUP_WORKERS})")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        remotes = ""
+        if shutil.which("rclone"):
+            proc = await asyncio.create_subprocess_exec(
+                "rclone", "listremotes", stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL)
+            remotes = (await proc.communicate())[0].decode()
+        if REMOTE not in remotes.split():
+            log(f"ERROR: {REMOTE.rstrip(':')} remote not configured. See README.md Step 10.")
+            return 1
+
+    roots = backup_roots()
+    if args.only:
+        unknown = set(args.only) - {r["name"] for r in roots}
+        if unknown:
+            parser.error(f"unknown roots: {', '.join(sorted(unknown))} "
+                         f"(have: {', '.join(r['name'] for r in roots)})")
+        roots = [r for r in roots if r["name"] in args.only]
+
+    log(f"Starting encrypted backup of {len(roots)} roots to {REMOTE}...")
+    backup = Backup(roots, args.full, args.dry_run, args.workers)
+    errors = await backup.run()
+    skipped = sum(1 for r in backup.records.values() if r.get("mode") == "unchanged")
+    if errors:
+        log(f"Backup completed with {errors} errors!")
+        return 1
+    log(f"Backup complete in {round(time.time() - backup.started)}s ({skipped} unchanged roots skipped).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare the console's two notmuch backends: the CLI (a notmuch process per
+query, JSON on stdout) and the in-process notmuch2 bindings pool.
+
+For each result size it times a search, then a full `show` of the newest
+thread and a count, and prints the median and best of --repeat runs.
+
+Usage:
+  bench-notmuch.py                          # sizes 10,100,1000 over tag:inbox
+  bench-notmuch.py --query '*' --sizes 50,500,5000 --repeat 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+import commands  # noqa: E402
+from mail_db import NOTMUCH2_AVAILABLE, BindingsBackend, CliBackend  # noqa: E402
+
+
+async def run(cmd, timeout=10, request=None):
+    return (await commands.run(cmd, timeout=timeout)).stdout
+
+
+async def timed(repeat, fn):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times), min(times)
+
+
+async def bench(backend, query, sizes, repeat):
+    rows = []
+    for size in sizes:
+        results, median, best = await timed(repeat, lambda: backend.search(query, limit=size))
+        rows.append((backend.name, f"search {size}", len(results), median, best))
+    newest = await backend.search(query, limit=1)
+    if newest:
+        thread = f"thread:{newest[0]['thread']}"
+        messages, median, best = await timed(repeat, lambda: backend.show(thread))
+        rows.append((backend.name, "show newest", len(messages or []), median, best))
+    total, median, best = await timed(repeat, lambda: backend.count(query))
+    rows.append((backend.name, "count", total, median, best))
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--query", default="tag:inbox")
+    parser.add_argument("--sizes", default="10,100,1000",
+                        type=lambda v: [int(s) for s in v.split(",")])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = [CliBackend(run)]
+    if NOTMUCH2_AVAILABLE:
+        backends.append(BindingsBackend())
+    else:
+        print("notmuch2 bindings not installed; timing the CLI only\n")
+
+    print(f"{'backend':<10} {'operation':<14} {'results':>8} {'median ms':>10} {'best ms':>9}")
+    for backend in backends:
+        for name, op, n, median, best in await bench(backend, args.query, args.sizes, args.repeat):
+            print(f"{name:<10} {op:<14} {n:>8} {median:>10.1f} {best:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
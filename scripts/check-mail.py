@@ -1,26 +1,74 @@
 #!/usr/bin/env python3
 """
 Check for new important emails and route to next-actions.json.
-Runs after mbsync + notmuch new. Tracks last-seen timestamp.
+Runs after mbsync + notmuch new. Tracks a notmuch lastmod cursor, so each
+run only looks at messages added or changed since the previous run.
 
 Priority contacts get Signal notifications (optional).
 Known contacts (anyone in relationships repo) get added to next-actions.
 
 Cron example (every 15 minutes):
   */15 * * * * /home/YOU/archive/.venv/bin/python /home/YOU/archive/scripts/check-mail.py >> /var/log/archive-checkmail.log 2>&1
+
+Or run it as a long-lived watcher (systemd, Restart=always) for sub-minute
+alerts: check-mail.py --daemon. It syncs the inbox on an adaptive 30-60s
+interval (every folder every 15 minutes), runs notmuch new only when the
+maildir changed, and reports its health to the console's /api/status.
+
+Each run (and each daemon cycle that indexed mail) is recorded in
+.cache/metrics.sqlite: duration, threads processed, messages indexed.
 """
 
+import argparse
 import json
 import os
+import re
+import signal
+import sqlite3
 import subprocess
+import threading
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import notmuch2
+    NOTMUCH2_AVAILABLE = True
+except ImportError:
+    NOTMUCH2_AVAILABLE = False
+
 ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 STATE_FILE = ARCHIVE_DIR / "scripts" / ".check-mail-state.json"
 NEXT_ACTIONS = ARCHIVE_DIR / "coordination" / "next-actions.json"
 PEOPLE_DIR = ARCHIVE_DIR / "private" / "relationships" / "people"
+PEOPLE_INDEX_DB = ARCHIVE_DIR / ".cache" / "people-index.sqlite"
+HEALTH_FILE = ARCHIVE_DIR / ".cache" / "check-mail-health.json"
+METRICS_DB = ARCHIVE_DIR / ".cache" / "metrics.sqlite"
+MAIL_DIR = Path(os.environ.get("MAIL_DIR", os.path.expanduser("~/Mail/gmail")))
+
+# mbsync channel/group for a full sync
+MBSYNC_TARGET = os.environ.get("MBSYNC_TARGET", "gmail")
+# Most daemon cycles sync only the inbox, which takes a fraction of the
+# time; every folder is synced every DAEMON_FULL_SYNC seconds
+DAEMON_MBSYNC_TARGET = os.environ.get("DAEMON_MBSYNC_TARGET", "gmail:INBOX")
+DAEMON_FULL_SYNC = int(os.environ.get("DAEMON_FULL_SYNC", "900"))
+
+# Daemon polling: back off from MIN to MAX seconds while nothing arrives,
+# drop back to MIN as soon as new mail shows up
+DAEMON_MIN_INTERVAL = int(os.environ.get("DAEMON_MIN_INTERVAL", "30"))
+DAEMON_MAX_INTERVAL = int(os.environ.get("DAEMON_MAX_INTERVAL", "60"))
+DAEMON_BACKOFF = 1.5
+
+# Shared modules (actions store, people index, mail classifier) live next to the console server
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from actions_store import ActionsStore  # noqa: E402
+from jsonfile import write_json  # noqa: E402
+from mail_classify import UNCLASSIFIED_QUERY, tag_batch  # noqa: E402
+from metrics_store import MetricsStore  # noqa: E402
+from notmuch_cli import message_ids, notmuch_revision, parse_from_header  # noqa: E402
+from people_index import PeopleIndex  # noqa: E402
 
 # CONFIGURE: Your email address (to filter out self-sent mail)
 MY_EMAIL = os.environ.get("MY_EMAIL", "you@gmail.com")
@@ -39,6 +87,15 @@ VIP_EMAILS = set()
 #     "mentor@university.edu",
 # }
 
+# Sender resolution: threads per batched `notmuch show`, and worker threads
+# for the per-thread fallback
+SENDER_BATCH = 200
+SENDER_WORKERS = 8
+
+# Threads whose newest message is older than this are never routed, even if
+# they reappear in the lastmod range (re-tagging, an old folder synced late)
+MAX_MESSAGE_AGE = 7 * 86400
+
 # Ignore these (automated, no action needed)
 IGNORE_PATTERNS = [
     "noreply@", "no-reply@", "notifications@", "mailer-daemon@",
@@ -56,14 +113,13 @@ def load_state():
 
 
 def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f)
+    write_json(STATE_FILE, state)
 
 
-def run_mbsync():
+def run_mbsync(target=MBSYNC_TARGET):
     """Run mbsync to fetch new mail."""
     result = subprocess.run(
-        ["mbsync", "gmail"],
+        ["mbsync", target],
         capture_output=True, text=True, timeout=300
     )
     return result.returncode == 0
@@ -78,9 +134,36 @@ def run_notmuch_new():
     return result.stdout.strip()
 
 
-def get_new_emails(since_timestamp):
-    """Query notmuch for emails newer than timestamp."""
-    query = f"date:{since_timestamp}.. NOT from:{MY_EMAIL}"
+def classify_mail():
+    """Tag every unclassified message human or automated by its sender.
+
+    One `notmuch address` pass collects the distinct senders, one
+    `notmuch tag --batch` applies the tags. The first run backfills the
+    whole database; after that only newly indexed mail is unclassified.
+    """
+    _, revision = notmuch_revision()
+    result = subprocess.run(
+        ["notmuch", "address", "--format=json", "--output=sender",
+         "--deduplicate=address", UNCLASSIFIED_QUERY],
+        capture_output=True, text=True, timeout=600
+    )
+    if result.returncode != 0:
+        return 0
+    try:
+        senders = json.loads(result.stdout or "[]")
+    except json.JSONDecodeError:
+        return 0
+    if not senders:
+        return 0
+    batch = tag_batch((s.get("address", "") for s in senders), revision)
+    subprocess.run(["notmuch", "tag", "--batch"], input=batch,
+                   capture_output=True, text=True, timeout=600)
+    return len(senders)
+
+
+def get_new_emails(range_query):
+    """Query notmuch for threads matching a range term (lastmod:A..B or date:X..Y)."""
+    query = f"({range_query}) NOT from:{MY_EMAIL}"
     result = subprocess.run(
         ["notmuch", "search", "--format=json", "--output=summary", query],
         capture_output=True, text=True, timeout=60
@@ -93,32 +176,133 @@ def get_new_emails(since_timestamp):
         return []
 
 
+def first_message(thread):
+    """First (oldest) message dict in a `notmuch show` thread tree."""
+    if isinstance(thread, dict):
+        return thread if "headers" in thread else None
+    if isinstance(thread, list):
+        for item in thread:
+            msg = first_message(item)
+            if msg:
+                return msg
+    return None
+
+
 def get_sender_email(thread_id):
     """Get the actual sender email address from a thread."""
     result = subprocess.run(
-        ["notmuch", "show", "--format=json", "--entire-thread=false", f"thread:{thread_id}"],
+        ["notmuch", "show", "--format=json", "--body=false", "--entire-thread=false",
+         f"thread:{thread_id}"],
         capture_output=True, text=True, timeout=30
     )
     if result.returncode != 0:
         return None, None
     try:
         data = json.loads(result.stdout)
-        if data and isinstance(data, list):
-            msg = data[0]
-            while isinstance(msg, list):
-                msg = msg[0]
-            if isinstance(msg, dict) and "headers" in msg:
-                from_header = msg["headers"].get("From", "")
-                if "<" in from_header and ">" in from_header:
-                    email = from_header.split("<")[1].split(">")[0].lower()
-                    name = from_header.split("<")[0].strip().strip('"')
-                    return email, name
-                return from_header.lower(), from_header
+        msg = first_message(data[0]) if data else None
+        if msg:
+            return parse_from_header(msg["headers"].get("From", ""))
     except (json.JSONDecodeError, IndexError, KeyError):
         pass
     return None, None
 
 
+def resolve_senders_bindings(thread_ids):
+    """One read-only database handle, one query for all threads."""
+    senders = {}
+    with notmuch2.Database(mode=notmuch2.Database.MODE.READ_ONLY) as db:
+        for i in range(0, len(thread_ids), SENDER_BATCH):
+            chunk = thread_ids[i:i + SENDER_BATCH]
+            query = " or ".join(f"thread:{t}" for t in chunk)
+            for thread in db.threads(query):
+                for msg in thread.toplevel():
+                    senders[str(thread.threadid)] = parse_from_header(msg.header("from"))
+                    break
+    return senders
+
+
+def resolve_senders_batch(threads):
+    """Headers-only `notmuch show` over SENDER_BATCH threads per process.
+
+    Output threads are mapped back to thread ids through the message ids that
+    `notmuch search --output=summary` already returned for each thread.
+    """
+    msg_to_thread = {}
+    for t in threads:
+        for q in t.get("query") or []:
+            for mid in message_ids(q):
+                msg_to_thread[mid] = t["thread"]
+
+    thread_ids = [t["thread"] for t in threads]
+    senders = {}
+    for i in range(0, len(thread_ids), SENDER_BATCH):
+        chunk = thread_ids[i:i + SENDER_BATCH]
+        result = subprocess.run(
+            ["notmuch", "show", "--format=json", "--body=false", "--entire-thread=false",
+             " or ".join(f"thread:{t}" for t in chunk)],
+            capture_output=True, text=True, timeout=120
+        )
+        if result.returncode != 0:
+            continue
+        try:
+            data = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            continue
+        for thread in data:
+            msg = first_message(thread)
+            thread_id = msg_to_thread.get(msg.get("id")) if msg else None
+            if thread_id:
+                senders[thread_id] = parse_from_header(msg["headers"].get("From", ""))
+    return senders
+
+
+def resolve_senders(threads, method="auto"):
+    """Map thread id -> (email, name) for every thread, with as few processes as possible.
+
+    Uses the notmuch Python bindings when installed, otherwise batched
+    `notmuch show`. Any thread neither could resolve falls back to one
+    `notmuch show` per thread, run SENDER_WORKERS at a time.
+    """
+    thread_ids = [t["thread"] for t in threads]
+    senders = {}
+    if method in ("auto", "bindings") and NOTMUCH2_AVAILABLE:
+        try:
+            senders = resolve_senders_bindings(thread_ids)
+        except Exception as e:
+            log(f"notmuch bindings failed ({e}), falling back to notmuch show")
+    if method in ("auto", "batch") and not senders:
+        senders = resolve_senders_batch(threads)
+    missing = [t for t in thread_ids if t not in senders]
+    if missing:
+        with ThreadPoolExecutor(max_workers=SENDER_WORKERS) as pool:
+            for thread_id, sender in zip(missing, pool.map(get_sender_email, missing)):
+                senders[thread_id] = sender
+    return senders
+
+
+def benchmark(since):
+    """Time each sender-resolution strategy over the threads since `since`."""
+    threads = get_new_emails(f"date:{since}..")
+    log(f"Benchmarking sender resolution over {len(threads)} threads since {since}")
+    if not threads:
+        return 0
+    methods = ["batch", "per-thread"]
+    if NOTMUCH2_AVAILABLE:
+        methods.insert(0, "bindings")
+    for method in methods:
+        start = time.monotonic()
+        if method == "per-thread":
+            with ThreadPoolExecutor(max_workers=SENDER_WORKERS) as pool:
+                resolved = sum(1 for r in pool.map(get_sender_email, [t["thread"] for t in threads])
+                               if r[0])
+        else:
+            resolved = sum(1 for r in resolve_senders(threads, method).values() if r[0])
+        elapsed = time.monotonic() - start
+        log(f"  {method:>10}: {resolved}/{len(threads)} resolved in {elapsed:.2f}s "
+            f"({len(threads) / elapsed:.0f} threads/s)")
+    return 0
+
+
 def should_ignore(email):
     """Check if this email should be ignored."""
     if not email:
@@ -132,31 +316,62 @@ def should_ignore(email):
     return False
 
 
+_people_index = None
+
+
+def get_people_index():
+    """Open the shared people index, re-reading only people edited since last run."""
+    global _people_index
+    if _people_index is None:
+        _people_index = PeopleIndex(PEOPLE_DIR, PEOPLE_INDEX_DB)
+        _people_index.refresh()
+    return _people_index
+
+
+_actions_store = None
+
+
+def get_actions_store():
+    global _actions_store
+    if _actions_store is None:
+        _actions_store = ActionsStore(NEXT_ACTIONS)
+    return _actions_store
+
+
+_metrics = None
+
+
+def record_run(mode, started_at, status, new_threads=None, notmuch_output=""):
+    """Append this run/cycle to the console's metrics history (best effort)."""
+    global _metrics
+    match = re.search(r"Added (\d+) new message", notmuch_output or "")
+    try:
+        if _metrics is None:
+            _metrics = MetricsStore(METRICS_DB)
+        _metrics.record("check-mail", mode, started_at, round(time.time() - started_at, 2), status,
+                        items=len(new_threads) if new_threads is not None else None,
+                        messages=int(match.group(1)) if match else 0)
+    except (sqlite3.Error, OSError) as e:
+        log(f"Could not record metrics: {e}")
+
+
 def is_known_person(email):
     """Check if this email belongs to someone in the relationships repo."""
     if not email or not PEOPLE_DIR.exists():
         return False
-    result = subprocess.run(
-        ["grep", "-rl", email.lower(), str(PEOPLE_DIR), "--include=*.md"],
-        capture_output=True, text=True, timeout=30
-    )
-    return bool(result.stdout.strip())
+    return bool(get_people_index().lookup_email(email))
 
 
 def add_to_next_actions(subject, sender_name, sender_email, thread_id):
-    """Add a new email notification to next-actions.json."""
+    """Add a new email notification to next-actions.json.
+
+    Goes through the same locked, atomic write path as the console, so an
+    edit made in the dashboard at the same moment is never lost.
+    """
     if not NEXT_ACTIONS.exists():
         return False
 
-    with open(NEXT_ACTIONS) as f:
-        data = json.load(f)
-
-    # Check for duplicates
     action_id = f"mail-{thread_id[-6:]}"
-    for action in data.get("actions", []):
-        if action.get("id") == action_id:
-            return False
-
     now = datetime.now(timezone.utc).isoformat()
     new_action = {
         "id": action_id,
@@ -168,12 +383,8 @@ def add_to_next_actions(subject, sender_name, sender_email, thread_id):
         "completed": None,
     }
 
-    data["actions"].insert(0, new_action)
-
-    with open(NEXT_ACTIONS, "w") as f:
-        json.dump(data, f, indent=2)
-
-    return True
+    # Returns False if this thread is already in the list
+    return get_actions_store().add(new_action, front=True)
 
 
 def send_signal_notification(message):
@@ -189,45 +400,19 @@ def send_signal_notification(message):
         pass  # Best effort
 
 
-def main():
-    state = load_state()
-    last_check = state.get("last_check", 0)
-
-    # Run mbsync
-    log("Running mbsync...")
-    if not run_mbsync():
-        log("mbsync failed, skipping")
-        return 1
-
-    # Index new mail
-    notmuch_output = run_notmuch_new()
-    if notmuch_output:
-        log(f"notmuch: {notmuch_output}")
-
-    # Calculate timestamp for query
-    if last_check:
-        since = datetime.fromtimestamp(last_check, tz=timezone.utc).strftime("%Y-%m-%d")
-    else:
-        # First run: only check last 24 hours
-        since = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    # Get new emails
-    emails = get_new_emails(since)
-    log(f"Found {len(emails)} threads since {since}")
+def process_threads(threads, notify=True):
+    """Resolve senders and route known/VIP senders to next-actions (and Signal)."""
+    senders = resolve_senders(threads)
 
     vip_notifications = []
     actions_added = 0
 
-    for thread in emails:
+    for thread in threads:
         thread_id = thread.get("thread", "")
         subject = thread.get("subject", "(no subject)")
         authors = thread.get("authors", "")
-        timestamp = thread.get("timestamp", 0)
 
-        if timestamp <= last_check:
-            continue
-
-        sender_email, sender_name = get_sender_email(thread_id)
+        sender_email, sender_name = senders.get(thread_id, (None, None))
 
         if should_ignore(sender_email):
             continue
@@ -249,17 +434,234 @@ def main():
             log(f"  Known: {sender_name} -- {subject}")
 
     # Send Signal notification for VIPs
-    if vip_notifications:
+    if vip_notifications and notify:
         msg = "New email from:\n" + "\n".join(f"  - {n}" for n in vip_notifications)
         send_signal_notification(msg)
         log(f"Signal notification sent ({len(vip_notifications)} VIP emails)")
 
     if actions_added:
         log(f"Added {actions_added} items to next-actions.json")
+    return actions_added
+
+
+def check_new_mail(state):
+    """Process everything notmuch indexed since the cursor in `state`, then advance it.
+
+    Returns the threads that were treated as new.
+    """
+    now = int(datetime.now(timezone.utc).timestamp())
+    last_check = state.get("last_check", 0)
+    db_uuid, revision = notmuch_revision()
+
+    if revision is not None and state.get("db_uuid") == db_uuid and "lastmod" in state:
+        if revision <= state["lastmod"]:
+            log(f"No changes since lastmod {revision}")
+            state["last_check"] = now
+            return []
+        range_query = f"lastmod:{state['lastmod'] + 1}..{revision}"
+    elif last_check:
+        # No usable cursor yet (first run after upgrade, or notmuch DB rebuilt)
+        range_query = f"date:@{last_check}.."
+    else:
+        # First run: only check last 24 hours
+        range_query = f"date:@{now - 86400}.."
+
+    # A thread shows up in a lastmod range whenever any of its messages change,
+    # including tag-only changes. Only handle threads with a newer message than
+    # we've already seen, and never alert on mail older than MAX_MESSAGE_AGE.
+    seen = state.get("seen", {})
+    cutoff = now - MAX_MESSAGE_AGE
+    emails = get_new_emails(f"{range_query} AND date:@{cutoff}..")
+    log(f"Found {len(emails)} threads in {range_query}")
+    new_threads = [t for t in emails
+                   if t.get("timestamp", 0) >= cutoff
+                   and t.get("timestamp", 0) > seen.get(t.get("thread", ""), 0)]
+    process_threads(new_threads)
+
+    for t in new_threads:
+        seen[t["thread"]] = t.get("timestamp", 0)
+    state["seen"] = {tid: ts for tid, ts in seen.items() if ts >= cutoff}
+    state["last_check"] = now
+    if revision is not None:
+        state["lastmod"] = revision
+        state["db_uuid"] = db_uuid
+    return new_threads
+
+
+def maildir_stamp(root):
+    """mtimes of every Maildir cur/ and new/ directory under `root`.
+
+    Delivering, moving or deleting a message changes its directory's mtime,
+    so this detects change without listing the (huge) message directories.
+    """
+    stamp = []
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    if entry.name in ("cur", "new"):
+                        stamp.append((entry.path, entry.stat().st_mtime_ns))
+                    elif entry.name != "tmp" and not entry.name.startswith(".notmuch"):
+                        stack.append(entry.path)
+        except OSError:
+            pass
+    return sorted(stamp)
+
+
+def write_health(health):
+    try:
+        HEALTH_FILE.parent.mkdir(parents=True, exist_ok=True)
+        write_json(HEALTH_FILE, health)
+    except OSError as e:
+        log(f"Could not write health file: {e}")
+
+
+def daemon():
+    """Long-running watcher: adaptive mbsync polling, notmuch new only on change."""
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    state = load_state()
+    interval = DAEMON_MIN_INTERVAL
+    last_stamp = None
+    last_full_sync = None
+    health = {
+        "pid": os.getpid(),
+        "mode": "daemon",
+        "started_at": int(time.time()),
+        "cycles": 0,
+        "errors": 0,
+        "last_mail_at": None,
+        "last_lag_seconds": None,
+        "last_full_sync_at": None,
+    }
+    log(f"check-mail daemon started (interval {DAEMON_MIN_INTERVAL}-{DAEMON_MAX_INTERVAL}s, "
+        f"{DAEMON_MBSYNC_TARGET} between full syncs every {DAEMON_FULL_SYNC}s)")
+
+    while not stop.is_set():
+        cycle_start = time.monotonic()
+        started_at = time.time()
+        health["cycles"] += 1
+        changed = False
+        errors = health["errors"]
+        new_threads, notmuch_output = None, ""
+        try:
+            full = last_full_sync is None or time.monotonic() - last_full_sync >= DAEMON_FULL_SYNC
+            if not run_mbsync(MBSYNC_TARGET if full else DAEMON_MBSYNC_TARGET):
+                health["errors"] += 1
+                log("mbsync failed, will retry")
+            elif full:
+                last_full_sync = time.monotonic()
+                health["last_full_sync_at"] = int(time.time())
+            stamp = maildir_stamp(MAIL_DIR)
+            if stamp != last_stamp:
+                changed = True
+                notmuch_output = run_notmuch_new()
+                if notmuch_output:
+                    log(f"notmuch: {notmuch_output}")
+                get_people_index().refresh()
+                classify_mail()
+                new_threads = check_new_mail(state)
+                save_state(state)
+                last_stamp = stamp
+                if new_threads:
+                    newest = max(t.get("timestamp", 0) for t in new_threads)
+                    health["last_mail_at"] = int(time.time())
+                    health["last_lag_seconds"] = int(time.time()) - newest
+        except Exception as e:
+            health["errors"] += 1
+            log(f"ERROR: {e}")
+
+        # Idle polls aren't recorded: only cycles that indexed mail or failed
+        if changed or health["errors"] > errors:
+            record_run("daemon", started_at, "error" if health["errors"] > errors else "ok",
+                       new_threads, notmuch_output)
+        interval = DAEMON_MIN_INTERVAL if changed else min(interval * DAEMON_BACKOFF,
+                                                           DAEMON_MAX_INTERVAL)
+        health.update({
+            "last_cycle_at": int(time.time()),
+            "last_cycle_seconds": round(time.monotonic() - cycle_start, 2),
+            "interval": round(interval),
+            "lastmod": state.get("lastmod"),
+            # The console pushes a "mail" event when this is non-zero
+            "new_threads": len(new_threads or []),
+        })
+        write_health(health)
+        stop.wait(interval)
+
+    health["mode"] = "stopped"
+    write_health(health)
+    log("check-mail daemon stopped")
+    return 0
+
+
+def parse_range(value, kind):
+    """Validate an explicit FROM..TO range for --replay/--backfill."""
+    if ".." not in value:
+        raise argparse.ArgumentTypeError(f"{kind} range must look like FROM..TO")
+    return f"{kind}:{value}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--benchmark", metavar="SINCE", nargs="?", const="1week",
+                        help="report sender-resolution throughput for threads since SINCE "
+                             "(a notmuch date, default 1week) and exit")
+    parser.add_argument("--replay", metavar="REV..REV", type=lambda v: parse_range(v, "lastmod"),
+                        help="re-process an explicit notmuch lastmod revision range")
+    parser.add_argument("--backfill", metavar="DATE..DATE", type=lambda v: parse_range(v, "date"),
+                        help="process an explicit date range (notmuch date syntax, "
+                             "e.g. 2024-06-01..2024-06-07 or @1717200000..@1717804800)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running: poll with an adaptive interval instead of exiting")
+    args = parser.parse_args()
+    if args.benchmark:
+        return benchmark(args.benchmark)
+    if args.daemon:
+        return daemon()
+
+    # Replay/backfill: no sync, no Signal alerts, cursor left untouched
+    if args.replay or args.backfill:
+        range_query = args.replay or args.backfill
+        emails = get_new_emails(range_query)
+        log(f"Re-processing {len(emails)} threads in {range_query}")
+        process_threads(emails, notify=False)
+        return 0
+
+    state = load_state()
+    started_at = time.time()
+
+    # Run mbsync
+    log("Running mbsync...")
+    if not run_mbsync():
+        log("mbsync failed, skipping")
+        record_run("cron", started_at, "error")
+        return 1
+
+    # Index new mail
+    notmuch_output = run_notmuch_new()
+    if notmuch_output:
+        log(f"notmuch: {notmuch_output}")
+
+    classified = classify_mail()
+    if classified:
+        log(f"Classified mail from {classified} senders")
 
-    # Update state
-    state["last_check"] = int(datetime.now(timezone.utc).timestamp())
+    new_threads = check_new_mail(state)
     save_state(state)
+    record_run("cron", started_at, "ok", new_threads, notmuch_output)
+    write_health({
+        "pid": os.getpid(),
+        "mode": "cron",
+        "last_cycle_at": int(time.time()),
+        "new_threads": len(new_threads),
+        "lastmod": state.get("lastmod"),
+    })
 
     return 0
 
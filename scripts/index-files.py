@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Update the archive's file indexes used by the console:
+
+  .cache/file-index.sqlite  full-text search (/api/search/files)
+  .cache/tree-index.sqlite  sizes, mtimes and listings (/api/files)
+
+Only files whose mtime or size changed (and directories whose mtime
+changed) since the last run are re-read, so a nightly run after
+sync-all.sh touches just what the sync brought in.
+
+Usage:
+  index-files.py              # incremental update
+  index-files.py --optimize   # also merge search index segments (after a big import)
+  index-files.py --full       # re-list every directory in the tree index
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+INDEX_DB = ARCHIVE_DIR / ".cache" / "file-index.sqlite"
+TREE_DB = ARCHIVE_DIR / ".cache" / "tree-index.sqlite"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from file_index import FileIndex  # noqa: E402
+from tree_index import TreeIndex  # noqa: E402
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--optimize", action="store_true", help="merge FTS segments after updating")
+    parser.add_argument("--full", action="store_true",
+                        help="re-list every directory, not just those whose mtime changed")
+    args = parser.parse_args()
+
+    index = FileIndex(ARCHIVE_DIR, INDEX_DB)
+    log(f"Updating file index {INDEX_DB}...")
+    result = index.update(log=log)
+    log(f"File index: {result['total']} files, +{result['added']} "
+        f"~{result['updated']} -{result['removed']} in {result['seconds']}s")
+    if args.optimize:
+        index.optimize()
+        log("File index optimized")
+
+    log(f"Updating tree index {TREE_DB}...")
+    tree = TreeIndex(TREE_DB)
+    result = tree.update(ARCHIVE_DIR, full=args.full, log=log)
+    log(f"Tree index: {result['directories']} directories, "
+        f"{result['rescanned']} re-listed in {result['seconds']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
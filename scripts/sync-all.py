@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Sync every source into the archive, independent sources in parallel.
+
+Google Drive, Dropbox and Gmail run concurrently, each bounded by its
+tool's limit (rclone transfers/checkers per source, one mbsync at a time).
+Steps that depend on others wait for them: `notmuch new` after Gmail, each
+mirror's git commit after its sync, the parent repo's submodule pointers
+after both commits, and the file indexes last.
+
+sync-status.json is rewritten as each step finishes, so the console sees a
+run in progress. Per source it records status/message/timestamp (what
+status.sh reads) plus start time, duration, exit code, bytes and files.
+Every step that ran also gets a row in .cache/metrics.sqlite (run history).
+
+Usage:
+  sync-all.py                          # everything (what sync-all.sh runs)
+  sync-all.py --only gmail,notmuch     # just these steps (dependencies not added)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+STATUS_FILE = ARCHIVE_DIR / "sync-status.json"
+METRICS_DB = ARCHIVE_DIR / ".cache" / "metrics.sqlite"
+MAIL_DIR = Path(os.environ.get("MAIL_DIR", os.path.expanduser("~/Mail/gmail")))
+MBSYNC_TARGET = os.environ.get("MBSYNC_TARGET", "gmail")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from jsonfile import write_json  # noqa: E402
+from metrics_store import MetricsStore  # noqa: E402
+
+# CONFIGURE: rclone remotes, where they're mirrored, and per-source
+# parallelism (--transfers / --checkers)
+RCLONE_SOURCES = {
+    "google-drive": {"remote": "gdrive:", "dest": "cloud/google-drive", "transfers": 4, "checkers": 8},
+    "dropbox": {"remote": "dropbox:", "dest": "cloud/dropbox", "transfers": 4, "checkers": 8},
+}
+
+# How many of each tool may run at once across all steps
+TOOL_LIMITS = {"rclone": 2, "mbsync": 1, "git": 1}
+
+# status.sh reads these under "sources"; every other step goes under "steps"
+SOURCES = ("google-drive", "dropbox", "gmail")
+
+STEP_TIMEOUT = 6 * 3600
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Skip(Exception):
+    """A step that can't run here (no remote, no config...)."""
+
+
+class StepError(Exception):
+    def __init__(self, message, exit_code=None):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+class Step:
+    """One unit of the sync. run() returns (message, extra fields) or raises
+    Skip/StepError. `needs` must finish first; with `strict`, they must also
+    have succeeded."""
+
+    def __init__(self, name, run, needs=(), tool=None, strict=False):
+        self.name = name
+        self.run = run
+        self.needs = list(needs)
+        self.tool = tool
+        self.strict = strict
+        self.done = asyncio.Event()
+        self.record: dict = {"status": "pending", "message": "waiting"}
+
+
+async def run_cmd(name, cmd, cwd=None, timeout=STEP_TIMEOUT):
+    """Run cmd, logging its output prefixed by the step name. Returns
+    (exit code, output lines)."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd, stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    lines = []
+
+    async def pump():
+        async for raw in proc.stdout:
+            line = raw.decode(errors="replace").rstrip()
+            lines.append(line)
+            if line.startswith("{"):  # rclone's JSON log: echo just the message
+                try:
+                    line = json.loads(line).get("msg", line).strip()
+                except ValueError:
+                    pass
+            log(f"  [{name}] {line}")
+
+    try:
+        await asyncio.wait_for(asyncio.gather(pump(), proc.wait()), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise StepError(f"timed out after {timeout}s")
+    return proc.returncode, lines
+
+
+# --- Sources ---
+
+async def rclone_remotes() -> set[str]:
+    if not shutil.which("rclone"):
+        return set()
+    code, lines = await run_cmd("rclone", ["rclone", "listremotes"])
+    return {line.strip() for line in lines} if code == 0 else set()
+
+
+def rclone_stats(lines) -> dict:
+    """bytes/files/checks/errors from rclone's final JSON stats line."""
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        stats = entry.get("stats")
+        if stats:
+            return {"bytes": stats.get("bytes", 0), "files": stats.get("transfers", 0),
+                    "checks": stats.get("checks", 0), "errors": stats.get("errors", 0)}
+    return {}
+
+
+def rclone_step(name, cfg, remotes_task):
+    async def run():
+        if cfg["remote"] not in await remotes_task:
+            raise Skip(f"No {cfg['remote'].rstrip(':')} remote configured")
+        code, lines = await run_cmd(name, [
+            "rclone", "sync", cfg["remote"], str(ARCHIVE_DIR / cfg["dest"]) + "/",
+            "--exclude", ".git/**", "--exclude", ".gitattributes",
+            "--transfers", str(cfg["transfers"]), "--checkers", str(cfg["checkers"]),
+            "--use-json-log", "--log-level", "NOTICE",
+            "--stats", "1m", "--stats-log-level", "NOTICE",
+        ])
+        stats = rclone_stats(lines)
+        if code != 0:
+            raise StepError(f"rclone sync failed (exit {code})", code)
+        return "Sync completed", {**stats, "exit_code": 0}
+    return Step(name, run, tool="rclone")
+
+
+def maildir_delta(since: float) -> dict:
+    """Messages (and their bytes) mbsync added or moved in the maildir since
+    `since` (a flag change renames the file, so it counts too).
+
+    Adding or renaming a message updates its new/ or cur/ directory's
+    mtime, so only directories modified since `since` are listed; the rest
+    of the maildir costs one stat per folder.
+    """
+    files = size = 0
+    folders = [MAIL_DIR]
+    while folders:
+        try:
+            with os.scandir(folders.pop()) as it:
+                subdirs = [e for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            continue
+        for d in subdirs:
+            if d.name.startswith(".notmuch") or d.name == "tmp":
+                continue
+            if d.name not in ("new", "cur"):
+                folders.append(d.path)
+                continue
+            try:
+                if d.stat().st_mtime < since:
+                    continue
+                with os.scandir(d.path) as it:
+                    for entry in it:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        if st.st_ctime >= since:
+                            files += 1
+                            size += st.st_size
+            except OSError:
+                continue
+    return {"bytes": size, "files": files}
+
+
+async def gmail():
+    if not Path("~/.mbsyncrc").expanduser().exists():
+        raise Skip("No ~/.mbsyncrc configured")
+    start = time.time()
+    code, _ = await run_cmd("gmail", ["mbsync", MBSYNC_TARGET])
+    if code != 0:
+        raise StepError("mbsync failed (likely rate-limited)", code)
+    delta = await asyncio.to_thread(maildir_delta, start - 1)
+    return "Sync completed", {**delta, "exit_code": 0}
+
+
+async def notmuch_new():
+    if not shutil.which("notmuch"):
+        raise Skip("notmuch not installed")
+    code, lines = await run_cmd("notmuch", ["notmuch", "new"])
+    if code != 0:
+        raise StepError(f"notmuch new failed (exit {code})", code)
+    added = next((int(m.group(1)) for line in lines
+                  if (m := re.search(r"Added (\d+) new message", line))), 0)
+    return f"Indexed {added} new messages", {"files": added, "exit_code": 0}
+
+
+# --- Commits and indexes ---
+
+async def git(name, args, cwd):
+    return await run_cmd(name, ["git", *args], cwd=cwd)
+
+
+def commit_step(name, repo, needs):
+    async def run():
+        path = ARCHIVE_DIR / repo
+        if not (path / ".git").exists():
+            raise Skip(f"{repo} is not a git repository")
+        await git(name, ["checkout", "main"], path)
+        await git(name, ["add", "-A"], path)
+        code, _ = await git(name, ["diff", "--cached", "--quiet"], path)
+        if code == 0:
+            return "No changes", {}
+        if code != 1:
+            raise StepError("git diff failed", code)
+        code, _ = await git(name, ["commit", "-q", "-m", f"Sync {datetime.now():%Y-%m-%d}"], path)
+        if code != 0:
+            raise StepError("git commit failed", code)
+        code, _ = await git(name, ["push", "-q"], path)
+        if code != 0:
+            raise StepError("Push failed", code)
+        return "Pushed new changes", {}
+    return Step(name, run, needs=needs, tool="git")
+
+
+async def submodule_pointers():
+    if not (ARCHIVE_DIR / ".git").exists():
+        raise Skip("archive is not a git repository")
+    repos = [cfg["dest"] for cfg in RCLONE_SOURCES.values()]
+    await git("submodules", ["add", *repos], ARCHIVE_DIR)
+    code, _ = await git("submodules", ["diff", "--cached", "--quiet"], ARCHIVE_DIR)
+    if code == 0:
+        return "No submodule pointer changes", {}
+    if code != 1:
+        raise StepError("git diff failed", code)
+    await git("submodules", ["commit", "-q", "-m",
+                             f"Update cloud submodule pointers {datetime.now():%Y-%m-%d}"], ARCHIVE_DIR)
+    code, _ = await git("submodules", ["push", "-q"], ARCHIVE_DIR)
+    if code != 0:
+        raise StepError("Parent repo push failed", code)
+    return "Pushed updated submodule pointers", {}
+
+
+async def index_files():
+    venv_python = ARCHIVE_DIR / ".venv" / "bin" / "python"
+    python = str(venv_python) if venv_python.exists() else sys.executable
+    code, lines = await run_cmd("index", [python, str(ARCHIVE_DIR / "scripts" / "index-files.py")])
+    if code != 0:
+        raise StepError("file index update failed", code)
+    return (lines[-1] if lines else "Indexes updated"), {}
+
+
+def build_steps(remotes_task) -> list[Step]:
+    steps = [rclone_step(name, cfg, remotes_task) for name, cfg in RCLONE_SOURCES.items()]
+    steps.append(Step("gmail", gmail, tool="mbsync"))
+    steps.append(Step("notmuch", notmuch_new, needs=["gmail"], strict=True))
+    commits = []
+    for name, cfg in RCLONE_SOURCES.items():
+        commits.append(f"commit-{name}")
+        steps.append(commit_step(f"commit-{name}", cfg["dest"], needs=[name]))
+    steps.append(Step("submodules", submodule_pointers, needs=commits, tool="git"))
+    steps.append(Step("index", index_files, needs=["submodules", "notmuch"]))
+    return steps
+
+
+# --- Orchestration ---
+
+class Run:
+    def __init__(self, steps: list[Step]):
+        self.steps = {s.name: s for s in steps}
+        self.started = time.time()
+        self.limits = {tool: asyncio.Semaphore(n) for tool, n in TOOL_LIMITS.items()}
+        try:
+            self.metrics = MetricsStore(METRICS_DB)
+        except (sqlite3.Error, OSError) as e:
+            log(f"Metrics store unavailable: {e}")
+            self.metrics = None
+
+    def record_metrics(self, name: str, started_at: float, record: dict):
+        """One row per step in the metrics history (best effort)."""
+        if self.metrics is None:
+            return
+        try:
+            self.metrics.record("sync", name, started_at, record.get("duration"), record["status"],
+                                bytes=record.get("bytes"), items=record.get("files"),
+                                exit_code=record.get("exit_code"))
+        except sqlite3.Error as e:
+            log(f"  could not record metrics for {name}: {e}")
+
+    def write_status(self, finished: bool = False):
+        sources = {n: s.record for n, s in self.steps.items() if n in SOURCES}
+        others = {n: s.record for n, s in self.steps.items() if n not in SOURCES}
+        status = {
+            "last_run": iso(self.started),
+            "finished_at": iso(time.time()) if finished else None,
+            "duration": round(time.time() - self.started, 1) if finished else None,
+            "running": not finished,
+            "sources": sources,
+            "steps": others,
+        }
+        write_json(STATUS_FILE, status)
+
+    async def execute(self, step: Step):
+        deps = [self.steps[n] for n in step.needs if n in self.steps]
+        for dep in deps:
+            await dep.done.wait()
+        failed = [d.name for d in deps if d.record["status"] != "ok"]
+        start = time.time()
+        record = {"status": "running", "message": "", "timestamp": iso(start),
+                  "started_at": iso(start)}
+        try:
+            if step.strict and failed:
+                raise Skip(f"{', '.join(failed)} did not succeed")
+            step.record = record
+            self.write_status()
+            log(f"Starting {step.name}...")
+            limit = self.limits.get(step.tool)
+            if limit:
+                async with limit:
+                    message, extra = await step.run()
+            else:
+                message, extra = await step.run()
+            record.update(status="ok", message=message, **extra)
+        except Skip as e:
+            record.update(status="skipped", message=str(e))
+        except StepError as e:
+            record.update(status="error", message=str(e), exit_code=e.exit_code)
+        except Exception as e:
+            record.update(status="error", message=f"{type(e).__name__}: {e}")
+        record["duration"] = round(time.time() - start, 1)
+        step.record = record
+        log(f"  {step.name}: {record['status']} — {record['message']} ({record['duration']}s)")
+        step.done.set()
+        self.write_status()
+        if record["status"] != "skipped":
+            self.record_metrics(step.name, start, record)
+
+    async def run(self):
+        self.write_status()
+        await asyncio.gather(*(self.execute(s) for s in self.steps.values()))
+        self.write_status(finished=True)
+        errors = [s for s in self.steps.values() if s.record["status"] == "error"]
+        self.record_metrics("total", self.started, {
+            "status": "error" if errors else "ok", "duration": round(time.time() - self.started, 1),
+            "bytes": sum(s.record.get("bytes", 0) for s in self.steps.values() if s.name in SOURCES),
+            "files": sum(s.record.get("files", 0) for s in self.steps.values() if s.name in SOURCES)})
+        return errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--only", type=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+                        help="comma-separated step names to run")
+    args = parser.parse_args()
+
+    remotes_task = asyncio.ensure_future(rclone_remotes())
+    steps = build_steps(remotes_task)
+    if args.only:
+        unknown = set(args.only) - {s.name for s in steps}
+        if unknown:
+            parser.error(f"unknown steps: {', '.join(sorted(unknown))} "
+                         f"(have: {', '.join(s.name for s in steps)})")
+        steps = [s for s in steps if s.name in args.only]
+
+    run = Run(steps)
+    errors = await run.run()
+    log(f"Sync complete in {round(time.time() - run.started)}s. Status written to {STATUS_FILE}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
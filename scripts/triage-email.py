@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Generate the communication triage (docs/communication-triage.json).
+
+Every recent human thread in the inbox becomes a triage item with a short
+LLM summary. Summaries are cached per thread with a fingerprint (thread id,
+newest message id, lastmod revision), so a refresh only looks at threads
+notmuch says changed since the last run, and only re-summarizes the ones
+that are new or got a new message. Everything else reuses its cached
+summary, which makes the common refresh a few notmuch queries.
+
+Items are merged into the existing file: threads outside this run's window
+and fields this script doesn't write are kept. Item statuses are preserved
+across runs, including changes still in the console's status journal. A thread that gets a new message from someone
+else goes back to needs-response.
+
+Usage:
+  triage-email.py                 # incremental refresh
+  triage-email.py --full          # re-summarize every thread
+  triage-email.py --days 60 --workers 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import anthropic
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+TRIAGE_FILE = ARCHIVE_DIR / "docs" / "communication-triage.json"
+TRIAGE_JOURNAL = ARCHIVE_DIR / ".cache" / "triage-journal.jsonl"
+SUMMARY_CACHE = ARCHIVE_DIR / ".cache" / "triage-summaries.json"
+PEOPLE_DIR = ARCHIVE_DIR / "private" / "relationships" / "people"
+PEOPLE_INDEX_DB = ARCHIVE_DIR / ".cache" / "people-index.sqlite"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from jsonfile import locked, write_json  # noqa: E402
+from mail_classify import HUMAN_TAG  # noqa: E402
+from notmuch_cli import message_ids, notmuch_revision, parse_from_header  # noqa: E402
+from people_index import PeopleIndex  # noqa: E402
+from thread_cache import by_date, parse_messages  # noqa: E402
+from triage_store import TriageStore  # noqa: E402
+
+# CONFIGURE: Your email address (your own messages are never triage senders)
+MY_EMAIL = os.environ.get("MY_EMAIL", "you@gmail.com")
+
+# CONFIGURE: How far back to look, and the model that writes summaries
+TRIAGE_DAYS = int(os.environ.get("TRIAGE_DAYS", "30"))
+TRIAGE_MODEL = os.environ.get("TRIAGE_MODEL", "claude-sonnet-4-20250514")
+
+# Concurrent summary requests, threads per batched notmuch query, and how
+# much of each thread goes into the prompt
+SUMMARY_WORKERS = 4
+QUERY_BATCH = 200
+PROMPT_MESSAGES = 6
+PROMPT_BODY_CHARS = 2000
+
+STATUS_NEW = "needs-response"
+# A new message from someone else reopens an item in one of these statuses
+REOPEN_STATUSES = {"replied", "waiting", "archived", "read", "snoozed"}
+
+
+def notmuch_json(args, timeout=120):
+    result = subprocess.run(["notmuch", *args], capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        return []
+    try:
+        return json.loads(result.stdout or "[]")
+    except json.JSONDecodeError:
+        return []
+
+
+def candidate_threads(days):
+    """Recent human inbox threads with at least one message not from me."""
+    query = f"tag:inbox AND tag:{HUMAN_TAG} AND date:{days}days.. AND NOT from:{MY_EMAIL}"
+    return {t["thread"]: t for t in notmuch_json(["search", "--format=json", "--output=summary", query])}
+
+
+def changed_threads(since_revision, revision):
+    """Thread ids with any message added or retagged in (since, revision]."""
+    if since_revision >= revision:
+        return set()
+    return set(notmuch_json(["search", "--format=json", "--output=threads",
+                             f"lastmod:{since_revision + 1}..{revision}"]))
+
+
+def newest_message_ids(threads):
+    """thread id -> id of its newest message, for the given search summaries.
+
+    One newest-first message listing per batch of threads; each thread's
+    summary says which ids belong to it, so the first one seen is newest.
+    """
+    owner = {}
+    for t in threads:
+        for q in t.get("query") or []:
+            for mid in message_ids(q):
+                owner[mid] = t["thread"]
+    newest = {}
+    for i in range(0, len(threads), QUERY_BATCH):
+        chunk = threads[i:i + QUERY_BATCH]
+        query = " or ".join(f"thread:{t['thread']}" for t in chunk)
+        for mid in notmuch_json(["search", "--format=json", "--output=messages",
+                                 "--sort=newest-first", query]):
+            tid = owner.get(mid)
+            if tid and tid not in newest:
+                newest[tid] = mid
+    return newest
+
+
+def load_cache():
+    try:
+        with open(SUMMARY_CACHE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"uuid": None, "revision": 0, "threads": {}}
+
+
+def load_triage():
+    try:
+        with open(TRIAGE_FILE) as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"items": []}
+    data.setdefault("items", [])
+    return data
+
+
+def merge_items(existing, updates):
+    """This run's items (newest first) merged into the file's items.
+
+    Updated items keep any fields this script doesn't write, and their
+    place in the list. New items go first. Items outside this run's window
+    are kept as they are.
+    """
+    seen = set()
+    items = []
+    for item in existing:
+        tid = item.get("id")
+        if tid in updates:
+            item = {**item, **updates[tid]}
+            seen.add(tid)
+        items.append(item)
+    return [u for tid, u in updates.items() if tid not in seen] + items
+
+
+def compact_thread(messages):
+    """The last few messages (input oldest first), bodies trimmed, as plain
+    text for the prompt."""
+    lines = []
+    for msg in messages[-PROMPT_MESSAGES:]:
+        body = msg.get("body", "")
+        if len(body) > PROMPT_BODY_CHARS:
+            body = body[:PROMPT_BODY_CHARS] + " [...]"
+        lines.append(f"From: {msg['from']}\nDate: {msg['date']}\n\n{body.strip()}\n")
+    return "\n---\n".join(lines)
+
+
+def summarize(client, thread_id):
+    """Sender and summary for one thread. Without an API client the summary
+    is the start of the newest message (and isn't cached)."""
+    messages = by_date(parse_messages(notmuch_json(["show", "--format=json", "--entire-thread=true",
+                                                    f"thread:{thread_id}"], timeout=60)))
+    if not messages:
+        return None
+    theirs = [m for m in messages if parse_from_header(m["from"])[0] != MY_EMAIL.lower()]
+    from_email, from_name = parse_from_header((theirs or messages)[-1]["from"])
+    result = {"from_name": from_name, "from_email": from_email,
+              "subject": messages[0]["subject"], "newest_from_me": messages[-1] not in theirs}
+    if client is None:
+        snippet = " ".join(messages[-1].get("body", "").split())
+        result.update(summary=snippet[:200], model=None)
+        return result
+    prompt = (
+        "Summarize this email thread for a personal triage list in one or two sentences: "
+        "what it's about and what, if anything, is being asked of me. "
+        "Output ONLY the summary.\n\n" + compact_thread(messages)
+    )
+    message = client.messages.create(
+        model=TRIAGE_MODEL,
+        max_tokens=200,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    result.update(summary=message.content[0].text.strip(), model=TRIAGE_MODEL)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--full", action="store_true", help="ignore cached summaries")
+    parser.add_argument("--days", type=int, default=TRIAGE_DAYS,
+                        help=f"include threads from the last N days (default {TRIAGE_DAYS})")
+    parser.add_argument("--workers", type=int, default=SUMMARY_WORKERS,
+                        help=f"concurrent summary requests (default {SUMMARY_WORKERS})")
+    args = parser.parse_args()
+
+    client = None
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if ANTHROPIC_AVAILABLE and api_key:
+        client = anthropic.Anthropic(api_key=api_key)
+    else:
+        log("No anthropic package or ANTHROPIC_API_KEY; using message snippets as summaries")
+
+    uuid, revision = notmuch_revision()
+    if revision is None:
+        log("notmuch unavailable")
+        return 1
+    cache = load_cache()
+    cached = cache["threads"] if not args.full else {}
+    candidates = candidate_threads(args.days)
+
+    # Only threads notmuch says changed can have a new newest message
+    if cache["uuid"] == uuid and not args.full:
+        touched = changed_threads(cache["revision"], revision)
+        look = [t for tid, t in candidates.items()
+                if tid in touched or tid not in cached or not cached[tid]["fingerprint"]["newest_id"]]
+    else:
+        look = list(candidates.values())
+    newest = newest_message_ids(look)
+
+    todo = []
+    for t in look:
+        tid = t["thread"]
+        entry = cached.get(tid)
+        if entry and entry.get("model") and entry["fingerprint"]["newest_id"] == newest.get(tid):
+            entry["fingerprint"]["lastmod"] = revision
+        else:
+            todo.append(tid)
+    log(f"{len(candidates)} threads, {len(look)} changed, {len(todo)} to summarize")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = dict(zip(todo, pool.map(lambda tid: _summarize_safely(client, tid), todo)))
+
+    new_threads = {}
+    for tid in candidates:
+        if results.get(tid):
+            entry = results[tid]
+            entry["fingerprint"] = {"thread": tid, "newest_id": newest.get(tid), "lastmod": revision}
+            entry["reopen"] = tid in cached and not entry["newest_from_me"]
+        elif tid in cached:
+            entry = cached[tid]
+            entry["reopen"] = False
+            if tid in todo:  # summary failed: keep the old one, retry next run
+                entry["fingerprint"]["newest_id"] = None
+        else:
+            continue
+        new_threads[tid] = entry
+
+    # Current statuses, including journaled changes the console hasn't compacted
+    store = TriageStore(TRIAGE_FILE, TRIAGE_JOURNAL)
+    statuses = {i["id"]: i.get("status") for i in store.query()["items"]}
+    people = PeopleIndex(PEOPLE_DIR, PEOPLE_INDEX_DB)
+    people.refresh()
+
+    updates, reopened = {}, []
+    for tid in sorted(new_threads, key=lambda t: candidates[t]["timestamp"], reverse=True):
+        entry = new_threads[tid]
+        status = statuses.get(tid) or STATUS_NEW
+        if entry.pop("reopen") and status in REOPEN_STATUSES:
+            reopened.append(tid)
+        slugs = people.lookup_email(entry["from_email"])
+        updates[tid] = {
+            "id": tid,
+            "thread_id": tid,
+            "from_name": entry["from_name"],
+            "from_email": entry["from_email"],
+            "subject": entry["subject"],
+            "summary": entry["summary"],
+            "status": status,
+            "relationship_slug": slugs[0] if slugs else None,
+        }
+
+    with locked(TRIAGE_FILE):
+        data = load_triage()
+        items = merge_items(data["items"], updates)
+        write_json(TRIAGE_FILE, {**data, "generated": datetime.now(timezone.utc).isoformat(),
+                                 "items": items})
+    # Through the journal, so they win over older journaled statuses on replay
+    for tid in reopened:
+        store.set_status(tid, STATUS_NEW)
+
+    SUMMARY_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    write_json(SUMMARY_CACHE, {
+        "uuid": uuid,
+        "revision": revision,
+        "threads": {tid: e for tid, e in new_threads.items() if e.get("model")},
+    })
+    log(f"Updated {len(updates)} of {len(items)} items ({len(reopened)} reopened) in {TRIAGE_FILE}")
+    return 0
+
+
+def _summarize_safely(client, thread_id):
+    try:
+        return summarize(client, thread_id)
+    except Exception as e:
+        log(f"  summary failed for {thread_id}: {e}")
+        return None
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())